@@ -2,24 +2,121 @@
 이상 탐지 로직 모듈
 Reconstruction Error 기반 이상 탐지
 """
-import torch
+import hashlib
+import io
+import os
 import numpy as np
 from typing import Tuple, List, Dict
 import config
-from model import LSTMAutoencoder
+
+
+def _import_torch():
+    """
+    torch 지연 import
+    
+    ONNX / NumPy 백엔드만 사용하는 웹 워커는 torch를 전혀 import하지 않도록
+    (콜드 스타트 시간과 상주 메모리 절감) torch가 실제로 필요한 경로에서만 호출한다.
+    """
+    try:
+        import torch
+    except ImportError as e:
+        raise ImportError("eager / TorchScript 백엔드를 사용하려면 torch가 필요합니다.") from e
+    return torch
+
+
+class StreamingErrorStats:
+    """
+    재구성 오차 스트리밍 통계 (평균/분산은 Welford 방식 배치 병합, 분위수는 QuantileSketch)
+    
+    배치마다 float64로 배치 평균과 편차 제곱합을 구해 누적값과 병합하므로 한 번에 계산한 값과
+    반올림 차이 이내로 같고, merge()로 여러 프로세스/파일의 통계를 합칠 수 있다.
+    """
+    
+    def __init__(self, relative_accuracy: float = None, max_buckets: int = None):
+        """
+        Args:
+            relative_accuracy: 분위수 추정 상대 오차 (None이면 ANOMALY_CONFIG["percentile_relative_accuracy"])
+            max_buckets: 스케치 최대 버킷 수 (None이면 ANOMALY_CONFIG["percentile_max_buckets"])
+        """
+        from quantile_sketch import QuantileSketch
+        
+        anomaly_config = config.ANOMALY_CONFIG
+        self.sketch = QuantileSketch(
+            relative_accuracy or anomaly_config["percentile_relative_accuracy"],
+            max_buckets or anomaly_config["percentile_max_buckets"],
+        )
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # 평균으로부터의 편차 제곱합
+    
+    def _merge_moments(self, count: int, mean: float, m2: float):
+        """(개수, 평균, 편차 제곱합) 병합 (Chan et al.의 병렬 Welford 공식)"""
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+    
+    def add(self, errors: np.ndarray):
+        """오차 배치 추가"""
+        errors = np.asarray(errors, dtype=np.float64).ravel()
+        if errors.size == 0:
+            return
+        batch_mean = float(errors.mean())
+        self._merge_moments(errors.size, batch_mean, float(np.square(errors - batch_mean).sum()))
+        self.sketch.add(errors)
+    
+    def merge(self, other: "StreamingErrorStats"):
+        """다른 통계를 합침"""
+        if other.count:
+            self._merge_moments(other.count, other.mean, other._m2)
+            self.sketch.merge(other.sketch)
+    
+    @property
+    def variance(self) -> float:
+        """모분산 (np.var와 같은 ddof=0)"""
+        return self._m2 / self.count if self.count else 0.0
+    
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+    
+    def quantile(self, q: float) -> float:
+        """분위수 추정 (q: 0~1)"""
+        return self.sketch.quantile(q)
 
 
 class AnomalyDetector:
     """이상 탐지 클래스"""
     
-    def __init__(self, model: LSTMAutoencoder, threshold: float = None):
+    def __init__(self, model, threshold: float = None):
         """
         Args:
             model: 학습된 LSTM Autoencoder 모델
+                   (nn.Module, TorchScript 모듈 또는 numpy 입력을 받는 serving_backends 러너)
             threshold: 이상 탐지 임계값 (None이면 자동 계산)
         """
         self.model = model
         self.threshold = threshold
+        # 추론 결과 캐시 키에 쓰이는 모델 식별자 (체크포인트/아티팩트에서 로드하면 내용 해시로 대체)
+        self.model_version = f"{type(model).__name__}-{id(model):x}"
+        # numpy 배열을 직접 받는 백엔드 (ONNX Runtime, NumPy 등)는 torch 없이 동작
+        self.uses_torch = not getattr(model, "accepts_numpy", False)
+        # 길이가 다른 윈도우를 한 번에 처리할 수 있는 모델 (eager LSTMAutoencoder, NumPy 러너)
+        # 그 외 (TorchScript, ONNX)는 길이별로 나누어 추론
+        self.supports_lengths = getattr(model, "supports_lengths", False) is True
+        # VariationalLSTMAutoencoder: 윈도우당 K개 잠재 샘플의 재구성 오차 평균과 표준편차로 스코어링
+        self.is_variational = hasattr(model, "sample_reconstructions")
+        # 사용자 어댑터 (output 레이어 가중치 delta)를 윈도우별로 적용할 수 있는 모델 (eager LSTMAutoencoder)
+        self.supports_adapters = (self.uses_torch and not self.is_variational
+                                  and hasattr(model, "decode_hidden") and hasattr(model, "output"))
+        self.num_samples = max(1, int(config.SERVING_CONFIG.get("vae_samples", 8)))
+        
+        if not self.uses_torch:
+            self.device = None
+            return
+        
+        torch = self._torch = _import_torch()
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model.to(self.device)
         self.model.eval()
@@ -27,64 +124,380 @@ class AnomalyDetector:
         # CPU 성능 최적화 (배포 환경)
         if self.device.type == "cpu":
             torch.set_num_threads(1)  # 단일 스레드로 최적화 (Railway CPU 제한 대응)
-            torch.set_num_interop_threads(1)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                # interop 스레드 수는 병렬 작업 시작 후에는 변경 불가 (재로드 시)
+                pass
+        
+        # VAE 잠재 노이즈 고정 (모든 윈도우에 같은 K개 노이즈 → 점수가 배치 구성과 무관하게 결정적)
+        self._latent_eps = None
+        seed = config.SERVING_CONFIG.get("vae_seed")
+        if self.is_variational and seed is not None:
+            generator = torch.Generator().manual_seed(seed)
+            self._latent_eps = torch.randn(self.num_samples, model.latent_dim, generator=generator)
     
-    def calculate_reconstruction_error(self, X: np.ndarray) -> np.ndarray:
+    @classmethod
+    def from_checkpoint(cls, model_path: str) -> "AnomalyDetector":
         """
-        재구성 오차 계산
+        학습 체크포인트(.pth)에서 모델과 임계값을 로드하여 AnomalyDetector 생성
+        
+        Args:
+            model_path: {"config", "model_state_dict", "threshold"} 형식의 체크포인트 경로
+                        (config["model_type"]이 "vae"면 VariationalLSTMAutoencoder)
+            
+        Returns:
+            AnomalyDetector 인스턴스 (체크포인트에 임계값이 없으면 min_threshold 사용)
+        """
+        from model import LSTMAutoencoder, VariationalLSTMAutoencoder
+        torch = _import_torch()
+        
+        # 파일을 한 번만 읽어 모델 버전(내용 해시) 계산과 로드에 함께 사용
+        with open(model_path, 'rb') as f:
+            raw = f.read()
+        checkpoint = torch.load(io.BytesIO(raw), map_location='cpu', weights_only=False)
+        
+        # checkpoint에서 input_size 가져오기 (저장된 config 사용)
+        saved_input_size = checkpoint['config'].get('input_size', config.MODEL_CONFIG["input_size"])
+        
+        if checkpoint['config'].get('model_type') == "vae":
+            model = VariationalLSTMAutoencoder(
+                input_size=saved_input_size,
+                hidden_size=checkpoint['config']['hidden_size'],
+                num_layers=checkpoint['config']['num_layers'],
+                latent_dim=checkpoint['config'].get('latent_dim', 32),
+                dropout=checkpoint['config']['dropout']
+            )
+        else:
+            model = LSTMAutoencoder(
+                input_size=saved_input_size,
+                hidden_size=checkpoint['config']['hidden_size'],
+                num_layers=checkpoint['config']['num_layers'],
+                dropout=checkpoint['config']['dropout']
+            )
+        model.load_state_dict(checkpoint['model_state_dict'])
+        model.eval()
+        
+        # 임계값 설정 (모델 파일에서 로드 또는 기본값 사용)
+        threshold = checkpoint.get('threshold')
+        if threshold is None:
+            threshold = config.ANOMALY_CONFIG.get("min_threshold", 0.01)
+        
+        detector = cls(model, threshold=threshold)
+        detector.model_version = "eager-" + hashlib.sha256(raw).hexdigest()[:16]
+        return detector
+    
+    @classmethod
+    def from_exported(cls, backend: str = "torchscript",
+                      meta_path: str = None) -> "AnomalyDetector":
+        """
+        model_export.py로 내보낸 아티팩트(TorchScript/ONNX/NumPy)에서 AnomalyDetector 생성
+        
+        Args:
+            backend: "torchscript", "onnx" 또는 "numpy"
+            meta_path: 메타데이터 JSON 경로 (None이면 config.EXPORT_META_PATH)
+            
+        Returns:
+            AnomalyDetector 인스턴스 (feature_names는 detector.feature_names에 저장)
+        """
+        from serving_backends import load_export_metadata, OnnxAutoencoderRunner, NumpyAutoencoderRunner
+        
+        meta_path = meta_path or config.EXPORT_META_PATH
+        meta = load_export_metadata(meta_path)
+        export_dir = os.path.dirname(meta_path)
+        
+        if backend == "torchscript":
+            model = _import_torch().jit.load(os.path.join(export_dir, meta["torchscript_file"]), map_location='cpu')
+        elif backend == "onnx":
+            model = OnnxAutoencoderRunner(os.path.join(export_dir, meta["onnx_file"]))
+        elif backend == "numpy":
+            model = NumpyAutoencoderRunner(os.path.join(export_dir, meta["numpy_file"]))
+        else:
+            raise ValueError(f"지원하지 않는 백엔드입니다: {backend}")
+        
+        detector = cls(model, threshold=meta["threshold"])
+        detector.feature_names = meta.get("feature_names")
+        detector.model_version = f"{backend}-{meta.get('source_sha256', '')[:16]}"
+        return detector
+    
+    def share_memory(self) -> bool:
+        """
+        모델 파라미터를 공유 메모리로 이동 (gunicorn preload 모드에서 fork 전에 호출)
+        
+        Returns:
+            이동 여부 (numpy 입력 백엔드 또는 공유 메모리를 지원하지 않는 모듈이면 False)
+        """
+        if not self.uses_torch or not hasattr(self.model, "share_memory"):
+            return False
+        try:
+            self.model.share_memory()
+        except (RuntimeError, NotImplementedError) as e:
+            # 양자화 모듈의 packed 파라미터 등은 공유 메모리 이동 미지원 (fork 후 copy-on-write로 공유)
+            print(f"경고: 모델 파라미터를 공유 메모리로 옮기지 못했습니다: {e}")
+            return False
+        return True
+    
+    def reconstruct(self, X: np.ndarray, lengths: np.ndarray = None, adapters=None) -> np.ndarray:
+        """
+        모델 재구성 결과 계산 (백엔드와 무관하게 numpy float32 반환)
         
         Args:
             X: 입력 데이터 [batch_size, sequence_length, features]
+            lengths: 샘플별 실제 길이 [batch_size] (None이면 모두 sequence_length)
+                     짧은 샘플은 앞쪽에 실제 값, 뒤쪽에 아무 값(0 등)이 채워진 것으로 간주
+            adapters: 윈도우별 사용자 어댑터 (delta_weight [batch_size, features, hidden],
+                      delta_bias [batch_size, features]), 어댑터가 없는 윈도우는 0 (supports_adapters 필요)
             
         Returns:
-            각 샘플의 재구성 오차 [batch_size]
+            재구성된 시퀀스 [batch_size, sequence_length, features] (패딩 시점 값은 의미 없음)
         """
-        # CPU-GPU 전환 최소화
-        X_tensor = torch.from_numpy(X).float().to(self.device)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if adapters is not None and not self.supports_adapters:
+            raise ValueError("이 모델 백엔드는 사용자 어댑터를 지원하지 않습니다.")
+        if lengths is not None:
+            lengths = np.asarray(lengths, dtype=np.int64)
+            if np.all(lengths == X.shape[1]):
+                lengths = None
+            elif not self.supports_lengths:
+                return self._reconstruct_by_length(X, lengths)
+        
+        if not self.uses_torch:
+            if lengths is None:
+                return self.model.reconstruct(X)
+            return self.model.reconstruct(X, lengths)
+        
+        if self.is_variational:
+            # K개 잠재 샘플 재구성의 평균
+            return self.sample_reconstructions(X).mean(axis=1)
         
+        # CPU-GPU 전환 최소화를 위해 numpy에서 직접 tensor 생성
+        torch = self._torch
+        X_tensor = torch.from_numpy(X).to(self.device)
+        if adapters is not None:
+            return self._reconstruct_with_adapters(X_tensor, lengths, adapters)
         with torch.inference_mode():  # no_grad보다 빠름
-            reconstructed, _ = self.model(X_tensor)
-            # MSE 계산
-            mse = torch.nn.functional.mse_loss(
-                reconstructed, X_tensor, reduction='none'
+            if lengths is None:
+                reconstructed, _ = self.model(X_tensor)
+            else:
+                # packed sequence: 패딩 시점은 LSTM 연산에서 제외
+                reconstructed, _ = self.model(X_tensor, torch.from_numpy(lengths))
+        return reconstructed.cpu().numpy()
+    
+    def _reconstruct_with_adapters(self, X_tensor, lengths, adapters) -> np.ndarray:
+        """
+        output(decoded) + decoded @ delta_weight[b]^T + delta_bias[b]
+        
+        encoder/decoder는 배치 전체에 한 번만 실행하고, 윈도우별 어댑터는 [batch] 배치 행렬곱 한 번으로 적용
+        """
+        torch = self._torch
+        delta_weight, delta_bias = (torch.from_numpy(np.ascontiguousarray(a, dtype=np.float32)).to(self.device)
+                                    for a in adapters)
+        with torch.inference_mode():
+            decoded, _ = self.model.decode_hidden(
+                X_tensor, None if lengths is None else torch.from_numpy(lengths)
             )
-            # 시퀀스와 특징 차원에 대해 평균
-            reconstruction_errors = mse.mean(dim=(1, 2)).cpu().numpy()
+            reconstructed = self.model.output(decoded)
+            reconstructed = reconstructed + torch.baddbmm(
+                delta_bias[:, None, :], decoded, delta_weight.transpose(1, 2)
+            )
+        return reconstructed.cpu().numpy()
+    
+    def decoder_states(self, X: np.ndarray, lengths: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        output 레이어 입력(decoder 출력)과 기본 재구성 결과 (어댑터 학습용)
+        
+        Args:
+            X: 입력 데이터 [batch_size, sequence_length, features]
+            lengths: 샘플별 실제 길이 [batch_size] (None이면 모두 sequence_length, reconstruct() 참고)
+        
+        Returns:
+            decoded [batch_size, sequence_length, hidden] (float32), reconstructed [batch_size, sequence_length, features]
+            (lengths 지정 시 패딩 시점의 값은 의미 없음)
+        """
+        if not self.supports_adapters:
+            raise ValueError("이 모델 백엔드는 사용자 어댑터를 지원하지 않습니다.")
+        torch = self._torch
+        X_tensor = torch.from_numpy(np.ascontiguousarray(X, dtype=np.float32)).to(self.device)
+        if lengths is not None:
+            lengths = np.asarray(lengths, dtype=np.int64)
+            lengths = None if np.all(lengths == X_tensor.shape[1]) else torch.from_numpy(lengths)
+        with torch.inference_mode():
+            decoded, _ = self.model.decode_hidden(X_tensor, lengths)
+            reconstructed = self.model.output(decoded)
+        return decoded.cpu().numpy(), reconstructed.cpu().numpy()
+    
+    def _reconstruct_by_length(self, X: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """길이를 받지 않는 백엔드용: 같은 길이끼리 잘라서 추론 후 원래 위치에 채움"""
+        reconstructed = np.zeros_like(X)
+        for length in np.unique(lengths):
+            index = np.flatnonzero(lengths == length)
+            reconstructed[index, :length] = self.reconstruct(X[index, :length])
+        return reconstructed
+    
+    def sample_reconstructions(self, X: np.ndarray, num_samples: int = None) -> np.ndarray:
+        """
+        VAE: 윈도우별 K개 잠재 샘플 재구성 (encoder 1회 + [batch_size * K] 배치 decoder 1회)
+        
+        Args:
+            X: 입력 데이터 [batch_size, sequence_length, features]
+            num_samples: 윈도우당 샘플 수 K (None이면 SERVING_CONFIG["vae_samples"])
+            
+        Returns:
+            [batch_size, K, sequence_length, features] (float32)
+        """
+        torch = self._torch
+        num_samples = num_samples or self.num_samples
+        eps = self._latent_eps
+        if eps is not None and num_samples > len(eps):
+            eps = None
+        X_tensor = torch.from_numpy(np.ascontiguousarray(X, dtype=np.float32)).to(self.device)
+        with torch.inference_mode():
+            samples = self.model.sample_reconstructions(X_tensor, num_samples, eps=eps)
+        return samples.cpu().numpy()
+    
+    def _error_terms(self, X: np.ndarray, lengths: np.ndarray = None, adapters=None):
+        """
+        원소별 제곱 오차와 (VAE면) 샘플 간 재구성 오차 표준편차 (adapters는 reconstruct() 참고)
+        
+        Returns:
+            squared_errors: [batch_size, sequence_length, features] (float32, 패딩 시점은 0, VAE면 K개 샘플 평균)
+            error_std: 샘플별 재구성 오차의 표준편차 [batch_size] (VAE가 아니면 None)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if not self.is_variational:
+            diff = self.reconstruct(X, lengths, adapters) - X
+            if lengths is not None:
+                diff[np.arange(X.shape[1])[None, :] >= np.asarray(lengths)[:, None]] = 0.0
+            return diff * diff, None
+        
+        if adapters is not None:
+            raise ValueError("이 모델 백엔드는 사용자 어댑터를 지원하지 않습니다.")
+        if lengths is not None and not np.all(np.asarray(lengths) == X.shape[1]):
+            # 길이가 다른 윈도우는 길이별로 나누어 계산
+            lengths = np.asarray(lengths, dtype=np.int64)
+            squared = np.zeros_like(X)
+            error_std = np.empty(len(X), dtype=np.float32)
+            for length in np.unique(lengths):
+                index = np.flatnonzero(lengths == length)
+                squared[index, :length], error_std[index] = self._error_terms(X[index, :length])
+            return squared, error_std
+        
+        diff = self.sample_reconstructions(X) - X[:, None]
+        squared = diff * diff  # [batch_size, K, sequence_length, features]
+        return squared.mean(axis=1), squared.mean(axis=(2, 3)).std(axis=1)
+    
+    def _squared_errors(self, X: np.ndarray, lengths: np.ndarray = None) -> np.ndarray:
+        """원소별 제곱 오차 [batch_size, sequence_length, features] (float32, 패딩 시점은 0)"""
+        return self._error_terms(X, lengths)[0]
+    
+    def calculate_reconstruction_error(self, X: np.ndarray, lengths: np.ndarray = None,
+                                       adapters=None) -> np.ndarray:
+        """
+        재구성 오차 계산
+        
+        Args:
+            X: 입력 데이터 [batch_size, sequence_length, features]
+            lengths: 샘플별 실제 길이 [batch_size] (None이면 모두 sequence_length)
+            adapters: 윈도우별 사용자 어댑터 (reconstruct() 참고)
+            
+        Returns:
+            각 샘플의 재구성 오차 [batch_size] (실제 시점에 대한 평균)
+        """
+        if lengths is not None:
+            return self._error_profiles(X, lengths, adapters)[0]
+        
+        # MSE 계산 (시퀀스와 특징 차원에 대해 평균)
+        reconstruction_errors = self._error_terms(X, adapters=adapters)[0].mean(axis=(1, 2))
         
         return reconstruction_errors
     
-    def compute_threshold(self, X_val: np.ndarray, 
+    def iter_reconstruction_errors(self, X, batch_size: int = None):
+        """
+        재구성 오차를 고정 크기 배치 단위로 계산 (검증 세트 전체를 한 번에 메모리에 올리지 않음)
+        
+        Args:
+            X: 슬라이싱 가능한 윈도우 배열 (ndarray, WindowSubset, WindowedDataset, np.memmap)
+               또는 [batch, sequence_length, features] 배치를 내는 iterable
+            batch_size: 배치 크기 (None이면 ANOMALY_CONFIG["calibration_batch_size"])
+            
+        Yields:
+            배치별 재구성 오차 [batch] (float32)
+        """
+        batch_size = batch_size or config.ANOMALY_CONFIG["calibration_batch_size"]
+        if hasattr(X, "__getitem__") and hasattr(X, "__len__"):
+            for begin in range(0, len(X), batch_size):
+                yield self.calculate_reconstruction_error(np.asarray(X[begin:begin + batch_size]))
+        else:
+            for batch in X:
+                yield self.calculate_reconstruction_error(np.asarray(batch))
+    
+    @staticmethod
+    def threshold_from_stats(stats: StreamingErrorStats,
+                             multiplier: float = 1.0,
+                             use_percentile: bool = False,
+                             percentile: float = 95,
+                             min_threshold: float = 0.01) -> float:
+        """
+        검증 오차 통계로 임계값 계산 (compute_threshold와 같은 규칙, 출력 없음)
+        
+        Args:
+            stats: 검증 세트 재구성 오차의 StreamingErrorStats
+            multiplier, use_percentile, percentile, min_threshold: compute_threshold 참고
+            
+        Returns:
+            임계값 (min_threshold 이상)
+        """
+        if use_percentile:
+            threshold = stats.quantile(percentile / 100.0)
+        else:
+            threshold = stats.mean + (multiplier * stats.std)
+        return max(float(threshold), min_threshold)
+    
+    def compute_threshold(self, X_val,
                          multiplier: float = 1.0,
                          use_percentile: bool = False,
                          percentile: float = 95,
-                         min_threshold: float = 0.01) -> float:
+                         min_threshold: float = 0.01,
+                         batch_size: int = None) -> float:
         """
         Validation 데이터로부터 임계값 계산
         threshold = mean + (multiplier * std) 또는 percentile 사용
         
+        검증 세트를 batch_size 단위로 흘려보내며 평균/분산(Welford)과 분위수 스케치만 누적하므로
+        메모리 사용량은 검증 세트 크기와 무관하다.
+        - mean+std: 전체 오차로 한 번에 계산한 값과 부동소수점 반올림 차이 이내로 같음 (float64 누적)
+        - percentile: QuantileSketch 추정치로, np.percentile 대비 오차는
+          ANOMALY_CONFIG["percentile_relative_accuracy"] × 값 (+ 인접한 두 오차 값의 간격) 이내
+        
         Args:
-            X_val: 검증 데이터
+            X_val: 검증 데이터 (iter_reconstruction_errors 참고)
             multiplier: 표준편차 배수
             use_percentile: True면 percentile 사용, False면 mean+std 사용
             percentile: percentile 사용 시 몇 퍼센트 사용
             min_threshold: 최소 임계값 (너무 낮은 임계값 방지)
+            batch_size: 한 번에 추론할 윈도우 수 (None이면 ANOMALY_CONFIG["calibration_batch_size"])
             
         Returns:
             계산된 임계값
         """
-        reconstruction_errors = self.calculate_reconstruction_error(X_val)
-        mean_error = np.mean(reconstruction_errors)
-        std_error = np.std(reconstruction_errors)
-        
+        stats = StreamingErrorStats()
+        for errors in self.iter_reconstruction_errors(X_val, batch_size):
+            stats.add(errors)
+        if stats.count == 0:
+            raise ValueError("임계값을 계산할 검증 데이터가 없습니다.")
+        mean_error = stats.mean
+        std_error = stats.std
+        
+        # 최소 임계값 적용은 아래에서 경고와 함께
+        threshold = self.threshold_from_stats(stats, multiplier, use_percentile, percentile, min_threshold=0.0)
         if use_percentile:
-            threshold = np.percentile(reconstruction_errors, percentile)
-            print(f"임계값 계산 완료 (Percentile 방식):")
+            print(f"임계값 계산 완료 (Percentile 방식, {stats.count}개 윈도우):")
             print(f"  평균 오차: {mean_error:.4f}")
             print(f"  표준편차: {std_error:.4f}")
-            print(f"  {percentile}th percentile: {threshold:.4f}")
+            print(f"  {percentile}th percentile: {threshold:.4f} "
+                  f"(상대 오차 ±{stats.sketch.relative_accuracy:.1%})")
         else:
-            threshold = mean_error + (multiplier * std_error)
-            print(f"임계값 계산 완료 (Mean+Std 방식):")
+            print(f"임계값 계산 완료 (Mean+Std 방식, {stats.count}개 윈도우):")
             print(f"  평균 오차: {mean_error:.4f}")
             print(f"  표준편차: {std_error:.4f}")
             print(f"  임계값: {threshold:.4f} (평균 + {multiplier} * 표준편차)")
@@ -114,19 +527,33 @@ class AnomalyDetector:
             raise ValueError("임계값이 설정되지 않았습니다. compute_threshold()를 먼저 호출하세요.")
         
         reconstruction_errors = self.calculate_reconstruction_error(X)
+        anomaly_scores = self.compute_anomaly_scores(reconstruction_errors)
+        is_anomaly = (reconstruction_errors > self.threshold).tolist()
+        
+        return anomaly_scores, reconstruction_errors, is_anomaly
+    
+    def compute_anomaly_scores(self, reconstruction_errors: np.ndarray,
+                               threshold: float = None) -> np.ndarray:
+        """
+        재구성 오차 배열 → 이상 점수 배열 (벡터화)
+        
+        Args:
+            reconstruction_errors: 재구성 오차 [batch_size]
+            threshold: 사용할 임계값 (None이면 self.threshold, 사용자별 임계값 적용 시 지정)
+            
+        Returns:
+            이상 점수 [batch_size]
+        """
         # 이상 점수 계산: 재구성 오차 / 임계값
         # 최대값 제한 (너무 높은 점수 방지)
-        anomaly_scores = reconstruction_errors / self.threshold
+        anomaly_scores = reconstruction_errors / (self.threshold if threshold is None else threshold)
         # 이상 점수가 100을 넘으면 로그 스케일로 변환
         # log1p에 음수 값이 들어가지 않도록 보장
-        anomaly_scores = np.where(
+        return np.where(
             anomaly_scores > 100,
             100 + np.log1p(np.maximum(anomaly_scores - 100, 0)),
             anomaly_scores
         )
-        is_anomaly = (reconstruction_errors > self.threshold).tolist()
-        
-        return anomaly_scores, reconstruction_errors, is_anomaly
     
     def detect_single(self, X: np.ndarray, include_feature_analysis: bool = False, 
                      feature_names: List[str] = None) -> Dict:
@@ -150,62 +577,130 @@ class AnomalyDetector:
         if X.ndim == 2:
             X = X.reshape(1, *X.shape)
         
-        # CPU-GPU 전환 최소화를 위해 numpy에서 직접 tensor 생성
-        X_tensor = torch.from_numpy(X).float().to(self.device)
+        return self.detect_batch(
+            X,
+            include_feature_analysis=include_feature_analysis,
+            feature_names=feature_names
+        )[0]
+    
+    def compute_error_profiles(self, X: np.ndarray,
+                               lengths: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        한 번의 forward pass로 전체/특징별/시점별 재구성 오차 계산
         
-        # 모델 추론을 한 번만 실행 (inference_mode로 더 빠른 추론)
-        with torch.inference_mode():  # no_grad보다 빠름
-            reconstructed, _ = self.model(X_tensor)
-            # MSE 계산
-            mse = torch.nn.functional.mse_loss(
-                reconstructed, X_tensor, reduction='none'
-            )
+        Args:
+            X: 입력 데이터 [batch_size, sequence_length, features]
+            lengths: 샘플별 실제 길이 [batch_size] (None이면 모두 sequence_length)
+            
+        Returns:
+            reconstruction_errors: 샘플별 재구성 오차 [batch_size] (float32)
+            feature_errors: 특징별 오차 [batch_size, features] (float32)
+            timestep_errors: 시점별 오차 [batch_size, sequence_length] (float32, 패딩 시점은 0)
+        """
+        return self._error_profiles(X, lengths)[:3]
+    
+    def _error_profiles(self, X: np.ndarray, lengths: np.ndarray = None, adapters=None):
+        """compute_error_profiles() 결과 + VAE 샘플 간 재구성 오차 표준편차 (VAE가 아니면 None)"""
+        # MSE 계산 (모델 추론은 한 번만)
+        mse, error_std = self._error_terms(X, lengths, adapters)
+        if lengths is None:
             # 시퀀스와 특징 차원에 대해 평균
-            reconstruction_error = mse.mean(dim=(1, 2)).cpu().numpy()[0]
+            reconstruction_errors = mse.mean(axis=(1, 2))
+            # 시퀀스 차원에 대해 평균 (특징별), 특징 차원에 대해 평균 (시점별)
+            feature_errors = mse.mean(axis=1)
+        else:
+            # 패딩 시점은 0이므로 합을 실제 길이로 나누어 평균
+            counts = np.asarray(lengths, dtype=np.float32)[:, None]
+            feature_errors = mse.sum(axis=1) / counts
+            reconstruction_errors = feature_errors.mean(axis=1)
+        timestep_errors = mse.mean(axis=2)
+        
+        return reconstruction_errors, feature_errors, timestep_errors, error_std
+    
+    def detect_batch(self, X: np.ndarray, include_feature_analysis: bool = False,
+                     feature_names: List[str] = None,
+                     return_error_profiles: bool = False,
+                     lengths: np.ndarray = None, adapters=None) -> List[Dict]:
+        """
+        여러 윈도우를 한 번의 forward pass로 이상 탐지 (배치 추론용)
         
-        # 이상 점수 계산
+        Args:
+            X: 입력 데이터 [batch_size, sequence_length, features]
+            include_feature_analysis: 특징별 분석 포함 여부
+            feature_names: 특징 이름 리스트 (include_feature_analysis=True일 때 필요)
+            return_error_profiles: True면 "feature_errors", "timestep_errors" 배열도 포함
+                                   (VAE 모델이면 "reconstruction_error_std", "num_samples"도 항상 포함)
+            lengths: 샘플별 실제 길이 [batch_size] (None이면 모두 sequence_length,
+                     지정하면 오차는 실제 시점만으로 계산하고 timestep_errors도 실제 길이로 자름)
+            adapters: 윈도우별 사용자 어댑터 (delta_weight [batch_size, features, hidden],
+                      delta_bias [batch_size, features], 어댑터가 없는 윈도우는 0)
+            
+        Returns:
+            샘플별 detect_single() 형식의 결과 딕셔너리 리스트
+        """
         if self.threshold is None:
             raise ValueError("임계값이 설정되지 않았습니다. compute_threshold()를 먼저 호출하세요.")
         
-        anomaly_score = reconstruction_error / self.threshold
-        # 이상 점수가 100을 넘으면 로그 스케일로 변환
-        if anomaly_score > 100:
-            anomaly_score = 100 + np.log1p(max(anomaly_score - 100, 0))
-        
-        is_anomaly = reconstruction_error > self.threshold
-        
-        result = {
-            "anomaly_score": float(anomaly_score),
-            "reconstruction_error": float(reconstruction_error),
-            "is_anomaly": bool(is_anomaly),
-            "threshold": float(self.threshold) if self.threshold is not None else 0.1
-        }
+        # 모델 추론을 한 번만 실행하고 전체/특징별/시점별 오차를 함께 계산
+        reconstruction_errors, feature_errors, timestep_errors, error_std = self._error_profiles(
+            X, lengths, adapters
+        )
         
-        # 특징별 분석이 필요한 경우 (이미 계산된 mse 재사용)
-        if include_feature_analysis and feature_names:
-            # 시퀀스 차원에 대해 평균하여 특징별 오차 계산
-            feature_errors = mse.mean(dim=1).cpu().numpy()[0]
+        results = []
+        for i, reconstruction_error in enumerate(reconstruction_errors):
+            anomaly_score = reconstruction_error / self.threshold
+            # 이상 점수가 100을 넘으면 로그 스케일로 변환
+            if anomaly_score > 100:
+                anomaly_score = 100 + np.log1p(max(anomaly_score - 100, 0))
             
-            feature_anomaly_scores = {}
-            for i, feature_name in enumerate(feature_names):
-                if i < len(feature_errors):
-                    feature_anomaly_scores[feature_name] = float(feature_errors[i])
+            result = {
+                "anomaly_score": float(anomaly_score),
+                "reconstruction_error": float(reconstruction_error),
+                "is_anomaly": bool(reconstruction_error > self.threshold),
+                "threshold": float(self.threshold)
+            }
             
-            # 가장 이상한 특징 정렬
-            sorted_features = sorted(
-                feature_anomaly_scores.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )
+            if error_std is not None:
+                # VAE: K개 잠재 샘플 간 재구성 오차 표준편차 (클수록 판정 불확실)
+                result["reconstruction_error_std"] = float(error_std[i])
+                result["num_samples"] = self.num_samples
             
-            top_features = [(name, float(score)) for name, score in sorted_features[:3]]
+            if include_feature_analysis and feature_names:
+                result["feature_analysis"] = self.build_feature_analysis(
+                    feature_errors[i], feature_names
+                )
             
-            result["feature_analysis"] = {
-                "feature_scores": feature_anomaly_scores,
-                "top_anomalous_features": top_features
-            }
+            if return_error_profiles:
+                result["feature_errors"] = feature_errors[i]
+                result["timestep_errors"] = (
+                    timestep_errors[i] if lengths is None else timestep_errors[i, :lengths[i]]
+                )
+            
+            results.append(result)
+        
+        return results
+    
+    def build_feature_analysis(self, feature_errors: np.ndarray,
+                                feature_names: List[str]) -> Dict:
+        """특징별 오차 배열을 feature_analysis 딕셔너리로 변환"""
+        feature_anomaly_scores = {}
+        for i, feature_name in enumerate(feature_names):
+            if i < len(feature_errors):
+                feature_anomaly_scores[feature_name] = float(feature_errors[i])
+        
+        # 가장 이상한 특징 정렬
+        sorted_features = sorted(
+            feature_anomaly_scores.items(), 
+            key=lambda x: x[1], 
+            reverse=True
+        )
         
-        return result
+        top_features = [(name, float(score)) for name, score in sorted_features[:3]]
+        
+        return {
+            "feature_scores": feature_anomaly_scores,
+            "top_anomalous_features": top_features
+        }
     
     def analyze_anomaly_pattern(self, X: np.ndarray, 
                                feature_names: List[str]) -> Dict:
@@ -219,17 +714,8 @@ class AnomalyDetector:
         Returns:
             특징별 이상 점수 딕셔너리
         """
-        # CPU-GPU 전환 최소화
-        X_tensor = torch.from_numpy(X).float().to(self.device)
-        
-        with torch.inference_mode():  # no_grad보다 빠름
-            reconstructed, _ = self.model(X_tensor)
-            # 특징별 MSE 계산
-            mse = torch.nn.functional.mse_loss(
-                reconstructed, X_tensor, reduction='none'
-            )
-            # 시퀀스 차원에 대해 평균하여 특징별 오차 계산
-            feature_errors = mse.mean(dim=1).cpu().numpy()[0]
+        # 특징별 MSE 계산 (시퀀스 차원에 대해 평균)
+        feature_errors = self._squared_errors(X).mean(axis=1)[0]
         
         feature_anomaly_scores = {}
         for i, feature_name in enumerate(feature_names):
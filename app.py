@@ -11,17 +11,26 @@ from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import xml.etree.ElementTree as ET
-import torch
 import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
 import json
 import socket
+import threading
+import hmac
 import config
-from model import LSTMAutoencoder
 from data_processor import DataProcessor
 from anomaly_detector import AnomalyDetector
+from batch_scorer import BatchScorer
+from scoring_pipeline import ScoringPipeline
+from feature_store import UserFeatureStore
+from inference_cache import InferenceCache
+from prefilter import StatisticalPrefilter
+from model_registry import ModelRegistry, ManifestWatcher
+from shadow_scorer import ShadowScorer
+from user_thresholds import UserThresholdService
+from user_adapters import UserAdapterStore, UserAdapterTrainer
 from database import MongoDBManager
 from chatbot import HealthChatbot
 from notification import NotificationManager
@@ -36,10 +45,18 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 model = None
 data_processor = None
 anomaly_detector = None
+batch_scorer = None
+scoring_pipeline = None
 db_manager = None
 chatbot = None
 notification_manager = None
 health_scheduler = None
+model_registry = ModelRegistry()
+active_model_version = None  # 레지스트리에서 로드한 운영 버전 (레지스트리 미사용 시 None)
+manifest_watcher = None
+adapter_trainer = None
+model_swap_status = {"state": "idle"}
+_model_swap_lock = threading.Lock()
 
 
 def convert_numpy_types(obj):
@@ -61,18 +78,21 @@ def convert_numpy_types(obj):
 
 def load_model():
     """모델 로드"""
-    global model, data_processor, anomaly_detector
+    global model, data_processor, anomaly_detector, batch_scorer, scoring_pipeline, active_model_version
     
     # 현재 작업 디렉토리 확인
     current_dir = os.getcwd()
     print(f"현재 작업 디렉토리: {current_dir}")
-    print(f"모델 파일 경로: {config.MODEL_SAVE_PATH}")
+    # MODEL_TYPE=vae면 VariationalLSTMAutoencoder 체크포인트 사용
+    is_vae = config.SERVING_CONFIG.get("model_type", "lstm") == "vae"
+    save_path = config.VAE_MODEL_SAVE_PATH if is_vae else config.MODEL_SAVE_PATH
+    print(f"모델 파일 경로: {save_path}")
     
     # 절대 경로로도 시도
-    model_path = config.MODEL_SAVE_PATH
+    model_path = save_path
     if not os.path.exists(model_path):
         # 상대 경로로 시도
-        model_path = os.path.join(current_dir, config.MODEL_SAVE_PATH)
+        model_path = os.path.join(current_dir, save_path)
         print(f"상대 경로 시도: {model_path}")
     
     if not os.path.exists(model_path):
@@ -81,24 +101,41 @@ def load_model():
         print(f"models 디렉토리 존재 여부: {os.path.exists(models_dir)}")
         if os.path.exists(models_dir):
             print(f"models 디렉토리 내용: {os.listdir(models_dir)}")
-        return False, f"모델 파일을 찾을 수 없습니다. 경로: {config.MODEL_SAVE_PATH}, 현재 디렉토리: {current_dir}"
+        return False, f"모델 파일을 찾을 수 없습니다. 경로: {save_path}, 현재 디렉토리: {current_dir}"
     
     try:
         # 모델 로드
         print(f"모델 파일 로드 시도: {model_path}")
-        checkpoint = torch.load(model_path, map_location='cpu', weights_only=False)
-        
-        # checkpoint에서 input_size 가져오기 (저장된 config 사용)
-        saved_input_size = checkpoint['config'].get('input_size', config.MODEL_CONFIG["input_size"])
-        
-        model = LSTMAutoencoder(
-            input_size=saved_input_size,
-            hidden_size=checkpoint['config']['hidden_size'],
-            num_layers=checkpoint['config']['num_layers'],
-            dropout=checkpoint['config']['dropout']
-        )
-        model.load_state_dict(checkpoint['model_state_dict'])
-        model.eval()
+        # Anomaly Detector 생성 (체크포인트의 모델 구조와 임계값 사용)
+        anomaly_detector = None
+        backend = config.SERVING_CONFIG.get("backend", "eager")
+        if is_vae:
+            # VAE 샘플링 스코어링은 eager 모델로만 서빙 (내보낸 아티팩트와 레지스트리는 LSTMAutoencoder 전용)
+            if backend != "eager":
+                print(f"경고: VAE 모델은 {backend} 백엔드를 지원하지 않아 eager로 서빙합니다.")
+            anomaly_detector = AnomalyDetector.from_checkpoint(model_path)
+            print(f"VAE 모델 로드: 윈도우당 잠재 샘플 {anomaly_detector.num_samples}개")
+        elif backend in ("torchscript", "onnx", "numpy"):
+            # 내보낸 아티팩트로 서빙 (python model_export.py로 생성)
+            meta_path = config.EXPORT_META_PATH
+            if not os.path.exists(meta_path):
+                meta_path = os.path.join(current_dir, config.EXPORT_META_PATH)
+            try:
+                anomaly_detector = AnomalyDetector.from_exported(backend, meta_path=meta_path)
+                print(f"{backend} 아티팩트 로드: {meta_path}")
+            except Exception as e:
+                print(f"경고: {backend} 아티팩트 로드 실패, .pth 체크포인트를 사용합니다: {e}")
+        if anomaly_detector is None:
+            # 모델 레지스트리에 운영 버전이 있으면 우선 사용 (python model_registry.py로 관리)
+            active_version = model_registry.load_manifest().get("active")
+            if active_version:
+                anomaly_detector = _load_registry_detector(active_version)
+                active_model_version = active_version
+                print(f"모델 레지스트리 운영 버전 로드: {active_version}")
+            else:
+                anomaly_detector = _maybe_quantize(AnomalyDetector.from_checkpoint(model_path))
+        model = anomaly_detector.model
+        print(f"모델 파일에서 임계값 로드: {anomaly_detector.threshold:.6f}")
         
         # Data Processor 로드
         data_processor = DataProcessor()
@@ -114,22 +151,57 @@ def load_model():
         
         # feature_names 설정 (5개 특징 고정)
         # heart_rate, steps, sleep, temperature, activity
-        data_processor.feature_names = ['heart_rate', 'steps', 'sleep', 'temperature', 'activity']
+        data_processor.feature_names = list(config.FEATURE_NAMES)
         print(f"feature_names 설정: {data_processor.feature_names}")
         
-        # Anomaly Detector 생성
-        anomaly_detector = AnomalyDetector(model)
-        
-        # 임계값 설정 (모델 파일에서 로드 또는 기본값 사용)
-        if 'threshold' in checkpoint:
-            # 모델 파일에 저장된 임계값 사용
-            anomaly_detector.threshold = checkpoint['threshold']
-            print(f"모델 파일에서 임계값 로드: {anomaly_detector.threshold:.6f}")
+        # 배치 스코어러 생성 (동시 요청을 모아 한 번에 추론)
+        if config.BATCH_CONFIG.get("enabled", True):
+            batch_scorer = BatchScorer(anomaly_detector)
+            print(f"배치 추론 활성화: 최대 {batch_scorer.max_batch_size}개, "
+                  f"최대 대기 {batch_scorer.max_wait * 1000:.1f}ms")
         else:
-            # 기본 임계값 사용
-            min_threshold = config.ANOMALY_CONFIG.get("min_threshold", 0.01)
-            anomaly_detector.threshold = min_threshold
-            print(f"기본 임계값 사용: {min_threshold:.4f}")
+            batch_scorer = None
+        
+        # 사용자별 최근 정규화 행 링 버퍼 (클라이언트가 새 샘플만 보내는 증분 모드)
+        feature_store = None
+        if config.FEATURE_STORE_CONFIG.get("enabled", True):
+            feature_store = UserFeatureStore(n_features=len(data_processor.feature_names))
+            print(f"사용자 특징 저장소 활성화: 최대 {feature_store.max_users}명")
+        
+        # 같은 정규화 윈도우 재요청 시 추론을 생략하는 결과 캐시 (모델 버전/임계값 변경 시 무효화)
+        result_cache = None
+        if config.CACHE_CONFIG.get("enabled", True):
+            result_cache = InferenceCache()
+            print(f"추론 결과 캐시 활성화: 최대 {result_cache.max_entries}개, TTL {result_cache.ttl}초")
+        
+        # 명백히 정상인 윈도우의 LSTM 추론을 생략하는 통계 사전 필터 (보정 세트가 있으면 통계 초기화)
+        prefilter = None
+        if config.PREFILTER_CONFIG.get("enabled", False):
+            prefilter = StatisticalPrefilter(num_features=len(data_processor.feature_names))
+            if os.path.exists(config.CALIBRATION_SET_PATH):
+                prefilter.fit(np.load(config.CALIBRATION_SET_PATH))
+            print(f"통계 사전 필터 활성화: z <= {prefilter.z_limit}, 감사 비율 {prefilter.audit_rate}")
+        
+        # 사용자별 적응형 임계값 (MongoDB 연결은 initialize_services()에서 지정)
+        threshold_service = None
+        if config.USER_THRESHOLD_CONFIG.get("enabled", True):
+            threshold_service = UserThresholdService()
+            print(f"사용자별 임계값 활성화: {threshold_service.quantile} 분위, "
+                  f"최소 {threshold_service.min_samples}개 샘플")
+        
+        # 사용자별 output 레이어 어댑터 (학습 작업과 MongoDB 연결은 initialize_services()에서 지정)
+        adapter_store = None
+        if config.USER_ADAPTER_CONFIG.get("enabled", True):
+            adapter_store = UserAdapterStore()
+            print(f"사용자 어댑터 활성화: 최소 {config.USER_ADAPTER_CONFIG['min_windows']}개 윈도우, "
+                  f"모델 어댑터 지원 {'O' if anomaly_detector.supports_adapters else 'X'}")
+        
+        # 세 엔드포인트가 공유하는 스코어링 파이프라인
+        scoring_pipeline = ScoringPipeline(
+            data_processor, anomaly_detector,
+            batch_scorer=batch_scorer, feature_store=feature_store, result_cache=result_cache,
+            threshold_service=threshold_service, prefilter=prefilter, adapter_store=adapter_store
+        )
         
         return True, "모델 로드 완료"
     except Exception as e:
@@ -137,9 +209,98 @@ def load_model():
         return False, f"모델 로드 실패: {str(e)}\n{traceback.format_exc()}"
 
 
-def initialize_services():
-    """서비스 초기화"""
-    global db_manager, chatbot, notification_manager, health_scheduler
+def _maybe_quantize(detector):
+    """동적 int8 양자화 (SERVING_CONFIG["quantize"], 보정 세트 검증 실패 시 fp32 유지)"""
+    if not config.SERVING_CONFIG.get("quantize", False):
+        return detector
+    from quantization import build_quantized_detector
+    detector, quant_report = build_quantized_detector(detector)
+    print(f"양자화 모드: {quant_report['mode']} ({quant_report})")
+    return detector
+
+
+def _load_registry_detector(version: str):
+    """레지스트리 버전의 체크포인트로 AnomalyDetector 생성 (양자화 설정 적용)"""
+    return _maybe_quantize(model_registry.load_detector(version))
+
+
+def swap_model(version: str):
+    """
+    레지스트리 버전으로 운영 모델 교체 (무중단)
+    
+    새 모델을 요청 경로 밖에서 로드한 뒤 전역 파이프라인 참조만 한 번에 바꾼다.
+    처리 중인 요청은 이전 파이프라인으로 끝까지 처리되고, 이전 배치 스코어러는 잠시 후 정리된다.
+    """
+    global model, anomaly_detector, batch_scorer, scoring_pipeline, active_model_version
+    
+    with _model_swap_lock:
+        if scoring_pipeline is None:
+            raise RuntimeError("모델이 로드되지 않았습니다.")
+        if version == active_model_version:
+            return  # 관리자 요청과 manifest 감시가 같은 변경을 동시에 처리한 경우
+        model_swap_status.update({"state": "loading", "version": version,
+                                  "started_at": datetime.now().isoformat()})
+        try:
+            new_detector = _load_registry_detector(version)
+        except Exception as e:
+            model_swap_status.update({"state": "failed", "error": str(e)})
+            raise
+        new_batch_scorer = BatchScorer(new_detector) if config.BATCH_CONFIG.get("enabled", True) else None
+        new_pipeline = scoring_pipeline.with_detector(new_detector, batch_scorer=new_batch_scorer)
+        
+        old_batch_scorer = batch_scorer
+        # 요청 핸들러는 scoring_pipeline을 한 번만 참조하므로 이 대입이 교체 시점
+        scoring_pipeline = new_pipeline
+        anomaly_detector = new_detector
+        model = new_detector.model
+        batch_scorer = new_batch_scorer
+        active_model_version = version
+        model_swap_status.update({"state": "ready", "finished_at": datetime.now().isoformat(),
+                                  "threshold": float(new_detector.threshold)})
+        model_swap_status.pop("error", None)
+    
+    if old_batch_scorer is not None:
+        timer = threading.Timer(config.MODEL_REGISTRY_CONFIG["swap_drain_seconds"], old_batch_scorer.stop)
+        timer.daemon = True
+        timer.start()
+    print(f"운영 모델 교체 완료: {version} (임계값 {new_detector.threshold:.6f})", flush=True)
+
+
+def set_shadow_model(version: str = None, sample_rate: float = None):
+    """섀도 스코어링 후보 모델 지정 (None이면 해제)"""
+    if scoring_pipeline is None:
+        return
+    old_shadow = scoring_pipeline.shadow_scorer
+    if old_shadow is not None and old_shadow.version == version \
+            and (sample_rate is None or old_shadow.sample_rate == sample_rate):
+        return
+    new_shadow = None
+    if version is not None:
+        new_shadow = ShadowScorer(_load_registry_detector(version), version=version,
+                                  sample_rate=sample_rate)
+    scoring_pipeline.shadow_scorer = new_shadow
+    if old_shadow is not None:
+        old_shadow.stop()
+    print(f"섀도 스코어링 후보: {version}" if version else "섀도 스코어링 해제", flush=True)
+
+
+def _on_manifest_change(manifest):
+    """manifest 변경 시 운영 버전 / 섀도 후보를 이 워커에 반영"""
+    active = manifest.get("active")
+    if active and active != active_model_version:
+        swap_model(active)
+    set_shadow_model(manifest.get("candidate"), manifest.get("shadow_sample_rate"))
+
+
+def initialize_services(start_scheduler: bool = True):
+    """
+    서비스 초기화
+    
+    Args:
+        start_scheduler: 건강 상태 체크 스케줄러 시작 여부
+                         (gunicorn 멀티 워커에서는 잠금을 획득한 워커 하나만 시작)
+    """
+    global db_manager, chatbot, notification_manager, health_scheduler, manifest_watcher, adapter_trainer
     
     # 서버 시작 시 이메일 주소 초기화 (재시작 시마다 비어있게)
     config.NOTIFICATION_CONFIG["user_emails"] = {}
@@ -154,6 +315,18 @@ def initialize_services():
         print(f"MongoDB 연결 실패: {e}")
         db_manager = None
     
+    # 사용자별 임계값 스케치 저장소 (MongoDB가 없으면 메모리에만 보관)
+    if scoring_pipeline is not None and scoring_pipeline.threshold_service is not None:
+        scoring_pipeline.threshold_service.db_manager = db_manager
+    
+    # 사용자 어댑터: 저장된 센서 로그로 백그라운드 학습 (주기 작업은 스케줄러를 실행하는 워커 하나만)
+    if scoring_pipeline is not None and scoring_pipeline.adapter_store is not None:
+        scoring_pipeline.adapter_store.db_manager = db_manager
+        if db_manager is not None and adapter_trainer is None:
+            adapter_trainer = UserAdapterTrainer(lambda: scoring_pipeline, db_manager,
+                                                 scoring_pipeline.adapter_store)
+            adapter_trainer.start(periodic=start_scheduler)
+    
     # 챗봇 초기화
     chatbot = HealthChatbot(use_openai=bool(config.OPENAI_API_KEY))
     
@@ -168,7 +341,24 @@ def initialize_services():
         print(f"알림 시스템 초기화 실패: {e}")
         notification_manager = None
     
+    # 모델 레지스트리 manifest 감시 (다른 워커나 CLI에서 변경한 운영 버전 / 섀도 후보 반영)
+    if manifest_watcher is None and scoring_pipeline is not None \
+            and config.SERVING_CONFIG.get("backend", "eager") == "eager" \
+            and config.MODEL_REGISTRY_CONFIG["watch_interval_seconds"] > 0:
+        try:
+            manifest = model_registry.load_manifest()
+            if manifest.get("candidate"):
+                set_shadow_model(manifest["candidate"], manifest.get("shadow_sample_rate"))
+        except Exception as e:
+            print(f"섀도 스코어링 초기화 실패: {e}")
+        manifest_watcher = ManifestWatcher(model_registry, _on_manifest_change)
+        manifest_watcher.start()
+    
     # 건강 상태 체크 스케줄러 초기화
+    if not start_scheduler:
+        print("건강 상태 체크 스케줄러는 다른 워커에서 실행 중입니다.")
+        health_scheduler = None
+        return
     try:
         health_scheduler = HealthCheckScheduler(
             db_manager=db_manager,
@@ -181,6 +371,80 @@ def initialize_services():
         health_scheduler = None
 
 
+_scheduler_lock_file = None
+
+
+def _acquire_scheduler_lock() -> bool:
+    """
+    워커 간 스케줄러 중복 실행 방지용 파일 잠금 (프로세스가 종료되면 자동 해제)
+    
+    Returns:
+        잠금 획득 여부 (fcntl이 없는 환경에서는 항상 True)
+    """
+    global _scheduler_lock_file
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    lock_file = open(config.SERVER_CONFIG["scheduler_lock_path"], 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _scheduler_lock_file = lock_file  # 프로세스 수명 동안 잠금 유지
+    return True
+
+
+def prepare_for_fork():
+    """
+    gunicorn preload 모드: 마스터에서 워커 fork 직전에 호출
+    
+    모델 파라미터를 공유 메모리로 옮기고, 지금까지 생성된 객체를 GC 추적 대상에서 제외하여
+    워커가 가중치와 모듈 객체를 copy-on-write로 복제 없이 공유하도록 한다.
+    """
+    import gc
+    if anomaly_detector is not None:
+        anomaly_detector.share_memory()
+    gc.collect()
+    gc.freeze()
+
+
+def init_worker():
+    """
+    gunicorn preload 모드: fork된 각 워커에서 호출
+    
+    MongoDB 클라이언트와 스레드는 fork 이후에 생성해야 하므로 서비스는 워커에서 초기화하고,
+    스케줄러는 잠금을 획득한 워커 하나에서만 시작한다.
+    """
+    try:
+        initialize_services(start_scheduler=_acquire_scheduler_lock())
+        print(f"워커 서비스 초기화 완료 (pid {os.getpid()})", flush=True)
+    except Exception as e:
+        print(f"워커 서비스 초기화 중 오류 발생: {str(e)}", flush=True)
+
+
+def shutdown_services():
+    """스케줄러 종료 및 MongoDB 연결 종료"""
+    if health_scheduler:
+        health_scheduler.stop()
+    if manifest_watcher:
+        manifest_watcher.stop()
+    if adapter_trainer:
+        adapter_trainer.stop()
+    if scoring_pipeline is not None and scoring_pipeline.shadow_scorer is not None:
+        scoring_pipeline.shadow_scorer.stop()
+    if scoring_pipeline is not None and scoring_pipeline.threshold_service is not None:
+        try:
+            scoring_pipeline.threshold_service.flush()
+        except Exception as e:
+            print(f"사용자 임계값 저장 실패: {e}")
+    if batch_scorer:
+        batch_scorer.stop()
+    if db_manager:
+        db_manager.disconnect()
+
+
 # 앱 시작 시 모델 및 서비스 초기화 (gunicorn에서도 실행되도록)
 # 함수 정의 후에 호출해야 함
 import sys
@@ -206,15 +470,19 @@ except Exception as e:
     print(traceback.format_exc(), flush=True)
     success = False
 
-# 서비스 초기화
-try:
-    initialize_services()
-    print("서비스 초기화 완료", flush=True)
-    sys.stdout.flush()
-except Exception as e:
-    print(f"서비스 초기화 중 오류 발생: {str(e)}", flush=True)
-    import traceback
-    print(traceback.format_exc(), flush=True)
+# 서비스 초기화 (gunicorn preload 모드에서는 fork 이후 각 워커의 init_worker()에서 초기화)
+if config.SERVER_CONFIG["defer_services"]:
+    print("백그라운드 서비스는 워커 fork 이후 시작합니다. (preload 모드)", flush=True)
+else:
+    try:
+        # preload 없이 워커마다 import하는 경우에도 스케줄러는 잠금을 획득한 프로세스 하나에서만 실행
+        initialize_services(start_scheduler=_acquire_scheduler_lock())
+        print("서비스 초기화 완료", flush=True)
+        sys.stdout.flush()
+    except Exception as e:
+        print(f"서비스 초기화 중 오류 발생: {str(e)}", flush=True)
+        import traceback
+        print(traceback.format_exc(), flush=True)
 
 print("=" * 50, flush=True)
 sys.stdout.flush()
@@ -279,55 +547,16 @@ def predict():
         if not isinstance(sensor_data, list):
             return jsonify({"error": "sensor_data는 배열이어야 합니다."}), 400
         
-        # 시계열 데이터 준비
-        # sensor_data를 시퀀스로 변환
-        sequence_length = config.MODEL_CONFIG["sequence_length"]
-        
+        # 이상 탐지 (패딩, 특징 추출, 정규화, 단일 forward pass 스코어링)
         # 데이터가 부족하면 마지막 데이터로 자동 채우기
-        if len(sensor_data) < sequence_length:
-            if len(sensor_data) > 0:
-                import copy
-                last_data = sensor_data[-1]
-                # 마지막 데이터를 복사하여 60개까지 채우기
-                while len(sensor_data) < sequence_length:
-                    if isinstance(last_data, dict):
-                        sensor_data.append(copy.deepcopy(last_data))
-                    else:
-                        sensor_data.append(last_data)
-            else:
-                return jsonify({
-                    "error": f"최소 1개의 데이터 포인트가 필요합니다."
-                }), 400
-        
-        # 특징 추출 (리스트 컴프리헨션으로 최적화)
-        feature_values = [
-            [float(sd.get(feature_name, 0.0)) for feature_name in data_processor.feature_names]
-            for sd in sensor_data[-sequence_length:]  # 최근 sequence_length개만 사용
-        ]
-        
-        # 전처리 (메모리 최적화 - float32 사용)
-        feature_array = np.array(feature_values, dtype=np.float32)
-        feature_array_normalized = data_processor.normalize(feature_array, fit=False)
-        feature_array_normalized = feature_array_normalized.reshape(1, sequence_length, -1).astype(np.float32)
-        
-        # 이상 탐지 (최적화: 모델 추론을 한 번만 실행하고 특징 분석도 함께 수행)
-        # feature_names가 있는 경우에만 특징 분석 포함
-        include_analysis = bool(data_processor.feature_names and len(data_processor.feature_names) > 0)
-        
-        try:
-            anomaly_result = anomaly_detector.detect_single(
-                feature_array_normalized,
-                include_feature_analysis=include_analysis,
-                feature_names=data_processor.feature_names if include_analysis else None
-            )
-        except Exception as e:
-            # 특징 분석 실패 시 기본 이상 탐지만 수행
-            print(f"특징 분석 중 오류 발생, 기본 이상 탐지만 수행: {e}")
-            anomaly_result = anomaly_detector.detect_single(
-                feature_array_normalized,
-                include_feature_analysis=False,
-                feature_names=None
-            )
+        # incremental=true면 새 샘플만 받아 서버의 사용자별 버퍼로 윈도우 구성
+        incremental = bool(data.get("incremental", False))
+        if user_id and scoring_pipeline.feature_store is not None:
+            anomaly_result = scoring_pipeline.score_user(user_id, sensor_data, incremental=incremental)
+        elif incremental:
+            return jsonify({"error": "증분 모드에는 user_id와 사용자 특징 저장소가 필요합니다."}), 400
+        else:
+            anomaly_result = scoring_pipeline.score(sensor_data, padding="last", user_id=user_id)
         
         # 특징별 분석 결과 추출
         feature_analysis = anomaly_result.get("feature_analysis", {})
@@ -371,10 +600,21 @@ def predict():
             "anomaly_score": anomaly_result["anomaly_score"],
             "reconstruction_error": anomaly_result["reconstruction_error"],
             "threshold": anomaly_result["threshold"],
+            "threshold_source": anomaly_result.get("threshold_source", "global"),
             "feature_analysis": feature_analysis,
             "chatbot_feedback": feedback,
             "timestamp": datetime.now().isoformat()
         }
+        if "reconstruction_error_std" in anomaly_result:
+            # VAE 모델: 잠재 샘플 간 재구성 오차 표준편차 (판정 불확실성)
+            response["reconstruction_error_std"] = float(anomaly_result["reconstruction_error_std"])
+        if "adapter_version" in anomaly_result:
+            # 사용자 어댑터를 적용해 스코어링한 경우
+            response["adapter_version"] = anomaly_result["adapter_version"]
+        
+        # 윈도우에 포함된 실제 데이터 행 수 (사용자별 버퍼 사용 시)
+        if "buffered_rows" in anomaly_result:
+            response["buffered_rows"] = anomaly_result["buffered_rows"]
         
         # 알림 결과 추가
         if notification_result:
@@ -624,6 +864,125 @@ def health():
     return jsonify(status)
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """추론 성능 지표 조회 (배치 채움 정도, 캐시 적중률 등)"""
+    feature_store = scoring_pipeline.feature_store if scoring_pipeline else None
+    result_cache = scoring_pipeline.result_cache if scoring_pipeline else None
+    shadow_scorer = scoring_pipeline.shadow_scorer if scoring_pipeline else None
+    threshold_service = scoring_pipeline.threshold_service if scoring_pipeline else None
+    prefilter = scoring_pipeline.prefilter if scoring_pipeline else None
+    adapter_store = scoring_pipeline.adapter_store if scoring_pipeline else None
+    return jsonify({
+        "model_version": active_model_version,
+        "batch_scorer": batch_scorer.get_metrics() if batch_scorer else None,
+        "feature_store": feature_store.get_metrics() if feature_store else None,
+        "inference_cache": result_cache.get_metrics() if result_cache else None,
+        "shadow": shadow_scorer.get_metrics() if shadow_scorer else None,
+        "user_thresholds": threshold_service.get_metrics() if threshold_service else None,
+        "prefilter": prefilter.get_metrics() if prefilter else None,
+        "user_adapters": adapter_store.get_metrics() if adapter_store else None,
+        "adapter_trainer": adapter_trainer.get_metrics() if adapter_trainer else None
+    })
+
+
+def _admin_auth_error():
+    """관리자 토큰 검사 (X-Admin-Token 헤더 또는 Authorization: Bearer). 통과 시 None"""
+    if not config.ADMIN_TOKEN:
+        return jsonify({"error": "관리자 API가 비활성화되어 있습니다. (ADMIN_TOKEN 환경 변수 설정 필요)"}), 403
+    token = request.headers.get("X-Admin-Token", "")
+    auth_header = request.headers.get("Authorization", "")
+    if not token and auth_header.startswith("Bearer "):
+        token = auth_header[len("Bearer "):]
+    if not hmac.compare_digest(token, config.ADMIN_TOKEN):
+        return jsonify({"error": "관리자 인증에 실패했습니다."}), 401
+    return None
+
+
+@app.route('/admin/models', methods=['GET'])
+def admin_list_models():
+    """등록된 모델 버전, 이 워커의 운영 버전, 교체 상태, 섀도 스코어링 지표 조회"""
+    auth_error = _admin_auth_error()
+    if auth_error:
+        return auth_error
+    shadow_scorer = scoring_pipeline.shadow_scorer if scoring_pipeline else None
+    return jsonify({
+        "manifest": model_registry.load_manifest(),
+        "loaded_version": active_model_version,
+        "swap_status": model_swap_status,
+        "shadow": shadow_scorer.get_metrics() if shadow_scorer else None
+    })
+
+
+@app.route('/admin/models/activate', methods=['POST'])
+def admin_activate_model():
+    """
+    운영 모델 버전 교체
+    
+    Request Body: {"version": "v2"}
+    manifest를 갱신하고 이 워커에서는 백그라운드로 즉시 교체 (다른 워커는 manifest 감시로 반영)
+    """
+    auth_error = _admin_auth_error()
+    if auth_error:
+        return auth_error
+    version = (request.get_json(silent=True) or {}).get("version")
+    if not version:
+        return jsonify({"error": "version이 필요합니다."}), 400
+    try:
+        model_registry.activate(version)
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 404
+    
+    def _swap():
+        try:
+            swap_model(version)
+        except Exception as e:
+            print(f"운영 모델 교체 실패 ({version}): {e}", flush=True)
+    
+    threading.Thread(target=_swap, name="model-swap", daemon=True).start()
+    return jsonify({"success": True, "version": version, "state": "loading"}), 202
+
+
+@app.route('/admin/models/shadow', methods=['POST'])
+def admin_set_shadow_model():
+    """
+    섀도 스코어링 후보 지정
+    
+    Request Body: {"version": "v3", "sample_rate": 0.1} (version이 null이면 해제)
+    """
+    auth_error = _admin_auth_error()
+    if auth_error:
+        return auth_error
+    data = request.get_json(silent=True) or {}
+    version = data.get("version")
+    sample_rate = data.get("sample_rate")
+    try:
+        sample_rate = None if sample_rate is None else float(sample_rate)
+        if sample_rate is not None and not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate는 0~1 사이여야 합니다.")
+        model_registry.set_candidate(version, sample_rate=sample_rate)
+        manifest = model_registry.load_manifest()
+        set_shadow_model(manifest.get("candidate"), manifest.get("shadow_sample_rate"))
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"success": True, "candidate": version,
+                    "sample_rate": manifest.get("shadow_sample_rate")})
+
+
+@app.route('/admin/adapters/<user_id>', methods=['POST'])
+def admin_fit_user_adapter(user_id):
+    """사용자 어댑터 백그라운드 학습 요청 (결과는 /metrics의 adapter_trainer.last_report)"""
+    auth_error = _admin_auth_error()
+    if auth_error:
+        return auth_error
+    if adapter_trainer is None:
+        return jsonify({"error": "사용자 어댑터 학습이 비활성화되어 있습니다. (MongoDB 연결 필요)"}), 503
+    adapter_trainer.request(user_id)
+    return jsonify({"success": True, "user_id": user_id, "state": "queued"}), 202
+
+
 @app.route('/get_notifications/<user_id>', methods=['GET'])
 def get_notifications(user_id):
     """
@@ -711,6 +1070,8 @@ def upload_health_data():
     
     file = request.files['file']
     user_id = request.form.get('user_id', 'user001')
+    # 전체 기간 슬라이딩 윈도우 스코어링 옵션 (기본: 최근 60개만)
+    full_history = request.form.get('full_history', 'false').lower() in ('true', '1', 'yes')
     
     if file.filename == '':
         return jsonify({"error": "파일이 선택되지 않았습니다."}), 400
@@ -1446,46 +1807,19 @@ def upload_health_data():
         if not sensor_data:
             return jsonify({"error": "유효한 센서 데이터가 없습니다."}), 400
         
-        # 시계열 데이터 준비
-        sequence_length = config.MODEL_CONFIG["sequence_length"]
-        if len(sensor_data) < sequence_length:
-            # 부족한 데이터는 첫 번째 데이터로 패딩 (0 대신 실제 데이터 복제)
-            padding_needed = sequence_length - len(sensor_data)
-            first_data = sensor_data[0] if sensor_data else {
-                "time": datetime.now().isoformat()[:16],
-                "heart_rate": 65, "steps": 5000, "sleep": 7, "temperature": 36.3, "activity": 300
-            }
-            for i in range(padding_needed):
-                sensor_data.insert(0, {
-                    "time": first_data["time"],
-                    "heart_rate": first_data.get("heart_rate", 65),
-                    "steps": first_data.get("steps", 5000),
-                    "sleep": first_data.get("sleep", 7),
-                    "temperature": first_data.get("temperature", 36.3),
-                    "activity": first_data.get("activity", 300)
-                })
-        
-        # 특징 추출
-        feature_values = []
-        for sd in sensor_data[-sequence_length:]:
-            features = []
-            for feature_name in data_processor.feature_names:
-                features.append(sd.get(feature_name, 0))
-            feature_values.append(features)
-        
-        # 전처리
-        feature_array = np.array(feature_values)
-        feature_array_normalized = data_processor.normalize(feature_array, fit=False)
-        feature_array_normalized = feature_array_normalized.reshape(1, sequence_length, -1)
-        
-        # 이상 탐지
-        anomaly_result = anomaly_detector.detect_single(feature_array_normalized)
-        
-        # 특징별 분석
-        feature_analysis = anomaly_detector.analyze_anomaly_pattern(
-            feature_array_normalized,
-            data_processor.feature_names
-        )
+        # 이상 탐지 및 특징별 분석 (한 번의 forward pass)
+        # 부족한 데이터는 첫 번째 데이터로 패딩 (0 대신 실제 데이터 반복)
+        anomaly_result = scoring_pipeline.score(sensor_data, padding="first", user_id=user_id)
+        feature_analysis = anomaly_result.get("feature_analysis", {})
+        
+        # 전체 기간 이상 점수 타임라인 (요청 시)
+        history_result = None
+        if full_history:
+            try:
+                stride = int(request.form.get('stride', config.HISTORY_CONFIG["default_stride"]))
+            except ValueError:
+                return jsonify({"error": "stride는 정수여야 합니다."}), 400
+            history_result = scoring_pipeline.score_history(sensor_data, stride=stride)
         
         # 챗봇 피드백 생성
         user_data_dict = {
@@ -1527,10 +1861,20 @@ def upload_health_data():
             "anomaly_score": float(anomaly_result["anomaly_score"]),
             "reconstruction_error": float(anomaly_result["reconstruction_error"]),
             "threshold": float(anomaly_result["threshold"]),
+            "threshold_source": anomaly_result.get("threshold_source", "global"),
             "feature_analysis": feature_analysis,
             "chatbot_feedback": feedback,
             "timestamp": datetime.now().isoformat()
         }
+        if "reconstruction_error_std" in anomaly_result:
+            # VAE 모델: 잠재 샘플 간 재구성 오차 표준편차 (판정 불확실성)
+            response["reconstruction_error_std"] = float(anomaly_result["reconstruction_error_std"])
+        if "adapter_version" in anomaly_result:
+            # 사용자 어댑터를 적용해 스코어링한 경우
+            response["adapter_version"] = anomaly_result["adapter_version"]
+        
+        if history_result is not None:
+            response["history"] = history_result
         
         # 알림 결과 추가
         if notification_result:
@@ -1679,46 +2023,10 @@ def sync_healthkit():
         if not sensor_data:
             return jsonify({"error": "유효한 센서 데이터가 없습니다."}), 400
         
-        # 시계열 데이터 준비
-        sequence_length = config.MODEL_CONFIG["sequence_length"]
-        if len(sensor_data) < sequence_length:
-            # 부족한 데이터는 첫 번째 데이터로 패딩 (0 대신 실제 데이터 복제)
-            padding_needed = sequence_length - len(sensor_data)
-            first_data = sensor_data[0] if sensor_data else {
-                "time": datetime.now().isoformat()[:16],
-                "heart_rate": 65, "steps": 5000, "sleep": 7, "temperature": 36.3, "activity": 300
-            }
-            for i in range(padding_needed):
-                sensor_data.insert(0, {
-                    "time": first_data["time"],
-                    "heart_rate": first_data.get("heart_rate", 65),
-                    "steps": first_data.get("steps", 5000),
-                    "sleep": first_data.get("sleep", 7),
-                    "temperature": first_data.get("temperature", 36.3),
-                    "activity": first_data.get("activity", 300)
-                })
-        
-        # 특징 추출
-        feature_values = []
-        for sd in sensor_data[-sequence_length:]:  # 최근 sequence_length개만 사용
-            features = []
-            for feature_name in data_processor.feature_names:
-                features.append(sd.get(feature_name, 0))
-            feature_values.append(features)
-        
-        # 전처리
-        feature_array = np.array(feature_values)
-        feature_array_normalized = data_processor.normalize(feature_array, fit=False)
-        feature_array_normalized = feature_array_normalized.reshape(1, sequence_length, -1)
-        
-        # 이상 탐지
-        anomaly_result = anomaly_detector.detect_single(feature_array_normalized)
-        
-        # 특징별 분석
-        feature_analysis = anomaly_detector.analyze_anomaly_pattern(
-            feature_array_normalized,
-            data_processor.feature_names
-        )
+        # 이상 탐지 및 특징별 분석 (한 번의 forward pass)
+        # 부족한 데이터는 첫 번째 데이터로 패딩 (0 대신 실제 데이터 반복)
+        anomaly_result = scoring_pipeline.score(sensor_data, padding="first", user_id=user_id)
+        feature_analysis = anomaly_result.get("feature_analysis", {})
         
         # 챗봇 피드백 생성
         user_data_dict = {
@@ -1760,10 +2068,17 @@ def sync_healthkit():
             "anomaly_score": float(anomaly_result["anomaly_score"]),
             "reconstruction_error": float(anomaly_result["reconstruction_error"]),
             "threshold": float(anomaly_result["threshold"]),
+            "threshold_source": anomaly_result.get("threshold_source", "global"),
             "feature_analysis": feature_analysis,
             "chatbot_feedback": feedback,
             "timestamp": datetime.now().isoformat()
         }
+        if "reconstruction_error_std" in anomaly_result:
+            # VAE 모델: 잠재 샘플 간 재구성 오차 표준편차 (판정 불확실성)
+            response["reconstruction_error_std"] = float(anomaly_result["reconstruction_error_std"])
+        if "adapter_version" in anomaly_result:
+            # 사용자 어댑터를 적용해 스코어링한 경우
+            response["adapter_version"] = anomaly_result["adapter_version"]
         
         # 알림 결과 추가
         if notification_result:
@@ -2088,11 +2403,7 @@ if __name__ == '__main__':
     except KeyboardInterrupt:
         print("\n서버 종료 중...")
     finally:
-        # 스케줄러 종료
-        if health_scheduler:
-            health_scheduler.stop()
-        # MongoDB 연결 종료
-        if db_manager:
-            db_manager.disconnect()
+        # 스케줄러, 배치 스코어러, MongoDB 연결 종료
+        shutdown_services()
         print("서버가 종료되었습니다.")
 
@@ -0,0 +1,264 @@
+"""
+배치 추론 모듈
+동시에 들어온 단일 윈도우 요청을 짧은 시간 동안 모아 한 번의 forward pass로 처리
+"""
+import os
+import queue
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional
+import config
+from user_adapters import stack_adapters
+
+
+class _PendingRequest:
+    """배치 큐에서 대기 중인 단일 요청"""
+
+    __slots__ = ("X", "include_feature_analysis", "feature_names", "return_error_profiles",
+                 "adapter", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, X: np.ndarray, include_feature_analysis: bool,
+                 feature_names: Optional[List[str]], return_error_profiles: bool = False,
+                 adapter=None):
+        self.X = X
+        self.include_feature_analysis = include_feature_analysis
+        self.feature_names = feature_names
+        self.return_error_profiles = return_error_profiles
+        self.adapter = adapter
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchScorer:
+    """
+    AnomalyDetector 앞단의 마이크로 배치 스코어러
+
+    여러 요청 스레드가 submit()을 호출하면 워커 스레드가 최대 max_wait_ms 동안
+    요청을 모아 [B, sequence_length, features] 텐서로 쌓은 뒤 detect_batch()를 한 번 실행하고,
+    각 호출자에게 자신의 결과 딕셔너리를 돌려준다.
+    """
+
+    def __init__(self, anomaly_detector, max_batch_size: int = None,
+                 max_wait_ms: float = None):
+        """
+        Args:
+            anomaly_detector: AnomalyDetector 인스턴스
+            max_batch_size: 한 번에 추론할 최대 윈도우 수
+            max_wait_ms: 첫 요청 이후 배치를 채우기 위해 기다리는 최대 시간 (밀리초)
+        """
+        self.anomaly_detector = anomaly_detector
+        self.max_batch_size = max(1, int(max_batch_size or config.BATCH_CONFIG["max_batch_size"]))
+        wait_ms = config.BATCH_CONFIG["max_wait_ms"] if max_wait_ms is None else max_wait_ms
+        self.max_wait = max(0.0, float(wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._stopped = False
+        self._inflight = 0  # submit()에 들어와 결과를 기다리는 요청 수
+
+        # 배치 채움 지표
+        self._batch_size_counts = {}  # {배치 크기: 횟수}
+        self._total_requests = 0
+        self._total_batches = 0
+        self._total_wait = 0.0
+        self._max_wait_observed = 0.0
+        self._total_inference = 0.0
+
+    def _ensure_worker(self):
+        """워커 스레드 시작 (fork 이후에도 프로세스마다 새로 시작)"""
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid != pid:
+                # fork로 복사된 큐/카운터는 부모 프로세스의 상태이므로 초기화
+                self._queue = queue.Queue()
+                self._inflight = 0
+            self._stopped = False
+            self._worker = threading.Thread(
+                target=self._run, name="batch-scorer", daemon=True
+            )
+            self._worker_pid = pid
+            self._worker.start()
+
+    def submit(self, X: np.ndarray, include_feature_analysis: bool = False,
+               feature_names: List[str] = None, return_error_profiles: bool = False,
+               timeout: float = None, adapter=None) -> Dict:
+        """
+        단일 윈도우를 배치 큐에 넣고 결과를 기다림 (detect_single과 동일한 결과 형식)
+
+        Args:
+            X: 단일 샘플 [1, sequence_length, features] 또는 [sequence_length, features]
+            include_feature_analysis: 특징별 분석 포함 여부
+            feature_names: 특징 이름 리스트
+            return_error_profiles: True면 특징별/시점별 오차 배열도 포함
+            timeout: 결과 대기 최대 시간 (초, None이면 무제한)
+            adapter: 사용자 어댑터 (UserAdapter, 다른 사용자의 요청과 같은 배치에서 적용)
+
+        Returns:
+            detect_single() 형식의 결과 딕셔너리
+        """
+        if X.ndim == 3:
+            if X.shape[0] != 1:
+                raise ValueError(f"단일 윈도우만 제출할 수 있습니다. (입력 shape: {X.shape})")
+            X = X[0]
+
+        self._ensure_worker()
+        pending = _PendingRequest(
+            np.asarray(X, dtype=np.float32), include_feature_analysis, feature_names,
+            return_error_profiles, adapter
+        )
+        with self._lock:
+            self._inflight += 1
+        try:
+            self._queue.put(pending)
+            if not pending.done.wait(timeout):
+                raise TimeoutError("배치 추론 대기 시간이 초과되었습니다.")
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect_batch(self, first: _PendingRequest) -> List[_PendingRequest]:
+        """첫 요청 이후 max_wait 동안 (또는 배치가 찰 때까지) 요청 수집"""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # 현재 대기 중인 요청이 모두 모였으면 더 기다릴 필요 없음
+            with self._lock:
+                inflight = self._inflight
+            if len(batch) >= inflight and self._queue.empty():
+                break
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """워커 루프"""
+        while not self._stopped:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect_batch(first)
+            stopping = None in batch
+            batch = [p for p in batch if p is not None]
+            self._score(batch)
+            if stopping:
+                break
+
+    def _score(self, batch: List[_PendingRequest]):
+        """
+        수집한 요청을 shape별로 묶어 한 번에 추론하고 결과 분배
+
+        detector가 길이가 다른 윈도우를 지원하면 (supports_lengths) 길이가 달라도 특징 수만 같으면
+        가장 긴 윈도우에 맞춰 0으로 채운 뒤 lengths와 함께 한 번에 추론한다.
+        사용자 어댑터가 있는 요청이 섞여 있어도 같은 배치에서 윈도우별 delta로 적용한다.
+        """
+        started = time.perf_counter()
+        supports_lengths = getattr(self.anomaly_detector, "supports_lengths", False)
+
+        groups = {}
+        for pending in batch:
+            key = pending.X.shape[1:] if supports_lengths else pending.X.shape
+            groups.setdefault(key, []).append(pending)
+
+        for group in groups.values():
+            analysis_request = next(
+                (p for p in group if p.include_feature_analysis and p.feature_names), None
+            )
+            return_error_profiles = any(p.return_error_profiles for p in group)
+            try:
+                X_batch, lengths = _stack_windows([p.X for p in group])
+                results = self.anomaly_detector.detect_batch(
+                    X_batch,
+                    include_feature_analysis=analysis_request is not None,
+                    feature_names=analysis_request.feature_names if analysis_request else None,
+                    return_error_profiles=return_error_profiles,
+                    lengths=lengths,
+                    adapters=stack_adapters([p.adapter for p in group])
+                )
+                for pending, result in zip(group, results):
+                    if not (pending.include_feature_analysis and pending.feature_names):
+                        result.pop("feature_analysis", None)
+                    if not pending.return_error_profiles:
+                        result.pop("feature_errors", None)
+                        result.pop("timestep_errors", None)
+                    pending.result = result
+            except Exception as e:
+                for pending in group:
+                    pending.error = e
+            finally:
+                for pending in group:
+                    pending.done.set()
+
+        finished = time.perf_counter()
+        with self._lock:
+            size = len(batch)
+            self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+            self._total_batches += 1
+            self._total_requests += size
+            self._total_inference += finished - started
+            for pending in batch:
+                waited = started - pending.enqueued_at
+                self._total_wait += waited
+                self._max_wait_observed = max(self._max_wait_observed, waited)
+
+    def stop(self):
+        """워커 스레드 중지"""
+        self._stopped = True
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(timeout=1.0)
+
+    def get_metrics(self) -> Dict:
+        """배치 채움 정도 등 지표 반환"""
+        with self._lock:
+            total_batches = self._total_batches
+            total_requests = self._total_requests
+            avg_batch_size = total_requests / total_batches if total_batches else 0.0
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "total_requests": total_requests,
+                "total_batches": total_batches,
+                "avg_batch_size": avg_batch_size,
+                "avg_fill_ratio": avg_batch_size / self.max_batch_size,
+                "batch_size_histogram": {
+                    str(size): count for size, count in sorted(self._batch_size_counts.items())
+                },
+                "avg_queue_wait_ms": (self._total_wait / total_requests * 1000.0) if total_requests else 0.0,
+                "max_queue_wait_ms": self._max_wait_observed * 1000.0,
+                "avg_batch_inference_ms": (self._total_inference / total_batches * 1000.0) if total_batches else 0.0,
+            }
+
+
+def _stack_windows(windows: List[np.ndarray]):
+    """
+    윈도우 목록을 [B, max_length, features] 배열로 쌓음
+
+    Returns:
+        (X_batch, lengths) - 길이가 모두 같으면 lengths는 None
+    """
+    lengths = np.array([len(window) for window in windows], dtype=np.int64)
+    max_length = int(lengths.max())
+    if np.all(lengths == max_length):
+        return np.stack(windows), None
+    X_batch = np.zeros((len(windows), max_length, windows[0].shape[1]), dtype=np.float32)
+    for i, window in enumerate(windows):
+        X_batch[i, :len(window)] = window
+    return X_batch, lengths
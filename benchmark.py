@@ -0,0 +1,454 @@
+"""
+추론 성능 벤치마크 스크립트 (Flask 없이 실행)
+
+사용 예:
+    python benchmark.py pipeline --requests 200
+    python benchmark.py backends --batch-size 1
+    python benchmark.py quantization
+    python benchmark.py coldstart
+    python benchmark.py varlen --batch-size 32 --min-length 5
+    python benchmark.py vae --samples 1 4 8 16 32 --batch-size 16
+    python benchmark.py featurize --rows 60 --batch-size 16
+    python benchmark.py adapters --batch-size 16
+    python benchmark.py ddp --csv data_cache/train_features.csv --nproc 1 2 4 8
+"""
+import argparse
+import sys
+import time
+import numpy as np
+from typing import Dict, List
+import config
+
+
+def make_sensor_data(n_rows: int, seed: int = 0) -> List[Dict]:
+    """벤치마크용 합성 센서 데이터 생성"""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "heart_rate": float(rng.uniform(55, 100)),
+            "steps": float(rng.integers(0, 400)),
+            "sleep": float(rng.uniform(5, 9)),
+            "temperature": float(rng.uniform(36.0, 37.2)),
+            "activity": float(rng.uniform(0, 500)),
+        }
+        for _ in range(n_rows)
+    ]
+
+
+def report(name: str, timings: List[float]):
+    """지연 시간 요약 출력 (ms)"""
+    arr = np.asarray(timings) * 1000.0
+    print(f"{name:<32} 평균 {arr.mean():8.3f}ms  p50 {np.percentile(arr, 50):8.3f}ms  "
+          f"p95 {np.percentile(arr, 95):8.3f}ms  ({len(arr)}회)")
+
+
+def time_calls(fn, repeats: int, warmup: int = 5) -> List[float]:
+    """fn을 repeats회 호출하며 호출별 소요 시간(초) 측정"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_pipeline(args):
+    """ScoringPipeline 단계별 지연 시간 측정"""
+    from scoring_pipeline import ScoringPipeline
+
+    pipeline = ScoringPipeline.from_files()
+    sensor_data = make_sensor_data(args.rows)
+    window = pipeline.build_window(sensor_data)
+
+    report("build_window", time_calls(lambda: pipeline.build_window(sensor_data), args.requests))
+    report("score_window", time_calls(lambda: pipeline.score_window(window), args.requests))
+    report("score (end-to-end)", time_calls(lambda: pipeline.score(sensor_data), args.requests))
+
+
+def bench_backends(args):
+    """eager / TorchScript / ONNX / NumPy 백엔드별 추론 지연 시간 비교"""
+    from anomaly_detector import AnomalyDetector
+
+    rng = np.random.default_rng(0)
+    X = rng.random((args.batch_size, config.MODEL_CONFIG["sequence_length"],
+                    config.MODEL_CONFIG["input_size"]), dtype=np.float32)
+
+    detectors = {"eager": AnomalyDetector.from_checkpoint(config.MODEL_SAVE_PATH)}
+    for backend in ("torchscript", "onnx", "numpy"):
+        try:
+            detectors[backend] = AnomalyDetector.from_exported(backend)
+        except Exception as e:
+            print(f"[건너뜀] {backend}: {e}")
+
+    for name, detector in detectors.items():
+        report(f"{name} (batch={args.batch_size})",
+               time_calls(lambda: detector.calculate_reconstruction_error(X), args.requests))
+
+
+def _current_rss_mb() -> float:
+    """현재 프로세스 RSS (MB)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    # /proc이 없는 환경 (macOS 등): 최대 RSS로 대체 (macOS는 바이트 단위)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _measure_quantization_mode(mode: str, calibration_path: str, batch_size: int,
+                               requests: int, result_queue):
+    """별도 프로세스에서 fp32/int8 모드의 지연 시간과 RSS 측정"""
+    from anomaly_detector import AnomalyDetector
+    from quantization import build_quantized_detector
+
+    detector = AnomalyDetector.from_checkpoint(config.MODEL_SAVE_PATH)
+    quant_report = {"mode": "fp32"}
+    if mode == "int8":
+        # 지연 시간/메모리 비교가 목적이므로 편차는 통과 여부와 관계없이 결과로만 보고
+        detector, quant_report = build_quantized_detector(
+            detector, calibration_path, tolerance=float("inf")
+        )
+    rng = np.random.default_rng(0)
+    X = rng.random((batch_size, config.MODEL_CONFIG["sequence_length"],
+                    config.MODEL_CONFIG["input_size"]), dtype=np.float32)
+    timings = time_calls(lambda: detector.calculate_reconstruction_error(X), requests)
+    result_queue.put((quant_report, timings, _current_rss_mb()))
+
+
+def bench_quantization(args):
+    """fp32 / 동적 int8 양자화 모드의 지연 시간과 RSS 비교 (모드별 별도 프로세스)"""
+    import multiprocessing as mp
+
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    for mode in ("fp32", "int8"):
+        process = ctx.Process(
+            target=_measure_quantization_mode,
+            args=(mode, args.calibration_path, args.batch_size, args.requests, result_queue)
+        )
+        process.start()
+        quant_report, timings, rss_mb = result_queue.get()
+        process.join()
+
+        if quant_report["mode"] != mode:
+            print(f"[건너뜀] {mode}: {quant_report.get('reason')}")
+            continue
+        report(f"{mode} (batch={args.batch_size})", timings)
+        print(f"{'':<32} RSS {rss_mb:8.1f}MB")
+        if mode == "int8":
+            print(f"{'':<32} 보정 세트 최대 편차 {quant_report['max_deviation']:.4f} "
+                  f"(threshold 대비, 허용 {config.SERVING_CONFIG['quantization_tolerance']})")
+
+
+def _measure_cold_start(backend: str, result_queue):
+    """별도 프로세스에서 백엔드 import + 로드 시간, RSS, torch import 여부 측정"""
+    started = time.perf_counter()
+    from anomaly_detector import AnomalyDetector
+
+    if backend == "eager":
+        detector = AnomalyDetector.from_checkpoint(config.MODEL_SAVE_PATH)
+    else:
+        detector = AnomalyDetector.from_exported(backend)
+    X = np.zeros((1, config.MODEL_CONFIG["sequence_length"],
+                  config.MODEL_CONFIG["input_size"]), dtype=np.float32)
+    detector.calculate_reconstruction_error(X)  # 첫 추론까지 포함
+    elapsed = time.perf_counter() - started
+    result_queue.put((elapsed, _current_rss_mb(), "torch" in sys.modules))
+
+
+def bench_cold_start(args):
+    """백엔드별 콜드 스타트 (import → 첫 추론) 시간과 RSS 비교 (백엔드별 별도 프로세스)"""
+    import multiprocessing as mp
+
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    for backend in ("eager", "torchscript", "onnx", "numpy"):
+        process = ctx.Process(target=_measure_cold_start, args=(backend, result_queue))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"[건너뜀] {backend}: 로드 실패 (python model_export.py로 아티팩트 생성 필요)")
+            continue
+        elapsed, rss_mb, torch_loaded = result_queue.get()
+        print(f"{backend:<32} 첫 추론까지 {elapsed * 1000:8.1f}ms  RSS {rss_mb:8.1f}MB  "
+              f"torch import {'O' if torch_loaded else 'X'}")
+
+
+def bench_variable_length(args):
+    """
+    길이가 다른 윈도우 배치: 행 복제 패딩 / packed sequence (lengths) / 길이별 분할 추론 비교
+    """
+    from anomaly_detector import AnomalyDetector
+
+    sequence_length = config.MODEL_CONFIG["sequence_length"]
+    input_size = config.MODEL_CONFIG["input_size"]
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(args.min_length, sequence_length + 1, size=args.batch_size)
+    X = np.zeros((args.batch_size, sequence_length, input_size), dtype=np.float32)
+    for i, length in enumerate(lengths):
+        X[i, :length] = rng.random((length, input_size), dtype=np.float32)
+    # 기존 방식: 마지막 행을 sequence_length까지 복제
+    index = np.minimum(np.arange(sequence_length)[None, :], lengths[:, None] - 1)
+    X_padded = np.take_along_axis(X, index[:, :, None], axis=1)
+    print(f"배치 {args.batch_size}개, 길이 {lengths.min()}~{lengths.max()} (평균 {lengths.mean():.1f})")
+
+    detectors = {"eager": AnomalyDetector.from_checkpoint(config.MODEL_SAVE_PATH)}
+    try:
+        detectors["numpy"] = AnomalyDetector.from_exported("numpy")
+    except Exception as e:
+        print(f"[건너뜀] numpy: {e}")
+
+    for name, detector in detectors.items():
+        padded_errors = detector.calculate_reconstruction_error(X_padded)
+        packed_errors = detector.calculate_reconstruction_error(X, lengths)
+        report(f"{name} padded (행 복제)",
+               time_calls(lambda: detector.calculate_reconstruction_error(X_padded), args.requests))
+        report(f"{name} packed (lengths)",
+               time_calls(lambda: detector.calculate_reconstruction_error(X, lengths), args.requests))
+        report(f"{name} 길이별 분할",
+               time_calls(lambda: detector._reconstruct_by_length(X, lengths), args.requests))
+        changed = np.mean((padded_errors > detector.threshold) != (packed_errors > detector.threshold))
+        print(f"{'':<32} padded 대비 오차 변화 평균 "
+              f"{np.mean(np.abs(packed_errors - padded_errors) / padded_errors):.1%}, 판정 변경 {changed:.1%}")
+
+
+def bench_vae_sampling(args):
+    """
+    VAE 불확실성 스코어링: 잠재 샘플 수 K별 지연 시간 (배치 decoder 1회 vs 샘플마다 forward 반복)
+    """
+    import os
+    import torch
+    from anomaly_detector import AnomalyDetector
+    from model import VariationalLSTMAutoencoder
+
+    if os.path.exists(config.VAE_MODEL_SAVE_PATH):
+        detector = AnomalyDetector.from_checkpoint(config.VAE_MODEL_SAVE_PATH)
+    else:
+        # 지연 시간만 측정하므로 학습된 체크포인트가 없으면 무작위 가중치 사용
+        print(f"{config.VAE_MODEL_SAVE_PATH} 없음: 무작위 초기화 VAE로 측정합니다")
+        torch.manual_seed(0)
+        detector = AnomalyDetector(VariationalLSTMAutoencoder(
+            input_size=config.MODEL_CONFIG["input_size"],
+            hidden_size=config.MODEL_CONFIG["hidden_size"],
+            num_layers=config.MODEL_CONFIG["num_layers"],
+            dropout=config.MODEL_CONFIG["dropout"],
+        ), threshold=1.0)
+    model = detector.model
+    rng = np.random.default_rng(0)
+    X = rng.random((args.batch_size, config.MODEL_CONFIG["sequence_length"],
+                    config.MODEL_CONFIG["input_size"]), dtype=np.float32)
+    X_tensor = torch.from_numpy(X)
+
+    def forward_loop(num_samples):
+        # 기존 방식: 샘플마다 encoder + decoder 전체 forward
+        with torch.inference_mode():
+            return torch.stack([model(X_tensor)[0] for _ in range(num_samples)], dim=1)
+
+    print(f"배치 {args.batch_size}개")
+    for num_samples in args.samples:
+        report(f"K={num_samples} 배치 샘플링",
+               time_calls(lambda: detector.sample_reconstructions(X, num_samples), args.requests))
+        report(f"K={num_samples} forward 반복",
+               time_calls(lambda: forward_loop(num_samples), args.requests))
+
+
+def bench_featurize(args):
+    """
+    요청 시점 특징 추출: 기존 경로 (리스트 → np.array → MinMaxScaler.transform → 패딩) vs FeatureKernel
+    """
+    import pandas as pd
+    from featurizer import FeatureKernel
+    from scoring_pipeline import ScoringPipeline
+
+    pipeline = ScoringPipeline.from_files()
+    scaler = pipeline.data_processor.scaler
+    names = pipeline.feature_names
+    sequence_length = pipeline.sequence_length
+    kernel = FeatureKernel(scaler, names)
+    sensor_data = make_sensor_data(args.rows)
+    short_data = sensor_data[:max(1, args.rows // 4)]
+    batch = [make_sensor_data(args.rows, seed=i) for i in range(args.batch_size)]
+
+    def legacy_featurize(rows):
+        feature_array = np.array([[float(row.get(name, 0.0)) for name in names] for row in rows],
+                                 dtype=np.float32).reshape(len(rows), len(names))
+        return scaler.transform(feature_array).astype(np.float32, copy=False)
+
+    def legacy_window(rows):
+        return pipeline.pad_window(legacy_featurize(rows[-sequence_length:]), "last")
+
+    def legacy_single(raw_data):
+        df_features = pd.DataFrame([raw_data])[names]
+        return scaler.transform(df_features.fillna(df_features.mean()).values)[0]
+
+    window_buffer = np.empty((sequence_length, len(names)), dtype=np.float32)
+    batch_buffer = np.empty((len(batch), sequence_length, len(names)), dtype=np.float32)
+    pipeline.variable_length = False
+    assert np.array_equal(legacy_window(short_data), kernel.build_window(short_data, sequence_length))
+
+    print(f"요청당 {args.rows}행, 짧은 요청 {len(short_data)}행, 배치 {args.batch_size}개")
+    report("기존 featurize", time_calls(lambda: legacy_featurize(sensor_data), args.requests))
+    report("커널 transform_rows", time_calls(lambda: kernel.transform_rows(sensor_data), args.requests))
+    report("기존 윈도우 (짧은 요청 + 패딩)", time_calls(lambda: legacy_window(short_data), args.requests))
+    report("커널 build_window (버퍼 재사용)",
+           time_calls(lambda: kernel.build_window(short_data, sequence_length, out=window_buffer), args.requests))
+    report("기존 배치 (윈도우 + np.stack)",
+           time_calls(lambda: np.stack([legacy_window(rows) for rows in batch]), args.requests))
+    report("커널 build_batch (버퍼 재사용)",
+           time_calls(lambda: kernel.build_batch(batch, sequence_length, out=batch_buffer), args.requests))
+    report("기존 preprocess_single_window (pandas)",
+           time_calls(lambda: legacy_single(sensor_data[0]), args.requests))
+    report("커널 단일 행", time_calls(lambda: kernel.transform_rows(sensor_data[:1]), args.requests))
+
+
+def bench_adapters(args):
+    """
+    사용자 어댑터 적용 비용: 어댑터 없음 / 배치의 일부 / 전체 윈도우에 서로 다른 어댑터
+    """
+    from anomaly_detector import AnomalyDetector
+    from user_adapters import UserAdapter, stack_adapters
+
+    detector = AnomalyDetector.from_checkpoint(config.MODEL_SAVE_PATH)
+    if not detector.supports_adapters:
+        print("현재 모델 백엔드는 사용자 어댑터를 지원하지 않습니다.")
+        return
+    rng = np.random.default_rng(0)
+    X = rng.random((args.batch_size, config.MODEL_CONFIG["sequence_length"],
+                    config.MODEL_CONFIG["input_size"]), dtype=np.float32)
+    output = detector.model.output
+    adapters = [
+        UserAdapter(rng.normal(0, 0.01, output.weight.shape), rng.normal(0, 0.01, output.bias.shape),
+                    detector.model_version)
+        for _ in range(args.batch_size)
+    ]
+    print(f"배치 {args.batch_size}개, 어댑터 {adapters[0].nbytes}바이트/사용자")
+    report("어댑터 없음", time_calls(lambda: detector.detect_batch(X), args.requests))
+    for ratio in args.ratios:
+        count = int(round(args.batch_size * ratio))
+        stacked = stack_adapters(adapters[:count] + [None] * (args.batch_size - count))
+        report(f"어댑터 {count}/{args.batch_size}개 윈도우",
+               time_calls(lambda: detector.detect_batch(X, adapters=stacked), args.requests))
+
+
+def bench_ddp_scaling(args):
+    """
+    train.py --nproc N 학습 처리량 비교 (N별 별도 실행, 임시 경로에 저장한 체크포인트의 학습 기록 사용)
+
+    --batch-size는 프로세스당 배치이므로 전역 배치는 N배가 된다.
+    """
+    import os
+    import subprocess
+    import tempfile
+    import torch
+
+    cpus = os.cpu_count() or 1
+    print(f"CPU 코어 {cpus}개, 프로세스당 배치 {args.batch_size}, epoch {args.epochs}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for nproc in args.nproc:
+            output = os.path.join(workdir, f"model_{nproc}.pth")
+            command = [
+                sys.executable, "train.py", "--csv", args.csv, "--nproc", str(nproc),
+                "--epochs", str(args.epochs), "--batch-size", str(args.batch_size),
+                "--stride", str(args.stride), "--patience", str(args.epochs),
+                "--num-workers", str(args.num_workers),
+                "--output", output,
+                "--scaler-output", os.path.join(workdir, f"scaler_{nproc}.pkl"),
+                "--state-path", os.path.join(workdir, f"state_{nproc}.pth"),
+            ]
+            if args.out_of_core:
+                command.append("--out-of-core")
+            started = time.perf_counter()
+            result = subprocess.run(command, capture_output=True, text=True)
+            elapsed = time.perf_counter() - started
+            if result.returncode != 0:
+                print(f"[실패] nproc={nproc}: {result.stderr.strip().splitlines()[-1:]}")
+                continue
+            training = torch.load(output, map_location="cpu", weights_only=False)["training"]
+            # 첫 epoch은 워커 시작 비용이 섞이므로 이후 epoch 평균 (epoch이 하나면 그대로)
+            history = training["history"][1:] or training["history"]
+            throughput = float(np.mean([row["samples_per_sec"] for row in history]))
+            baseline = baseline or throughput
+            speedup = throughput / baseline
+            print(f"nproc={nproc:<3d} {throughput:10,.0f} samples/s  속도 향상 {speedup:5.2f}x  "
+                  f"효율 {speedup / nproc:6.1%}  최고 검증 손실 {training['best_val_loss']:.6f}  "
+                  f"전체 {elapsed:6.1f}초")
+    if max(args.nproc) > cpus:
+        print(f"참고: 프로세스 수가 CPU 코어 수({cpus})보다 많으면 속도 향상을 기대할 수 없습니다.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추론 성능 벤치마크")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("pipeline", help="ScoringPipeline 단계별 지연 시간")
+    p.add_argument("--requests", type=int, default=200, help="반복 횟수")
+    p.add_argument("--rows", type=int, default=config.MODEL_CONFIG["sequence_length"],
+                   help="요청당 센서 데이터 행 수")
+    p.set_defaults(func=bench_pipeline)
+
+    p = subparsers.add_parser("backends", help="eager / TorchScript / ONNX / NumPy 지연 시간 비교")
+    p.add_argument("--requests", type=int, default=200, help="반복 횟수")
+    p.add_argument("--batch-size", type=int, default=1, help="배치 크기")
+    p.set_defaults(func=bench_backends)
+
+    p = subparsers.add_parser("quantization", help="fp32 / int8 양자화 지연 시간과 RSS 비교")
+    p.add_argument("--requests", type=int, default=200, help="반복 횟수")
+    p.add_argument("--batch-size", type=int, default=1, help="배치 크기")
+    p.add_argument("--calibration-path", default=config.CALIBRATION_SET_PATH, help="보정 세트 경로")
+    p.set_defaults(func=bench_quantization)
+
+    p = subparsers.add_parser("coldstart", help="백엔드별 콜드 스타트 시간과 RSS 비교")
+    p.set_defaults(func=bench_cold_start)
+
+    p = subparsers.add_parser("varlen", help="길이가 다른 윈도우 배치: 패딩 / packed / 길이별 분할 비교")
+    p.add_argument("--requests", type=int, default=50, help="반복 횟수")
+    p.add_argument("--batch-size", type=int, default=32, help="배치 크기")
+    p.add_argument("--min-length", type=int, default=5, help="최소 윈도우 길이")
+    p.set_defaults(func=bench_variable_length)
+
+    p = subparsers.add_parser("vae", help="VAE 잠재 샘플 수 K별 지연 시간: 배치 샘플링 vs forward 반복")
+    p.add_argument("--requests", type=int, default=50, help="반복 횟수")
+    p.add_argument("--batch-size", type=int, default=1, help="배치 크기")
+    p.add_argument("--samples", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="K 값 목록")
+    p.set_defaults(func=bench_vae_sampling)
+
+    p = subparsers.add_parser("featurize", help="요청 시점 특징 추출: 기존 경로 vs FeatureKernel")
+    p.add_argument("--requests", type=int, default=2000, help="반복 횟수")
+    p.add_argument("--rows", type=int, default=config.MODEL_CONFIG["sequence_length"],
+                   help="요청당 센서 데이터 행 수")
+    p.add_argument("--batch-size", type=int, default=16, help="배치 크기")
+    p.set_defaults(func=bench_featurize)
+
+    p = subparsers.add_parser("adapters", help="사용자 어댑터 적용 비용 (배치 내 어댑터 비율별)")
+    p.add_argument("--requests", type=int, default=200, help="반복 횟수")
+    p.add_argument("--batch-size", type=int, default=16, help="배치 크기")
+    p.add_argument("--ratios", type=float, nargs="+", default=[0.25, 0.5, 1.0],
+                   help="어댑터가 있는 윈도우 비율 목록")
+    p.set_defaults(func=bench_adapters)
+
+    p = subparsers.add_parser("ddp", help="gloo 데이터 병렬 학습: 프로세스 수별 처리량과 확장 효율")
+    p.add_argument("--csv", default=config.FEATURE_BUILD_CONFIG["train_output_path"], help="학습 CSV")
+    p.add_argument("--nproc", type=int, nargs="+", default=[1, 2, 4, 8], help="프로세스 수 목록")
+    p.add_argument("--epochs", type=int, default=3, help="실행별 epoch 수")
+    p.add_argument("--batch-size", type=int, default=config.MODEL_CONFIG["batch_size"],
+                   help="프로세스당 배치 크기")
+    p.add_argument("--stride", type=int, default=1, help="윈도우 시작 간격")
+    p.add_argument("--num-workers", type=int, default=0,
+                   help="프로세스당 DataLoader 워커 수 (프로세스마다 torch를 import하므로 메모리 주의)")
+    p.add_argument("--out-of-core", action="store_true", help="메모리 매핑 특징 행렬 사용")
+    p.set_defaults(func=bench_ddp_scaling)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
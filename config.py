@@ -28,12 +28,65 @@ MODEL_CONFIG = {
     "sequence_length": 60,  # 60분 단위 시계열 윈도우
 }
 
+# 학습 설정 (train.py)
+TRAIN_CONFIG = {
+    "num_workers": int(os.getenv("TRAIN_NUM_WORKERS", "2")),  # DataLoader 워커 프로세스 수
+    # torch intra-op 스레드 수 (0이면 CPU 코어 수 / 프로세스 수)
+    "num_threads": int(os.getenv("TRAIN_NUM_THREADS", "0")),
+    "nproc": int(os.getenv("TRAIN_NPROC", "1")),  # 데이터 병렬 학습 프로세스 수 (gloo)
+    "patience": 10,  # 검증 손실이 개선되지 않으면 조기 종료할 epoch 수
+    "min_delta": 1e-6,  # 개선으로 인정할 최소 검증 손실 감소량
+    "grad_clip": 1.0,
+    "state_path": "models/train_state.pth",  # epoch마다 저장하는 재개용 학습 상태
+}
+
+# 하이퍼파라미터 탐색 설정 (sweep.py)
+SWEEP_CONFIG = {
+    "output_dir": "models/sweep",  # 공유 특징 행렬, trial 체크포인트, 결과 표 저장 위치
+    "jobs": int(os.getenv("SWEEP_JOBS", "2")),  # 동시에 학습할 trial 수 (프로세스 풀 크기)
+    # trial당 torch 스레드 수 (0이면 CPU 코어 수 / jobs)
+    "threads_per_trial": int(os.getenv("SWEEP_THREADS_PER_TRIAL", "0")),
+    "epochs": 20,
+    # 탐색 격자 (threshold_multiplier는 학습된 모델마다 재학습 없이 평가)
+    "hidden_size": [32, 64],
+    "num_layers": [1, 2],
+    "dropout": [0.2],
+    "sequence_length": [60],
+    "threshold_multiplier": [1.0, 2.0, 3.0],
+    # Pareto 기준 (모두 작을수록 좋음, flag_rate_error = |테스트 이상 판정 비율 - target_flag_rate|)
+    "objectives": ["val_loss", "flag_rate_error", "latency_ms", "size_bytes"],
+    "target_flag_rate": float(os.getenv("SWEEP_TARGET_FLAG_RATE", "0.05")),  # 목표 이상 판정 비율
+    "latency_batch_size": 32,  # 배치 지연 시간 측정 크기 (latency_ms는 배치 1 기준)
+    "latency_repeats": 50,
+    "latency_threads": 1,  # 지연 시간 측정 시 torch 스레드 수 (trial 학습이 끝난 뒤 한 번에 하나씩 측정)
+}
+
+# 지식 증류 설정 (distill.py: teacher의 재구성 오차를 따라하는 작은 student 학습)
+DISTILL_CONFIG = {
+    "hidden_size": 24,
+    "num_layers": 1,
+    "epochs": 50,
+    "batch_size": 64,
+    "learning_rate": 0.003,
+    "error_weight": 1.0,  # 재구성 오차 일치 손실 가중치 (재구성 결과 일치 손실 대비)
+    "output_path": "models/lstm_autoencoder_student.pth",
+}
+
+# 모델 입력 특징 (순서 고정)
+FEATURE_NAMES = ['heart_rate', 'steps', 'sleep', 'temperature', 'activity']
+
 # 데이터 전처리 설정
 DATA_CONFIG = {
     "window_size": 60,  # 분 단위
     "test_size": 0.2,
     "validation_size": 0.1,
     "missing_value_strategy": "mean",  # "zero", "mean", "median"
+    # 메모리 매핑 특징 행렬 생성 시 한 번에 읽을 CSV 행 수
+    "chunk_size": int(os.getenv("DATA_CHUNK_ROWS", "100000")),
+    # CSV 컬럼 캐시 형식 ("parquet", "feather", "none"), pyarrow가 없으면 사용 안 함
+    "csv_cache": os.getenv("CSV_CACHE_FORMAT", "parquet").lower(),
+    # 캐시 디렉토리 (원본 크기/수정 시각이 바뀌면 자동으로 다시 생성)
+    "csv_cache_dir": os.getenv("CSV_CACHE_DIR", "data_cache"),
 }
 
 # 이상 탐지 설정
@@ -43,6 +96,84 @@ ANOMALY_CONFIG = {
     "min_anomaly_score": 0.5,  # 최소 이상 점수
     "use_percentile": False,  # True면 percentile 사용, False면 mean+std 사용
     "percentile": 95,  # percentile 사용 시 몇 퍼센트 사용
+    # 임계값 계산 시 한 번에 추론할 검증 윈도우 수 (메모리 사용량 상한)
+    "calibration_batch_size": int(os.getenv("THRESHOLD_BATCH_SIZE", "1024")),
+    "percentile_relative_accuracy": 0.005,  # percentile 추정 상대 오차 (분위수 스케치)
+    "percentile_max_buckets": 4096,  # 분위수 스케치 최대 버킷 수 (최대 16KB)
+}
+
+# 사용자별 적응형 임계값 설정 (재구성 오차 분위수 스케치)
+USER_THRESHOLD_CONFIG = {
+    "enabled": os.getenv("USER_THRESHOLD_ENABLED", "true").lower() == "true",
+    "quantile": float(os.getenv("USER_THRESHOLD_QUANTILE", "0.99")),  # 사용자 오차의 몇 분위를 임계값으로 사용할지
+    "min_samples": int(os.getenv("USER_THRESHOLD_MIN_SAMPLES", "50")),  # 이보다 적으면 전역 임계값 사용
+    "min_ratio": 1.0,      # 개인화 임계값 하한 (전역 임계값 대비, 1.0이면 전역보다 낮아지지 않음)
+    "max_ratio": 5.0,      # 개인화 임계값 상한 (전역 임계값 대비, 큰 이상은 항상 탐지)
+    "relative_accuracy": 0.02,  # 분위수 추정 상대 오차
+    "max_buckets": 512,    # 사용자별 스케치 최대 버킷 수 (최대 2KB)
+    "max_users": 10000,    # 메모리에 유지할 최대 사용자 수 (LRU)
+    "persist_every": 20,   # 사용자별 샘플 N개마다 MongoDB에 저장 (저장된 스케치에 병합)
+    # 다른 워커가 저장한 샘플을 반영하도록 저장된 스케치를 다시 읽는 주기 (초)
+    "reload_seconds": int(os.getenv("USER_THRESHOLD_RELOAD_SECONDS", "300")),
+}
+
+# 사용자별 어댑터 설정 (저장된 센서 로그로 output 레이어 delta를 백그라운드에서 학습)
+USER_ADAPTER_CONFIG = {
+    "enabled": os.getenv("USER_ADAPTER_ENABLED", "true").lower() == "true",
+    "interval_minutes": float(os.getenv("USER_ADAPTER_INTERVAL_MINUTES", "60")),  # 학습 작업 주기 (0이면 요청 시에만)
+    "lookback_days": 30,        # 이 기간의 센서 로그만 사용
+    "min_windows": int(os.getenv("USER_ADAPTER_MIN_WINDOWS", "200")),  # 이보다 적으면 학습하지 않음
+    "max_windows": 2000,        # 사용자당 학습에 쓸 최대 윈도우 수 (최근 순)
+    "refit_hours": 24,          # 같은 모델 버전의 어댑터는 이 시간이 지나야 다시 학습
+    "max_users_per_run": 50,    # 한 번의 작업에서 학습할 최대 사용자 수
+    "holdout_fraction": 0.2,    # 가장 최근 윈도우 중 검증에 쓸 비율
+    "min_improvement": 0.05,    # 검증 윈도우 재구성 오차가 이 비율 이상 줄어야 어댑터 사용
+    "ridge": 1e-2,              # delta 가중치 L2 규제 (클수록 전역 모델에 가까움)
+    "chunk_size": 256,          # 한 번에 추론할 윈도우 수
+    "time_budget_seconds": float(os.getenv("USER_ADAPTER_TIME_BUDGET", "30")),  # 사용자당 최대 학습 시간
+    "max_cpu_fraction": float(os.getenv("USER_ADAPTER_CPU_FRACTION", "0.25")),  # 학습 스레드의 최대 CPU 점유율
+    "max_users": 10000,         # 메모리에 유지할 최대 사용자 수 (LRU)
+    "reload_seconds": 600,      # 메모리의 어댑터를 MongoDB에서 다시 읽기까지의 시간 (다른 워커가 학습한 결과 반영)
+}
+
+# 배치 추론 설정 (동시 요청을 모아 한 번의 forward pass로 처리)
+BATCH_CONFIG = {
+    "enabled": os.getenv("BATCH_INFERENCE_ENABLED", "true").lower() == "true",
+    "max_batch_size": int(os.getenv("BATCH_MAX_SIZE", "16")),  # 한 번에 추론할 최대 윈도우 수
+    "max_wait_ms": float(os.getenv("BATCH_MAX_WAIT_MS", "5")),  # 배치를 채우기 위해 기다리는 최대 시간
+}
+
+# 사용자별 특징 링 버퍼 설정 (/predict에서 새 샘플만 보내는 증분 모드)
+FEATURE_STORE_CONFIG = {
+    "enabled": os.getenv("FEATURE_STORE_ENABLED", "true").lower() == "true",
+    "memory_limit_mb": float(os.getenv("FEATURE_STORE_MEMORY_MB", "64")),  # 전체 버퍼 메모리 상한
+}
+
+# 추론 결과 캐시 설정 (같은 정규화 윈도우 재요청 시 모델 추론 생략)
+CACHE_CONFIG = {
+    "enabled": os.getenv("INFERENCE_CACHE_ENABLED", "true").lower() == "true",
+    "max_entries": int(os.getenv("INFERENCE_CACHE_MAX_ENTRIES", "4096")),
+    "memory_limit_mb": float(os.getenv("INFERENCE_CACHE_MEMORY_MB", "16")),  # 캐시 메모리 상한 (추정치)
+    "ttl_seconds": float(os.getenv("INFERENCE_CACHE_TTL_SECONDS", "300")),  # 0이면 만료 없음
+}
+
+# 통계 사전 필터 설정 (명백히 정상인 윈도우는 LSTM 추론 생략, 기본 비활성)
+PREFILTER_CONFIG = {
+    "enabled": os.getenv("PREFILTER_ENABLED", "false").lower() == "true",
+    "z_limit": float(os.getenv("PREFILTER_Z_LIMIT", "3.0")),            # 값의 |z-score| 허용 최대값
+    "diff_z_limit": float(os.getenv("PREFILTER_DIFF_Z_LIMIT", "4.0")),  # 시점 간 변화량의 |z-score| 허용 최대값
+    "audit_rate": float(os.getenv("PREFILTER_AUDIT_RATE", "0.05")),     # 생략 가능 윈도우 중 LSTM으로 검사할 비율
+    "min_samples": int(os.getenv("PREFILTER_MIN_SAMPLES", "200")),      # 생략 시작 전 LSTM으로 계산할 윈도우 수
+    "max_miss_rate": float(os.getenv("PREFILTER_MAX_MISS_RATE", "0.01")),  # 감사 시 LSTM 이상 판정 허용 비율
+    "min_std": 1e-3,  # 분산이 거의 없는 특징의 z-score 폭주 방지
+}
+
+# 업로드 전체 기간 슬라이딩 윈도우 스코어링 설정 (/upload_health_data?full_history=true)
+HISTORY_CONFIG = {
+    "default_stride": 1,     # 윈도우 시작 간격 (행 단위)
+    "batch_size": 256,       # 한 번에 추론할 윈도우 수
+    "max_windows": 20000,    # 윈도우 수 상한 (초과 시 stride 자동 증가)
+    "top_k": 5,              # 응답에 포함할 가장 이상한 윈도우 수
 }
 
 # Flask 설정
@@ -53,6 +184,26 @@ FLASK_CONFIG = {
     "use_reloader": False,  # Windows에서 자동 리로더 비활성화 (오류 방지)
 }
 
+# 모델 레지스트리 설정 (버전별 체크포인트 + manifest, 재배포 없이 모델 교체)
+MODEL_REGISTRY_CONFIG = {
+    "dir": os.getenv("MODEL_REGISTRY_DIR", "models/registry"),
+    "watch_interval_seconds": float(os.getenv("MODEL_REGISTRY_WATCH_SECONDS", "10")),  # 0이면 감시 안 함
+    "swap_drain_seconds": 5.0,     # 교체 후 이전 배치 스코어러를 정리하기까지 대기 시간
+    "shadow_sample_rate": float(os.getenv("SHADOW_SAMPLE_RATE", "0.1")),  # 섀도 스코어링 요청 비율
+    "shadow_queue_size": 256,      # 섀도 스코어링 대기 큐 길이 (가득 차면 샘플 폐기)
+}
+
+# 관리자 API 토큰 (/admin/*, 비어 있으면 관리자 API 비활성화)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# 서버 프로세스 설정 (gunicorn.conf.py의 preload 모드)
+SERVER_CONFIG = {
+    # True면 모듈 import 시 모델만 로드하고 DB 연결, 스케줄러는 워커 fork 이후 시작
+    "defer_services": os.getenv("DEFER_BACKGROUND_SERVICES", "false").lower() == "true",
+    # 스케줄러를 워커 하나에서만 실행하기 위한 잠금 파일
+    "scheduler_lock_path": os.getenv("SCHEDULER_LOCK_PATH", "/tmp/wearable_ai_scheduler.lock"),
+}
+
 # 알림 시스템 설정
 NOTIFICATION_CONFIG = {
     "email_enabled": os.getenv("EMAIL_ENABLED", "false").lower() == "true",
@@ -86,8 +237,40 @@ NOTIFICATION_CONFIG = {
 
 # 모델 파일 경로
 MODEL_SAVE_PATH = "models/lstm_autoencoder.pth"
+VAE_MODEL_SAVE_PATH = "models/vae_lstm_autoencoder.pth"
 SCALER_SAVE_PATH = "models/scaler.pkl"
 
+# 서빙용 내보내기 아티팩트 경로 (python model_export.py로 생성)
+MODEL_EXPORT_DIR = "models/export"
+EXPORT_META_PATH = os.path.join(MODEL_EXPORT_DIR, "lstm_autoencoder.meta.json")
+
+# 양자화 검증용 보정 세트 (정규화된 검증 윈도우, python quantization.py --build-calibration으로 생성)
+CALIBRATION_SET_PATH = "models/calibration.npy"
+
+# 서빙 설정
+SERVING_CONFIG = {
+    # "eager": .pth 체크포인트, "torchscript"/"onnx"/"numpy": 내보낸 아티팩트 사용
+    # ("onnx", "numpy"는 웹 워커에서 torch를 import하지 않음)
+    "backend": os.getenv("MODEL_BACKEND", "eager").lower(),
+    "parity_tolerance": 1e-5,  # 내보낸 모델과 eager 모델의 재구성 오차 허용 차이
+    # 동적 int8 양자화 (eager 백엔드, CPU 전용). 검증 실패 시 fp32로 자동 대체
+    "quantize": os.getenv("MODEL_QUANTIZE", "false").lower() == "true",
+    # 보정 세트에서 |양자화 오차 - fp32 오차| / threshold 허용 최대값
+    "quantization_tolerance": float(os.getenv("MODEL_QUANTIZE_TOLERANCE", "0.05")),
+    # sequence_length보다 짧은 데이터를 행 복제 패딩 없이 실제 행만으로 스코어링
+    # (길이가 다른 윈도우는 packed sequence / 길이 마스크로 한 배치에서 처리)
+    # 임계값은 sequence_length 윈도우로 보정되어 짧은 윈도우의 오차 분포와 다르므로 기본값은 끔
+    "variable_length": os.getenv("VARIABLE_LENGTH_WINDOWS", "false").lower() == "true",
+    # 정규화된 특징을 scaler의 feature_range(기본 0~1)로 자름 (학습 범위를 크게 벗어난 입력 완화)
+    "clip_features": os.getenv("FEATURE_CLIP", "false").lower() == "true",
+    # "lstm": LSTMAutoencoder (MODEL_SAVE_PATH), "vae": VariationalLSTMAutoencoder (VAE_MODEL_SAVE_PATH, eager 전용)
+    "model_type": os.getenv("MODEL_TYPE", "lstm").lower(),
+    # VAE: 윈도우당 잠재 샘플 수 K (재구성 오차 평균과 표준편차 계산)
+    "vae_samples": int(os.getenv("VAE_NUM_SAMPLES", "8")),
+    # VAE: 잠재 노이즈 시드 (같은 윈도우는 항상 같은 점수, 빈 값이면 요청마다 새로 샘플링)
+    "vae_seed": int(os.getenv("VAE_SAMPLE_SEED", "0")) if os.getenv("VAE_SAMPLE_SEED", "0") else None,
+}
+
 # 데이터 파일 경로
 DATA_BASE_PATH = "128.치매 고위험군 라이프로그/01.데이터"
 DATA_TRAIN_PATH = os.path.join(DATA_BASE_PATH, "1.Training/원천데이터")
@@ -102,4 +285,29 @@ VAL_ACTIVITY_PATH = os.path.join(DATA_VAL_PATH, "1.걸음걸이/val_activity.csv
 VAL_SLEEP_PATH = os.path.join(DATA_VAL_PATH, "2.수면/val_sleep.csv")
 VAL_MMSE_PATH = os.path.join(DATA_VAL_PATH, "3.인지기능/val_mmse.csv")
 
+# 원천 데이터 (활동/수면/인지기능) → 분 단위 특징 파일 생성 설정 (python feature_builder.py)
+FEATURE_BUILD_CONFIG = {
+    "subject_column": "EMAIL",
+    # 활동: 하루 한 행, 시작 시각 + 1분 간격 MET 목록 + 하루 걸음 수
+    "activity_start_column": "activity_day_start",
+    "activity_met_column": "activity_met_1min",
+    "activity_steps_column": "activity_steps",
+    # 수면: 하룻밤 한 행, 취침/기상 시각 + 5분 간격 심박 목록 + 수면 시간(초) + 체온 편차
+    "sleep_start_column": "sleep_bedtime_start",
+    "sleep_end_column": "sleep_bedtime_end",
+    "sleep_hr_column": "sleep_hr_5min",
+    "sleep_duration_column": "sleep_duration",
+    "sleep_temperature_column": "sleep_temperature_delta",
+    # 인지기능: 사용자별 진단 라벨 (정상군만 학습할 때 사용)
+    "mmse_columns": ["DIAG_NM"],
+    "timezone": "Asia/Seoul",
+    "base_temperature": 36.5,  # 체온 = base_temperature + 체온 편차
+    "heart_rate_interval_minutes": 5,
+    "nightly_tolerance_hours": 36,  # 수면 시간/체온을 이어서 쓸 최대 시간 (기상 시각 기준)
+    # 사용자별 병렬 처리 프로세스 수 (0이면 CPU 코어 수)
+    "workers": int(os.getenv("FEATURE_BUILD_WORKERS", "0")),
+    "train_output_path": "data_cache/train_features.csv",
+    "val_output_path": "data_cache/val_features.csv",
+}
+
 
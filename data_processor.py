@@ -1,20 +1,217 @@
 """
 데이터 처리 및 전처리 모듈
 CSV 데이터 로드, 결측치 처리, 정규화, 시계열 윈도우 생성
+(메모리보다 큰 데이터는 메모리 매핑 특징 행렬 + WindowedDataset)
 """
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.model_selection import train_test_split
 import pickle
+import json
+import hashlib
 import os
 from typing import Tuple, List, Optional
 import config
+from quantile_sketch import QuantileSketch
+from featurizer import FeatureKernel
+
+
+class WindowSubset:
+    """
+    슬라이딩 윈도우 뷰의 일부 (인덱스만 보관하고 윈도우를 복사하지 않음)
+    
+    인덱싱하면 해당 윈도우만 복사한 배열을 반환하므로 미니배치 단위로 꺼내 쓰면
+    전체 학습 세트를 [samples, sequence_length, features]로 만들지 않는다.
+    np.asarray(subset)는 전체를 복사한 배열을 반환한다.
+    """
+    
+    def __init__(self, windows: np.ndarray, indices: np.ndarray):
+        """
+        Args:
+            windows: create_sequences()가 반환한 윈도우 뷰
+            indices: 이 부분 집합에 속하는 윈도우 인덱스
+        """
+        self.windows = windows
+        self.indices = np.asarray(indices, dtype=np.int64)
+    
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return (len(self.indices),) + self.windows.shape[1:]
+    
+    @property
+    def dtype(self):
+        return self.windows.dtype
+    
+    @property
+    def ndim(self) -> int:
+        return self.windows.ndim
+    
+    def __len__(self) -> int:
+        return len(self.indices)
+    
+    def __getitem__(self, key) -> np.ndarray:
+        return self.windows[self.indices[key]]
+    
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        X = self.windows[self.indices]
+        return X if dtype is None else X.astype(dtype, copy=False)
+
+
+class WindowedDataset:
+    """
+    메모리 매핑된 특징 행렬 위의 지연 윈도우 데이터셋
+    
+    윈도우 시작 행 인덱스만 보관하고 인덱싱할 때 해당 윈도우만 읽어 오므로 전체 데이터가
+    메모리에 올라가지 않는다. __len__/__getitem__을 제공하므로 torch DataLoader에 그대로 사용할 수 있다.
+    윈도우는 세그먼트(사용자별 연속 구간) 경계를 넘지 않는다.
+    """
+    
+    def __init__(self, features: np.ndarray, sequence_length: int = 60,
+                 starts: Optional[np.ndarray] = None, segments: Optional[List] = None,
+                 stride: int = 1):
+        """
+        Args:
+            features: 정규화된 특징 행렬 [rows, features] (np.memmap 또는 ndarray)
+            sequence_length: 시퀀스 길이
+            starts: 사용할 윈도우 시작 행 (None이면 segments에서 생성)
+            segments: [(그룹 ID, 시작 행, 끝 행), ...] (None이면 전체가 하나의 세그먼트)
+            stride: 윈도우 시작 간격 (starts가 None일 때만 사용)
+        """
+        self.features = features
+        self.sequence_length = sequence_length
+        self.segments = [tuple(segment) for segment in segments] if segments else [(None, 0, len(features))]
+        if starts is None:
+            # 세그먼트마다 create_sequences()와 같은 수 (길이 - sequence_length개)의 윈도우
+            starts = np.concatenate([
+                np.arange(begin, end - sequence_length, stride, dtype=np.int64)
+                for _, begin, end in self.segments
+            ] + [np.empty(0, dtype=np.int64)])
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self._offsets = np.arange(sequence_length)
+    
+    @classmethod
+    def open(cls, features_path: str, sequence_length: int = 60, stride: int = 1) -> "WindowedDataset":
+        """build_feature_memmap()으로 만든 .npy 특징 행렬과 메타데이터를 메모리 매핑으로 열기"""
+        features = np.load(features_path, mmap_mode='r')
+        segments = None
+        meta_path = os.path.splitext(features_path)[0] + ".meta.json"
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                segments = json.load(f).get("segments")
+        return cls(features, sequence_length, segments=segments, stride=stride)
+    
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return (len(self.starts), self.sequence_length, self.features.shape[1])
+    
+    @property
+    def dtype(self):
+        return self.features.dtype
+    
+    @property
+    def ndim(self) -> int:
+        return 3
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def __getitem__(self, key) -> np.ndarray:
+        starts = self.starts[key]
+        if np.ndim(starts) == 0:
+            return np.array(self.features[starts:starts + self.sequence_length])
+        # 여러 윈도우: 필요한 행만 모아 [n, sequence_length, features] 배치로 복사
+        return np.asarray(self.features[starts[:, None] + self._offsets])
+    
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        X = self[np.arange(len(self))]
+        return X if dtype is None else X.astype(dtype, copy=False)
+    
+    def subset(self, indices: np.ndarray) -> "WindowedDataset":
+        """윈도우 인덱스로 부분 데이터셋 생성 (특징 행렬은 공유)"""
+        return WindowedDataset(self.features, self.sequence_length,
+                               starts=self.starts[indices], segments=self.segments)
+    
+    def split(self, test_size: float = 0.2, validation_size: float = 0.1,
+              split_by: str = "time", random_state: int = 42) -> Tuple["WindowedDataset", ...]:
+        """
+        Train/Val/Test 분할 (윈도우를 복사하지 않고 인덱스만 나눔)
+        
+        Args:
+            test_size: 테스트 데이터 비율
+            validation_size: 검증 데이터 비율
+            split_by: "time" (세그먼트마다 앞쪽부터 train → val → test, 경계에서 겹치는 윈도우 제외),
+                      "subject" (그룹 ID 단위로 나눔, 같은 사용자가 두 세트에 섞이지 않음,
+                                 그룹이 3개 이상이면 각 세트에 최소 한 그룹),
+                      "random" (prepare_data()와 같은 무작위 분할)
+            random_state: "subject", "random" 분할 시드
+            
+        Returns:
+            (train, val, test) WindowedDataset
+        """
+        indices = np.arange(len(self))
+        segment_ids = np.searchsorted(np.array([end for _, _, end in self.segments]), self.starts, side="right")
+        group_ids = np.array([str(group) for group, _, _ in self.segments])[segment_ids]
+        
+        if split_by == "subject" and len(np.unique(group_ids)) < 3:
+            print("경고: 그룹이 3개 미만이라 사용자 단위 분할 대신 시간순 분할을 사용합니다.")
+            split_by = "time"
+        
+        if split_by == "random":
+            temp, test = train_test_split(indices, test_size=test_size, random_state=random_state)
+            train, val = train_test_split(
+                temp, test_size=validation_size / (1 - test_size), random_state=random_state
+            )
+        elif split_by == "subject":
+            # 윈도우 수 기준으로 test, val 비율에 도달할(넘을) 때까지 사용자를 무작위 순서로 배정
+            # (첫 사용자가 비율보다 커도 test/val/train에 최소 한 명씩 남김)
+            groups, counts = np.unique(group_ids, return_counts=True)
+            order = np.random.RandomState(random_state).permutation(len(groups))
+            groups = groups[order]
+            cumulative = np.cumsum(counts[order]) / len(indices) + 1e-9  # 비율에 정확히 도달한 경우 반올림 오차 보정
+            num_val_min = 1 if validation_size > 0 else 0
+            num_test = 0
+            if test_size > 0:
+                num_test = min(int(np.searchsorted(cumulative, test_size)) + 1, len(groups) - 1 - num_val_min)
+            val_end = num_test
+            if validation_size > 0:
+                reached = cumulative[num_test - 1] if num_test else 0.0
+                val_end = min(max(int(np.searchsorted(cumulative, reached + validation_size)) + 1, num_test + 1),
+                              len(groups) - 1)
+            test_groups, val_groups = groups[:num_test], groups[num_test:val_end]
+            test = indices[np.isin(group_ids, test_groups)]
+            val = indices[np.isin(group_ids, val_groups)]
+            train = indices[~np.isin(group_ids, np.concatenate([test_groups, val_groups]))]
+        elif split_by == "time":
+            train, val, test = [], [], []
+            for segment_id in np.unique(segment_ids):
+                segment = indices[segment_ids == segment_id]
+                segment = segment[np.argsort(self.starts[segment], kind="stable")]
+                n = len(segment)
+                parts = np.split(segment, [int(n * (1 - test_size - validation_size)), int(n * (1 - test_size))])
+                # 앞 구간의 윈도우와 겹치는 윈도우 제외 (학습/평가 데이터 누수 방지, 경계마다 최대 sequence_length개)
+                limit = None
+                for k in range(3):
+                    if limit is not None:
+                        parts[k] = parts[k][self.starts[parts[k]] >= limit]
+                    if len(parts[k]):
+                        limit = self.starts[parts[k][-1]] + self.sequence_length
+                train.append(parts[0])
+                val.append(parts[1])
+                test.append(parts[2])
+            train, val, test = (np.concatenate(part + [np.empty(0, dtype=np.int64)]) for part in (train, val, test))
+        else:
+            raise ValueError(f"지원하지 않는 split_by: {split_by} (time, subject, random)")
+        
+        return self.subset(train), self.subset(val), self.subset(test)
 
 
 class DataProcessor:
     """웨어러블 센서 데이터 처리 클래스"""
     
+    _csv_cache_warned = False  # pyarrow가 없을 때 캐시 비활성화 경고는 프로세스당 한 번만
+    
     def __init__(self, missing_value_strategy: str = "mean"):
         """
         Args:
@@ -23,21 +220,85 @@ class DataProcessor:
         self.scaler = MinMaxScaler()
         self.missing_value_strategy = missing_value_strategy
         self.feature_names = []
+        self._feature_kernel = None  # preprocess_single_window용 (scaler 로드 후 처음 사용할 때 생성)
         
-    def load_csv(self, file_path: str) -> pd.DataFrame:
+    def load_csv(self, file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         CSV 파일 로드
         
+        처음 읽을 때 열 타입이 보존되는 컬럼 형식(Parquet/Feather) 캐시를 만들고, 이후에는
+        원본 CSV의 크기와 수정 시각이 같으면 캐시에서 필요한 열만 읽음 (DATA_CONFIG["csv_cache"]).
+        
         Args:
             file_path: CSV 파일 경로
+            columns: 읽을 열 (None이면 전체)
             
         Returns:
             로드된 DataFrame
         """
-        df = pd.read_csv(file_path)
+        cache_path = self._csv_cache_path(file_path)
+        if cache_path is None:
+            df = pd.read_csv(file_path, usecols=columns)
+        elif os.path.exists(cache_path):
+            df = self._read_columnar(cache_path, columns)
+            print(f"컬럼 캐시 사용: {cache_path}")
+        else:
+            df = pd.read_csv(file_path)
+            self._write_columnar(df, cache_path)
+            if columns is not None:
+                df = df[columns]
         print(f"데이터 로드 완료: {len(df)} 행, {len(df.columns)} 열")
         return df
     
+    @staticmethod
+    def _csv_cache_path(file_path: str) -> Optional[str]:
+        """원본 경로 해시 + 크기 + 수정 시각으로 식별되는 캐시 파일 경로 (캐시를 쓸 수 없으면 None)"""
+        cache_format = config.DATA_CONFIG.get("csv_cache", "parquet")
+        if cache_format not in ("parquet", "feather"):
+            return None
+        try:
+            import pyarrow  # noqa: F401 (Parquet/Feather 입출력에 필요)
+        except ImportError:
+            if not DataProcessor._csv_cache_warned:
+                DataProcessor._csv_cache_warned = True
+                print(f"경고: pyarrow가 없어 CSV 캐시({cache_format})를 사용하지 않습니다. "
+                      f"(pip install pyarrow, 끄려면 CSV_CACHE_FORMAT=none)")
+            return None
+        stat = os.stat(file_path)
+        source = os.path.abspath(file_path)
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        path_hash = hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(config.DATA_CONFIG["csv_cache_dir"],
+                            f"{stem}-{path_hash}-{stat.st_size}-{stat.st_mtime_ns}.{cache_format}")
+    
+    @staticmethod
+    def _read_columnar(cache_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if cache_path.endswith(".feather"):
+            return pd.read_feather(cache_path, columns=columns)
+        return pd.read_parquet(cache_path, columns=columns)
+    
+    @staticmethod
+    def _write_columnar(df: pd.DataFrame, cache_path: str):
+        """캐시 저장 (같은 원본의 이전 버전 캐시는 삭제, 실패해도 CSV 로드는 계속)"""
+        cache_dir = os.path.dirname(cache_path)
+        prefix = os.path.basename(cache_path).rsplit("-", 2)[0] + "-"
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            if cache_path.endswith(".feather"):
+                df.reset_index(drop=True).to_feather(tmp_path)
+            else:
+                df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, cache_path)
+            for name in os.listdir(cache_dir):
+                stale = os.path.join(cache_dir, name)
+                if name.startswith(prefix) and stale != cache_path:
+                    os.remove(stale)
+            print(f"컬럼 캐시 저장: {cache_path}")
+        except Exception as e:
+            # 혼합 타입 열 등 Arrow로 변환할 수 없는 경우
+            print(f"경고: 컬럼 캐시 저장 실패, CSV를 그대로 사용합니다: {e}")
+    
     def handle_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         결측치 처리
@@ -112,35 +373,40 @@ class DataProcessor:
         return data_normalized
     
     def create_sequences(self, data: np.ndarray, 
-                        sequence_length: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+                        sequence_length: int = 60,
+                        stride: int = 1) -> Tuple[np.ndarray, np.ndarray]:
         """
-        시계열 윈도우 생성
+        시계열 윈도우 생성 (복사 없는 슬라이딩 윈도우 뷰)
         
         Args:
             data: 정규화된 데이터 (2D array: [samples, features])
             sequence_length: 시퀀스 길이 (분 단위)
+            stride: 윈도우 시작 간격 (1이면 모든 시점에서 시작)
             
         Returns:
-            X: 입력 시퀀스 (3D array: [samples, sequence_length, features])
-            y: 타겟 시퀀스 (동일)
+            X: 입력 시퀀스 (3D array: [samples, sequence_length, features], data를 공유하는 읽기 전용 뷰)
+            y: 타겟 시퀀스 (X와 같은 배열)
         """
-        X, y = [], []
-        
-        for i in range(len(data) - sequence_length):
-            X.append(data[i:i + sequence_length])
-            y.append(data[i:i + sequence_length])
-        
-        X = np.array(X)
-        y = np.array(y)
+        data = np.asarray(data)
+        # 기존과 같은 윈도우 수 (len(data) - sequence_length개 시작 위치)
+        num_windows = max(len(data) - sequence_length, 0)
+        if num_windows == 0:
+            X = np.empty((0, sequence_length, data.shape[1]), dtype=data.dtype)
+        else:
+            # [windows, features, sequence_length] 뷰 → [windows, sequence_length, features]
+            X = sliding_window_view(data, sequence_length, axis=0)[:num_windows:stride].transpose(0, 2, 1)
+        # 오토인코더 타겟은 입력과 동일하므로 복사하지 않고 같은 배열을 사용
+        y = X
         
-        print(f"시퀀스 생성 완료: {len(X)}개 시퀀스, 길이: {sequence_length}")
+        print(f"시퀀스 생성 완료: {len(X)}개 시퀀스, 길이: {sequence_length}, 간격: {stride}")
         return X, y
     
     def prepare_data(self, file_path: str, 
                     sequence_length: int = 60,
                     feature_columns: Optional[List[str]] = None,
                     test_size: float = 0.2,
-                    validation_size: float = 0.1) -> dict:
+                    validation_size: float = 0.1,
+                    stride: int = 1) -> dict:
         """
         전체 데이터 준비 파이프라인
         
@@ -150,16 +416,19 @@ class DataProcessor:
             feature_columns: 사용할 특징 열
             test_size: 테스트 데이터 비율
             validation_size: 검증 데이터 비율
+            stride: 윈도우 시작 간격
             
         Returns:
             {
-                "X_train", "X_val", "X_test",
-                "y_train", "y_val", "y_test",
+                "X_train", "X_val", "X_test": WindowSubset (윈도우 뷰 + 인덱스, 복사 없음),
+                "y_train", "y_val", "y_test": X_*와 같은 객체 (오토인코더 타겟),
+                "train_indices", "val_indices", "test_indices": 윈도우 인덱스,
+                "windows": 전체 윈도우 뷰,
                 "scaler": scaler 객체
             }
         """
-        # 1. 데이터 로드
-        df = self.load_csv(file_path)
+        # 1. 데이터 로드 (특징 열이 정해져 있으면 해당 열만)
+        df = self.load_csv(file_path, feature_columns)
         
         # 2. 결측치 처리
         df = self.handle_missing_values(df)
@@ -167,21 +436,25 @@ class DataProcessor:
         # 3. 특징 선택
         df_features = self.select_features(df, feature_columns)
         
-        # 4. 정규화 (fit)
-        data_normalized = self.normalize(df_features.values, fit=True)
+        # 4. 정규화 (fit), 모델 입력 dtype(float32)으로 한 번만 변환
+        data_normalized = self.normalize(df_features.values, fit=True).astype(np.float32)
         
-        # 5. 시계열 시퀀스 생성
-        X, y = self.create_sequences(data_normalized, sequence_length)
+        # 5. 시계열 시퀀스 생성 (data_normalized를 공유하는 뷰)
+        X, _ = self.create_sequences(data_normalized, sequence_length, stride)
         
-        # 6. Train/Val/Test 분할
-        X_temp, X_test, y_temp, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42
+        # 6. Train/Val/Test 분할 (윈도우 대신 인덱스를 분할, 기존과 같은 random_state로 같은 분할)
+        indices = np.arange(len(X))
+        temp_indices, test_indices = train_test_split(
+            indices, test_size=test_size, random_state=42
         )
         
         val_size_adjusted = validation_size / (1 - test_size)
-        X_train, X_val, y_train, y_val = train_test_split(
-            X_temp, y_temp, test_size=val_size_adjusted, random_state=42
+        train_indices, val_indices = train_test_split(
+            temp_indices, test_size=val_size_adjusted, random_state=42
         )
+        X_train = WindowSubset(X, train_indices)
+        X_val = WindowSubset(X, val_indices)
+        X_test = WindowSubset(X, test_indices)
         
         print(f"\n데이터 분할 완료:")
         print(f"  Train: {len(X_train)} 샘플")
@@ -192,9 +465,182 @@ class DataProcessor:
             "X_train": X_train,
             "X_val": X_val,
             "X_test": X_test,
-            "y_train": y_train,
-            "y_val": y_val,
-            "y_test": y_test,
+            "y_train": X_train,
+            "y_val": X_val,
+            "y_test": X_test,
+            "train_indices": train_indices,
+            "val_indices": val_indices,
+            "test_indices": test_indices,
+            "windows": X,
+            "scaler": self.scaler,
+            "feature_names": self.feature_names
+        }
+    
+    def load_windows(self, file_path: str, sequence_length: int = 60,
+                     feature_columns: Optional[List[str]] = None) -> np.ndarray:
+        """
+        CSV 파일 → 현재 scaler로 정규화한 시계열 윈도우 (scaler를 다시 fit하지 않음)
+        저장된 scaler를 로드한 뒤 서빙 모델 검증/보정용 데이터를 만들 때 사용
+        
+        Args:
+            file_path: CSV 파일 경로
+            sequence_length: 시퀀스 길이
+            feature_columns: 사용할 특징 열 (None이면 config.FEATURE_NAMES)
+            
+        Returns:
+            X: 정규화된 윈도우 [samples, sequence_length, features] (float32, 복사 없는 읽기 전용 뷰)
+        """
+        feature_columns = feature_columns or list(config.FEATURE_NAMES)
+        df = self.handle_missing_values(self.load_csv(file_path, feature_columns))
+        df_features = self.select_features(df, feature_columns)
+        data = self.normalize(df_features.values, fit=False).astype(np.float32)
+        X, _ = self.create_sequences(data, sequence_length)
+        return X
+    
+    def build_feature_memmap(self, file_path: str, output_path: Optional[str] = None,
+                             feature_columns: Optional[List[str]] = None,
+                             group_column: Optional[str] = None,
+                             chunk_size: Optional[int] = None) -> str:
+        """
+        CSV를 청크 단위로 읽어 정규화한 특징 행렬을 메모리 매핑 .npy로 저장 (전체 데이터를 메모리에 올리지 않음)
+        
+        1차 패스에서 결측치 대체값과 scaler(MinMaxScaler.partial_fit)를 계산하고,
+        2차 패스에서 결측치 처리와 정규화를 적용해 float32 [rows, features] 파일에 씀.
+        
+        Args:
+            file_path: CSV 파일 경로 (group_column이 있으면 그룹별로 시간순 정렬되어 있어야 함)
+            output_path: 출력 .npy 경로 (None이면 CSV 경로의 확장자를 .features.npy로 바꾼 경로)
+            feature_columns: 사용할 특징 열 (None이면 select_features()와 같은 규칙으로 자동 선택)
+            group_column: 사용자 ID 열 (윈도우가 사용자 경계를 넘지 않고 사용자 단위 분할 가능)
+            chunk_size: 한 번에 읽을 행 수 (None이면 DATA_CONFIG["chunk_size"])
+            
+        Returns:
+            저장된 .npy 경로 (메타데이터는 같은 이름의 .meta.json)
+        """
+        chunk_size = chunk_size or config.DATA_CONFIG["chunk_size"]
+        output_path = output_path or os.path.splitext(file_path)[0] + ".features.npy"
+        if feature_columns is None:
+            feature_columns = self.select_features(pd.read_csv(file_path, nrows=1000), None).columns.tolist()
+        self.feature_names = list(feature_columns)
+        usecols = self.feature_names + ([group_column] if group_column else [])
+        
+        def read_chunks():
+            return pd.read_csv(file_path, usecols=usecols, chunksize=chunk_size)
+        
+        # 1차 패스: 행 수, 결측치 대체값 통계, min/max, 그룹 경계
+        self.scaler = MinMaxScaler()
+        num_features = len(self.feature_names)
+        sums = np.zeros(num_features)
+        counts = np.zeros(num_features, dtype=np.int64)
+        sketches = [QuantileSketch() for _ in range(num_features)] \
+            if self.missing_value_strategy == "median" else None
+        segments = []
+        rows = 0
+        for chunk in read_chunks():
+            values = chunk[self.feature_names].to_numpy(dtype=np.float64)
+            observed = ~np.isnan(values)
+            sums += np.where(observed, values, 0.0).sum(axis=0)
+            counts += observed.sum(axis=0)
+            if sketches is not None:
+                # 중앙값은 스트리밍 분위수 스케치로 근사 (상대 오차 2%, 음수 값은 0으로 취급)
+                for j, sketch in enumerate(sketches):
+                    sketch.add(values[observed[:, j], j])
+            self.scaler.partial_fit(values)
+            if group_column:
+                groups = chunk[group_column].to_numpy()
+                changes = np.flatnonzero(groups[1:] != groups[:-1]) + 1
+                for begin, end in zip(np.r_[0, changes], np.r_[changes, len(groups)]):
+                    if segments and segments[-1][0] == groups[begin] and segments[-1][2] == rows + begin:
+                        segments[-1][2] = rows + end  # 청크 경계에서 이어지는 그룹
+                    else:
+                        segments.append([groups[begin], rows + begin, rows + end])
+            rows += len(chunk)
+        
+        if self.missing_value_strategy == "zero":
+            fill_values = np.zeros(num_features)
+        elif self.missing_value_strategy == "median":
+            fill_values = np.array([sketch.quantile(0.5) or 0.0 for sketch in sketches])
+        else:
+            fill_values = np.divide(sums, counts, out=np.zeros(num_features), where=counts > 0)
+        # 대체값도 정규화 범위에 포함 (메모리 내 처리와 동일하게 결측치 처리 후 fit한 결과)
+        missing = counts < rows
+        if missing.any():
+            # 결측치가 없는 열은 현재 최솟값을 넣어 범위가 바뀌지 않게 함
+            self.scaler.partial_fit(np.where(missing, fill_values, self.scaler.data_min_)[None, :])
+        
+        # 2차 패스: 결측치 처리 + 정규화 → 메모리 매핑 파일
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        features = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float32,
+                                             shape=(rows, num_features))
+        offset = 0
+        for chunk in read_chunks():
+            values = chunk[self.feature_names].to_numpy(dtype=np.float64)
+            values = np.where(np.isnan(values), fill_values, values)
+            features[offset:offset + len(values)] = self.scaler.transform(values)
+            offset += len(values)
+        features.flush()
+        del features
+        
+        meta = {
+            "source": os.path.abspath(file_path),
+            "rows": rows,
+            "feature_names": self.feature_names,
+            "missing_value_strategy": self.missing_value_strategy,
+            "segments": [[str(group), int(begin), int(end)] for group, begin, end in segments] or None,
+        }
+        with open(os.path.splitext(output_path)[0] + ".meta.json", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        print(f"특징 행렬 저장 완료: {output_path} ({rows} 행, {num_features}개 특징, "
+              f"세그먼트 {len(segments) or 1}개)")
+        return output_path
+    
+    def prepare_windowed_dataset(self, file_path: str,
+                                 sequence_length: int = 60,
+                                 feature_columns: Optional[List[str]] = None,
+                                 group_column: Optional[str] = None,
+                                 test_size: float = 0.2,
+                                 validation_size: float = 0.1,
+                                 split_by: str = "time",
+                                 stride: int = 1,
+                                 features_path: Optional[str] = None) -> dict:
+        """
+        메모리에 올라가지 않는 데이터용 prepare_data() (메모리 매핑 특징 행렬 + 지연 윈도우 데이터셋)
+        
+        Args:
+            file_path: CSV 파일 경로
+            sequence_length: 시퀀스 길이
+            feature_columns: 사용할 특징 열
+            group_column: 사용자 ID 열 (split_by="subject"에 필요)
+            test_size: 테스트 데이터 비율
+            validation_size: 검증 데이터 비율
+            split_by: "time", "subject", "random" (WindowedDataset.split 참고)
+            stride: 윈도우 시작 간격
+            features_path: 특징 행렬 .npy 경로 (None이면 CSV 옆에 생성)
+            
+        Returns:
+            {
+                "train", "val", "test": WindowedDataset,
+                "features_path": 특징 행렬 경로,
+                "scaler": scaler 객체,
+                "feature_names": 특징 이름
+            }
+        """
+        features_path = self.build_feature_memmap(
+            file_path, features_path, feature_columns, group_column
+        )
+        dataset = WindowedDataset.open(features_path, sequence_length, stride)
+        train, val, test = dataset.split(test_size, validation_size, split_by)
+        
+        print(f"\n데이터 분할 완료 ({split_by}):")
+        print(f"  Train: {len(train)} 샘플")
+        print(f"  Val: {len(val)} 샘플")
+        print(f"  Test: {len(test)} 샘플")
+        
+        return {
+            "train": train,
+            "val": val,
+            "test": test,
+            "features_path": features_path,
             "scaler": self.scaler,
             "feature_names": self.feature_names
         }
@@ -220,19 +666,11 @@ class DataProcessor:
             raw_data: {"heart_rate": 72, "steps": 120, ...} 형태의 딕셔너리
             
         Returns:
-            전처리된 데이터 (1D array)
+            전처리된 데이터 (1D array, float32)
         """
-        # 딕셔너리를 DataFrame으로 변환
-        df = pd.DataFrame([raw_data])
-        
-        # 특징 선택
-        df_features = df[self.feature_names]
-        
-        # 결측치 처리
-        df_features = df_features.fillna(df_features.mean())
-        
-        # 정규화
-        data_normalized = self.normalize(df_features.values, fit=False)
-        
-        return data_normalized[0]
+        # DataFrame 없이 scaler 파라미터로 직접 정규화 (누락된 값은 0)
+        kernel = self._feature_kernel
+        if kernel is None or kernel.scaler is not self.scaler or kernel.feature_names != list(self.feature_names):
+            kernel = self._feature_kernel = FeatureKernel(self.scaler, self.feature_names)
+        return kernel.transform_rows([raw_data])[0]
 
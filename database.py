@@ -3,7 +3,7 @@ MongoDB 연동 모듈
 데이터 저장 및 조회 기능
 """
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
 from datetime import datetime
 from typing import List, Dict, Optional
 import config
@@ -387,6 +387,8 @@ class MongoDBManager:
         self.collection.create_index([("user_id", 1), ("date", 1)])
         # timestamp에 인덱스
         self.collection.create_index([("timestamp", -1)])
+        # 사용자별 최근 로그 조회 (어댑터 학습)
+        self.collection.create_index([("user_id", 1), ("timestamp", -1)])
         # anomaly_detected에 인덱스
         self.collection.create_index([("anomaly_detected", 1)])
         
@@ -399,6 +401,14 @@ class MongoDBManager:
         settings_collection = self.db.get_collection("user_settings")
         settings_collection.create_index([("user_id", 1)], unique=True)
         
+        # 사용자별 임계값 스케치 컬렉션 인덱스
+        threshold_collection = self.db.get_collection("user_thresholds")
+        threshold_collection.create_index([("user_id", 1)], unique=True)
+        
+        # 사용자 어댑터 컬렉션 인덱스
+        adapter_collection = self.db.get_collection("user_adapters")
+        adapter_collection.create_index([("user_id", 1)], unique=True)
+        
         print("인덱스 생성 완료")
     
     def save_user_settings(self, user_id: str, email: str = None, emergency_contacts: List[Dict] = None) -> bool:
@@ -464,6 +474,152 @@ class MongoDBManager:
             print(f"사용자 설정 조회 실패: {e}")
             return {"user_id": user_id, "email": "", "emergency_contacts": []}
     
+    def save_user_threshold(self, user_id: str, model_version: str, sketch: bytes,
+                            sample_count: int, quantile_value: float = None,
+                            revision: Optional[int] = None) -> bool:
+        """
+        사용자별 재구성 오차 분위수 스케치 저장 (revision 비교 후 교체)
+        
+        여러 워커가 같은 사용자의 스케치를 저장하므로, 읽은 뒤 다른 워커가 먼저 저장했으면
+        덮어쓰지 않고 False를 반환한다 (호출자가 다시 읽어 병합한 뒤 재시도).
+        
+        Args:
+            user_id: 사용자 ID
+            model_version: 스케치를 수집한 모델 버전
+            sketch: QuantileSketch.to_bytes() 결과
+            sample_count: 스케치에 포함된 샘플 수
+            quantile_value: 현재 개인화 임계값 계산에 쓰이는 분위수 값 (조회/디버깅용)
+            revision: 읽어 온 문서의 revision (None이면 문서가 없었던 경우, 새로 생성)
+            
+        Returns:
+            저장 성공 여부 (다른 워커가 먼저 저장했으면 False)
+        """
+        threshold_collection = self.db.get_collection("user_thresholds")
+        fields = {
+            "model_version": model_version,
+            "sketch": sketch,
+            "sample_count": sample_count,
+            "quantile_value": quantile_value,
+            "updated_at": datetime.now()
+        }
+        
+        try:
+            if revision is None:
+                threshold_collection.insert_one(dict(fields, user_id=user_id, revision=1))
+                return True
+            # revision 필드가 없는 이전 문서는 revision 0으로 취급 (None은 필드 없음과 일치)
+            result = threshold_collection.update_one(
+                {"user_id": user_id, "revision": revision or None},
+                {"$set": dict(fields, revision=revision + 1)}
+            )
+            return result.matched_count == 1
+        except DuplicateKeyError:
+            return False
+        except Exception as e:
+            print(f"사용자 임계값 저장 실패: {e}")
+            return False
+    
+    def get_user_threshold(self, user_id: str) -> Optional[Dict]:
+        """
+        사용자별 재구성 오차 분위수 스케치 조회
+        
+        Returns:
+            {"model_version", "sketch", "sample_count", "revision", ...} 또는 None
+        """
+        threshold_collection = self.db.get_collection("user_thresholds")
+        
+        try:
+            return threshold_collection.find_one({"user_id": user_id}, {"_id": 0})
+        except Exception as e:
+            print(f"사용자 임계값 조회 실패: {e}")
+            return None
+    
+    def get_user_sensor_history(self, user_id: str, limit: int = 2000,
+                                since: Optional[datetime] = None,
+                                exclude_anomalies: bool = True) -> List[List[Dict]]:
+        """
+        사용자 센서 로그의 sensor_data만 조회 (사용자 어댑터 학습용)
+        
+        Args:
+            user_id: 사용자 ID
+            limit: 최근 몇 개 로그까지 사용할지
+            since: 이 시각 이후 로그만 (None이면 전체)
+            exclude_anomalies: True면 이상으로 판정된 로그 제외 (이상 패턴까지 학습하지 않도록)
+            
+        Returns:
+            로그별 sensor_data 리스트 (오래된 순)
+        """
+        query = {"user_id": user_id}
+        if since is not None:
+            query["timestamp"] = {"$gte": since}
+        if exclude_anomalies:
+            query["anomaly_detected"] = {"$ne": True}
+        
+        try:
+            cursor = self.collection.find(query, {"_id": 0, "sensor_data": 1}) \
+                .sort("timestamp", -1).limit(limit)
+            history = [doc["sensor_data"] for doc in cursor if doc.get("sensor_data")]
+        except Exception as e:
+            print(f"사용자 센서 로그 조회 실패: {e}")
+            return []
+        history.reverse()
+        return history
+    
+    def get_active_users(self, since: datetime, min_logs: int = 1) -> List[str]:
+        """
+        since 이후 센서 로그가 min_logs개 이상인 사용자 ID (로그가 많은 순)
+        """
+        pipeline = [
+            {"$match": {"timestamp": {"$gte": since}, "user_id": {"$ne": None}}},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gte": min_logs}}},
+            {"$sort": {"count": -1}},
+        ]
+        try:
+            return [doc["_id"] for doc in self.collection.aggregate(pipeline)]
+        except Exception as e:
+            print(f"활성 사용자 조회 실패: {e}")
+            return []
+    
+    def save_user_adapter(self, user_id: str, adapter: Dict) -> bool:
+        """
+        사용자 어댑터 저장
+        
+        Args:
+            user_id: 사용자 ID
+            adapter: UserAdapter.to_document() 결과 (모델 버전, 가중치 bytes, 학습 기록)
+            
+        Returns:
+            저장 성공 여부
+        """
+        adapter_collection = self.db.get_collection("user_adapters")
+        
+        try:
+            adapter_collection.update_one(
+                {"user_id": user_id},
+                {"$set": dict(adapter, updated_at=datetime.now())},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            print(f"사용자 어댑터 저장 실패: {e}")
+            return False
+    
+    def get_user_adapter(self, user_id: str) -> Optional[Dict]:
+        """
+        사용자 어댑터 조회
+        
+        Returns:
+            {"model_version", "weight", "bias", "shape", ...} 또는 None
+        """
+        adapter_collection = self.db.get_collection("user_adapters")
+        
+        try:
+            return adapter_collection.find_one({"user_id": user_id}, {"_id": 0})
+        except Exception as e:
+            print(f"사용자 어댑터 조회 실패: {e}")
+            return None
+    
     def delete_user_data(self, document_id: str) -> bool:
         """
         사용자 데이터 삭제
@@ -0,0 +1,288 @@
+"""
+지식 증류(distillation) 모듈
+teacher LSTM Autoencoder(hidden 64, 2층)의 재구성 결과와 재구성 오차를 따라하도록
+작은 student(예: hidden 16~32, 1층)를 학습하고, load_model()이 읽는 체크포인트 형식
+(+ 재보정한 threshold)과 지연 시간/정확도 리포트를 저장
+
+사용 예:
+    python distill.py --csv train_features.csv --val-csv val_features.csv --hidden-size 24
+    python distill.py --windows models/calibration.npy --hidden-size 16 --epochs 40
+    python model_registry.py register models/lstm_autoencoder_student.pth --notes "student h24"
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+from typing import Dict, Tuple
+import config
+from anomaly_detector import AnomalyDetector
+
+try:
+    import torch
+    import torch.nn.functional as F
+except ImportError:
+    torch = None
+
+
+def teacher_targets(teacher: AnomalyDetector, X: np.ndarray,
+                    batch_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    teacher 재구성 결과와 재구성 오차 (학습 전에 한 번만 계산)
+
+    Returns:
+        reconstructed [samples, sequence_length, features], errors [samples] (float32)
+    """
+    reconstructed = np.empty_like(X)
+    for begin in range(0, len(X), batch_size):
+        reconstructed[begin:begin + batch_size] = teacher.reconstruct(X[begin:begin + batch_size])
+    errors = ((reconstructed - X) ** 2).mean(axis=(1, 2))
+    return reconstructed, errors.astype(np.float32)
+
+
+def train_student(X_train: np.ndarray, teacher_recon: np.ndarray, teacher_errors: np.ndarray,
+                  X_val: np.ndarray, val_recon: np.ndarray, val_errors: np.ndarray,
+                  error_scale: float, hidden_size: int, num_layers: int, epochs: int,
+                  batch_size: int, learning_rate: float, error_weight: float, seed: int = 42):
+    """
+    student 학습
+
+    손실 = MSE(student 재구성, teacher 재구성) / error_scale
+         + error_weight * mean(((student 오차 - teacher 오차) / error_scale)^2)
+    (error_scale은 teacher 학습 오차 평균, 두 항이 데이터 분포와 무관하게 같은 크기가 되도록 정규화)
+
+    Returns:
+        검증 손실이 가장 낮았던 epoch의 student 모델 (eval 모드), epoch별 손실 기록
+    """
+    from model import LSTMAutoencoder
+
+    torch.manual_seed(seed)
+    student = LSTMAutoencoder(
+        input_size=X_train.shape[-1], hidden_size=hidden_size,
+        num_layers=num_layers, dropout=0.0  # teacher의 추론 모드 출력을 그대로 따라하므로 dropout 없음
+    )
+    optimizer = torch.optim.Adam(student.parameters(), lr=learning_rate)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=max(epochs, 1))
+
+    def loss_fn(model, x, target_recon, target_errors):
+        reconstructed, _ = model(x)
+        errors = ((reconstructed - x) ** 2).mean(dim=(1, 2))
+        recon_loss = F.mse_loss(reconstructed, target_recon) / error_scale
+        error_loss = (((errors - target_errors) / error_scale) ** 2).mean()
+        return recon_loss + error_weight * error_loss
+
+    tensors = [torch.from_numpy(np.ascontiguousarray(a)) for a in (X_train, teacher_recon, teacher_errors)]
+    val_tensors = [torch.from_numpy(np.ascontiguousarray(a)) for a in (X_val, val_recon, val_errors)]
+    generator = torch.Generator().manual_seed(seed)
+
+    best_loss, best_state, history = float("inf"), None, []
+    for epoch in range(1, epochs + 1):
+        student.train()
+        order = torch.randperm(len(X_train), generator=generator)
+        train_loss = 0.0
+        for begin in range(0, len(order), batch_size):
+            index = order[begin:begin + batch_size]
+            optimizer.zero_grad()
+            loss = loss_fn(student, *(t[index] for t in tensors))
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(student.parameters(), 1.0)
+            optimizer.step()
+            train_loss += loss.item() * len(index)
+        scheduler.step()
+
+        student.eval()
+        with torch.inference_mode():
+            val_loss = loss_fn(student, *val_tensors).item()
+        history.append({"epoch": epoch, "train_loss": train_loss / len(X_train), "val_loss": val_loss})
+        print(f"Epoch {epoch:3d}/{epochs}  train {train_loss / len(X_train):.5f}  val {val_loss:.5f}")
+        if val_loss < best_loss:
+            best_loss = val_loss
+            best_state = {name: value.clone() for name, value in student.state_dict().items()}
+
+    student.load_state_dict(best_state)
+    student.eval()
+    return student, history
+
+
+def recalibrate_threshold(teacher_errors: np.ndarray, teacher_threshold: float,
+                          student_errors: np.ndarray) -> float:
+    """
+    student 임계값 재보정 (검증 세트에서 teacher와 같은 이상 판정 비율이 되도록)
+
+    teacher 임계값이 teacher 오차 분포의 q 분위라면 student 오차 분포의 q 분위를 사용한다.
+    teacher 임계값이 분포 밖(모두 정상 또는 모두 이상)이면 오차 비율의 중앙값으로 환산한다.
+    """
+    quantile = float(np.mean(teacher_errors <= teacher_threshold))
+    if 0.0 < quantile < 1.0:
+        return float(np.quantile(student_errors, quantile))
+    ratio = float(np.median(student_errors / np.maximum(teacher_errors, 1e-12)))
+    return float(teacher_threshold * ratio)
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[np.argsort(values, kind="stable")] = np.arange(len(values))
+    return ranks
+
+
+def agreement_metrics(teacher_errors: np.ndarray, teacher_threshold: float,
+                      student_errors: np.ndarray, student_threshold: float) -> Dict:
+    """teacher 대비 student 재구성 오차/판정 일치도"""
+    teacher_flags = teacher_errors > teacher_threshold
+    student_flags = student_errors > student_threshold
+    rel_diff = np.abs(student_errors - teacher_errors) / np.maximum(teacher_errors, 1e-12)
+    true_positive = int(np.count_nonzero(teacher_flags & student_flags))
+    return {
+        "windows": int(len(teacher_errors)),
+        "error_pearson": float(np.corrcoef(teacher_errors, student_errors)[0, 1]),
+        "error_spearman": float(np.corrcoef(_rank(teacher_errors), _rank(student_errors))[0, 1]),
+        "error_rel_diff_mean": float(rel_diff.mean()),
+        "error_rel_diff_p95": float(np.percentile(rel_diff, 95)),
+        "flag_agreement": float(np.mean(teacher_flags == student_flags)),
+        "teacher_anomaly_rate": float(teacher_flags.mean()),
+        "student_anomaly_rate": float(student_flags.mean()),
+        "precision": true_positive / max(int(student_flags.sum()), 1) if student_flags.any() else None,
+        "recall": true_positive / max(int(teacher_flags.sum()), 1) if teacher_flags.any() else None,
+    }
+
+
+def measure_latency(detector: AnomalyDetector, X: np.ndarray, batch_size: int,
+                    repeats: int = 100, warmup: int = 5) -> float:
+    """calculate_reconstruction_error() 평균 지연 시간 (ms)"""
+    batch = np.ascontiguousarray(X[:batch_size])
+    for _ in range(warmup):
+        detector.calculate_reconstruction_error(batch)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        detector.calculate_reconstruction_error(batch)
+    return (time.perf_counter() - started) / repeats * 1000.0
+
+
+def _parameter_count(model) -> int:
+    return int(sum(p.numel() for p in model.parameters()))
+
+
+def main():
+    distill_config = config.DISTILL_CONFIG
+    parser = argparse.ArgumentParser(description="작은 student LSTM Autoencoder 증류")
+    parser.add_argument("--teacher", default=config.MODEL_SAVE_PATH, help="teacher 체크포인트")
+    parser.add_argument("--csv", help="학습 CSV (특징 열 포함, 저장된 scaler로 정규화)")
+    parser.add_argument("--val-csv", help="검증 CSV (없으면 시간순 마지막 윈도우 일부를 검증에 사용)")
+    parser.add_argument("--windows", help="정규화된 윈도우 .npy (--csv 대신 사용)")
+    parser.add_argument("--output", default=distill_config["output_path"], help="student 체크포인트 저장 경로")
+    parser.add_argument("--hidden-size", type=int, default=distill_config["hidden_size"])
+    parser.add_argument("--num-layers", type=int, default=distill_config["num_layers"])
+    parser.add_argument("--epochs", type=int, default=distill_config["epochs"])
+    parser.add_argument("--batch-size", type=int, default=distill_config["batch_size"])
+    parser.add_argument("--learning-rate", type=float, default=distill_config["learning_rate"])
+    parser.add_argument("--error-weight", type=float, default=distill_config["error_weight"],
+                        help="재구성 오차 일치 손실 가중치")
+    parser.add_argument("--val-fraction", type=float, default=0.2,
+                        help="--val-csv가 없을 때 시간순 마지막 구간의 검증 비율")
+    parser.add_argument("--num-threads", type=int, default=config.TRAIN_CONFIG["num_threads"],
+                        help="student 학습 torch 스레드 수 (0이면 CPU 코어 수)")
+    args = parser.parse_args()
+
+    if torch is None:
+        parser.error("증류 학습에는 torch가 필요합니다.")
+    if not args.csv and not args.windows:
+        parser.error("--csv 또는 --windows가 필요합니다.")
+
+    from data_processor import DataProcessor
+    sequence_length = config.MODEL_CONFIG["sequence_length"]
+    processor = DataProcessor()
+    processor.load_scaler(config.SCALER_SAVE_PATH)
+    X = processor.load_windows(args.csv, sequence_length) if args.csv \
+        else np.load(args.windows).astype(np.float32, copy=False)
+    if args.val_csv:
+        X_train, X_val = X, processor.load_windows(args.val_csv, sequence_length)
+    else:
+        # 슬라이딩 윈도우(stride 1)는 서로 겹치므로 무작위가 아니라 시간순으로 나누고, 마지막 학습 윈도우와
+        # 겹치는 sequence_length - 1개 윈도우는 버림 (WindowedDataset.split("time")과 같은 방식)
+        split = int(len(X) * (1 - args.val_fraction))
+        X_train, X_val = X[:split], X[split + sequence_length - 1:]
+        if len(X_train) == 0 or len(X_val) == 0:
+            parser.error(f"윈도우 {len(X)}개로는 시간순 검증 분할을 만들 수 없습니다. --val-csv를 지정하세요.")
+
+    teacher = AnomalyDetector.from_checkpoint(args.teacher)
+    teacher_threshold = float(teacher.threshold)
+    print(f"teacher 출력 계산 중... (학습 {len(X_train)}개, 검증 {len(X_val)}개 윈도우)")
+    train_recon, train_errors = teacher_targets(teacher, X_train)
+    val_recon, val_errors = teacher_targets(teacher, X_val)
+
+    # teacher AnomalyDetector가 서빙용으로 스레드 수를 1로 바꿔 두므로 학습 전에 다시 설정
+    torch.set_num_threads(args.num_threads or os.cpu_count() or 1)
+    print(f"student 학습: torch 스레드 {torch.get_num_threads()}개")
+    student, history = train_student(
+        X_train, train_recon, train_errors, X_val, val_recon, val_errors,
+        error_scale=float(train_errors.mean()), hidden_size=args.hidden_size, num_layers=args.num_layers,
+        epochs=args.epochs, batch_size=args.batch_size, learning_rate=args.learning_rate,
+        error_weight=args.error_weight,
+    )
+
+    with torch.inference_mode():
+        student_val_recon, _ = student(torch.from_numpy(np.ascontiguousarray(X_val)))
+    student_val_errors = ((student_val_recon.numpy() - X_val) ** 2).mean(axis=(1, 2))
+    student_threshold = recalibrate_threshold(val_errors, teacher_threshold, student_val_errors)
+
+    # load_model() / AnomalyDetector.from_checkpoint()가 읽는 형식 그대로 저장
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    torch.save({
+        "model_state_dict": student.state_dict(),
+        "config": {
+            "input_size": X_train.shape[-1],
+            "hidden_size": args.hidden_size,
+            "num_layers": args.num_layers,
+            "dropout": 0.0,
+        },
+        "threshold": np.float32(student_threshold),
+        "distillation": {
+            "teacher_path": os.path.abspath(args.teacher),
+            "teacher_version": teacher.model_version,
+            "teacher_threshold": teacher_threshold,
+            "epochs": args.epochs,
+            "error_weight": args.error_weight,
+        },
+    }, args.output)
+    print(f"student 체크포인트 저장 완료: {args.output} (임계값 {student_threshold:.6f})")
+
+    # 저장한 체크포인트를 서빙과 같은 경로로 다시 로드해 리포트 작성
+    student_detector = AnomalyDetector.from_checkpoint(args.output)
+    latency = {"teacher": {}, "student": {}}
+    for batch_size in (1, 32):
+        latency["teacher"][str(batch_size)] = measure_latency(teacher, X_val, batch_size)
+        latency["student"][str(batch_size)] = measure_latency(student_detector, X_val, batch_size)
+    report = {
+        "teacher": {
+            "hidden_size": teacher.model.hidden_size, "num_layers": teacher.model.num_layers,
+            "parameters": _parameter_count(teacher.model), "threshold": teacher_threshold,
+        },
+        "student": {
+            "hidden_size": args.hidden_size, "num_layers": args.num_layers,
+            "parameters": _parameter_count(student_detector.model), "threshold": student_threshold,
+        },
+        "validation": agreement_metrics(val_errors, teacher_threshold, student_val_errors, student_threshold),
+        "latency_ms": latency,
+        "speedup": {
+            size: latency["teacher"][size] / latency["student"][size] for size in latency["teacher"]
+        },
+        "history": history,
+    }
+    report_path = os.path.splitext(args.output)[0] + "_report.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    validation = report["validation"]
+    print(f"\n파라미터: teacher {report['teacher']['parameters']:,} → student {report['student']['parameters']:,}")
+    for size in ("1", "32"):
+        print(f"지연 시간 (batch={size}): teacher {latency['teacher'][size]:.3f}ms, "
+              f"student {latency['student'][size]:.3f}ms ({report['speedup'][size]:.1f}배)")
+    print(f"재구성 오차 상관계수: Pearson {validation['error_pearson']:.4f}, "
+          f"Spearman {validation['error_spearman']:.4f}, 평균 상대 차이 {validation['error_rel_diff_mean']:.1%}")
+    print(f"이상 판정 일치율: {validation['flag_agreement']:.1%} "
+          f"(teacher {validation['teacher_anomaly_rate']:.1%}, student {validation['student_anomaly_rate']:.1%})")
+    print(f"리포트 저장 완료: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+원천 라이프로그 → 모델 입력 특징 파일 생성 모듈
+활동(1분 MET, 하루 걸음 수), 수면(5분 심박, 수면 시간, 체온 편차), 인지기능(진단 라벨) 파일을
+사용자와 시각 기준으로 정렬 병합(merge_asof)하여 1분 간격의 5개 특징
+(heart_rate, steps, sleep, temperature, activity) 행렬로 만들고 CSV로 저장
+(DataProcessor.prepare_data / prepare_windowed_dataset에 그대로 사용, 사용자별로 프로세스 병렬 처리)
+
+사용 예:
+    python feature_builder.py --split train
+    python feature_builder.py --split val --workers 4
+    python feature_builder.py --activity a.csv --sleep s.csv --mmse m.csv --output features.csv
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import config
+from data_processor import DataProcessor
+
+
+def _parse_lists(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    "[1.0, 2.0, ...]" 형식의 문자열 열 → 이어 붙인 값 배열과 행별 길이 (한 번의 split으로 변환)
+
+    Returns:
+        values [sum(lengths)] (float64), lengths [rows] (int64)
+    """
+    texts = [value.strip().strip("[]").replace(" ", "") if isinstance(value, str) else ""
+             for value in values]
+    lengths = np.array([text.count(",") + 1 if text else 0 for text in texts], dtype=np.int64)
+    joined = ",".join(text for text in texts if text)
+    if not joined:
+        return np.empty(0), lengths
+    flat = pd.to_numeric(pd.Series(joined.split(",")), errors="coerce").to_numpy(dtype=np.float64)
+    return flat, lengths
+
+
+def _to_local(values: pd.Series, timezone: str) -> pd.Series:
+    """시간대가 섞인 ISO 시각 문자열 → 현지 시각 (timezone 정보 없는 datetime)"""
+    timestamps = pd.to_datetime(values, utc=True, errors="coerce")
+    return timestamps.dt.tz_convert(timezone).dt.tz_localize(None)
+
+
+def activity_minutes(activity: pd.DataFrame, settings: Dict) -> pd.DataFrame:
+    """
+    하루 단위 활동 행 → 1분 단위 [timestamp, steps, activity]
+
+    activity는 분당 MET, steps는 하루 걸음 수를 그날 MET의 1 초과분에 비례하도록 분배
+    """
+    met, lengths = _parse_lists(activity[settings["activity_met_column"]])
+    starts = _to_local(activity[settings["activity_start_column"]], settings["timezone"])
+    row = np.repeat(np.arange(len(activity)), lengths)
+    minute = np.arange(len(met)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    timestamps = starts.to_numpy()[row] + minute.astype("timedelta64[m]")
+
+    weights = np.clip(np.nan_to_num(met) - 1.0, 0.0, None)
+    day_weight = np.bincount(row, weights=weights, minlength=len(activity))
+    daily_steps = pd.to_numeric(activity[settings["activity_steps_column"]], errors="coerce").to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        steps = np.where(day_weight[row] > 0, daily_steps[row] * weights / day_weight[row], 0.0)
+
+    minutes = pd.DataFrame({"timestamp": timestamps, "steps": steps, "activity": met})
+    minutes = minutes.dropna(subset=["timestamp"])
+    # 하루 경계가 겹치는 경우 같은 분은 마지막 값 사용
+    return minutes.drop_duplicates("timestamp", keep="last").sort_values("timestamp", ignore_index=True)
+
+
+def sleep_events(sleep: pd.DataFrame, settings: Dict) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    하룻밤 단위 수면 행 → 5분 심박 이벤트 [timestamp, heart_rate]와 기상 시각 이벤트 [timestamp, sleep, temperature]
+
+    심박 0은 측정 누락으로 보고 제외, sleep은 수면 시간(시간 단위), temperature는 base_temperature + 체온 편차
+    """
+    timezone = settings["timezone"]
+    heart_rate, lengths = _parse_lists(sleep[settings["sleep_hr_column"]])
+    starts = _to_local(sleep[settings["sleep_start_column"]], timezone).to_numpy()
+    row = np.repeat(np.arange(len(sleep)), lengths)
+    step = np.arange(len(heart_rate)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    interval = settings["heart_rate_interval_minutes"]
+    heart_rate_events = pd.DataFrame({
+        "timestamp": starts[row] + (step * interval).astype("timedelta64[m]"),
+        "heart_rate": heart_rate,
+    })
+    heart_rate_events = heart_rate_events[heart_rate_events["heart_rate"] > 0].dropna()
+
+    nightly = pd.DataFrame({
+        "timestamp": _to_local(sleep[settings["sleep_end_column"]], timezone),
+        "sleep": pd.to_numeric(sleep[settings["sleep_duration_column"]], errors="coerce") / 3600.0,
+        "temperature": settings["base_temperature"]
+                       + pd.to_numeric(sleep[settings["sleep_temperature_column"]], errors="coerce"),
+    }).dropna(subset=["timestamp"])
+    return (heart_rate_events.sort_values("timestamp", ignore_index=True),
+            nightly.sort_values("timestamp", ignore_index=True))
+
+
+def build_subject_features(task: Tuple) -> pd.DataFrame:
+    """
+    한 사용자의 활동/수면 행 → 1분 간격 특징 (ProcessPoolExecutor 작업 단위)
+
+    Args:
+        task: (사용자 ID, 활동 DataFrame, 수면 DataFrame, 설정)
+
+    Returns:
+        [subject, timestamp, heart_rate, steps, sleep, temperature, activity] (시각순, 활동 기록 구간)
+    """
+    subject, activity, sleep, settings = task
+    minutes = activity_minutes(activity, settings)
+    columns = ["timestamp"] + list(config.FEATURE_NAMES)
+    if minutes.empty:
+        return pd.DataFrame(columns=[settings["subject_column"]] + columns)
+
+    # 활동 기록이 있는 구간 전체를 1분 격자로 (빠진 분은 결측치로 남김)
+    grid = pd.DataFrame({"timestamp": pd.date_range(minutes["timestamp"].iloc[0],
+                                                     minutes["timestamp"].iloc[-1], freq="1min")})
+    features = pd.merge_asof(grid, minutes, on="timestamp", direction="backward",
+                             tolerance=pd.Timedelta(0))
+    if sleep is not None and len(sleep):
+        heart_rate_events, nightly = sleep_events(sleep, settings)
+        # 각 심박 값은 다음 측정 전까지 (최대 측정 간격) 유지
+        features = pd.merge_asof(features, heart_rate_events, on="timestamp", direction="backward",
+                                 tolerance=pd.Timedelta(minutes=settings["heart_rate_interval_minutes"] - 1))
+        # 수면 시간/체온은 기상 후 다음 기상까지 유지
+        features = pd.merge_asof(features, nightly, on="timestamp", direction="backward",
+                                 tolerance=pd.Timedelta(hours=settings["nightly_tolerance_hours"]))
+    for name in config.FEATURE_NAMES:
+        if name not in features:
+            features[name] = np.nan
+    features.insert(0, settings["subject_column"], subject)
+    return features[[settings["subject_column"]] + columns]
+
+
+def _load_source(path: str, columns: List[str]) -> pd.DataFrame:
+    """DataProcessor.load_csv로 필요한 열만 읽기 (컬럼 캐시 재사용)"""
+    return DataProcessor().load_csv(path, columns)
+
+
+def build_features(activity_path: str, sleep_path: str, mmse_path: Optional[str] = None,
+                   output_path: Optional[str] = None, workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    활동/수면/인지기능 파일 → 사용자별 1분 간격 특징 DataFrame (output_path가 있으면 저장)
+
+    Args:
+        activity_path: 활동 CSV
+        sleep_path: 수면 CSV
+        mmse_path: 인지기능 CSV (있으면 FEATURE_BUILD_CONFIG["mmse_columns"]를 사용자별로 붙임)
+        output_path: 저장 경로 (.csv 또는 .parquet)
+        workers: 프로세스 수 (None이면 FEATURE_BUILD_CONFIG["workers"], 0이면 CPU 코어 수)
+
+    Returns:
+        [subject, timestamp, heart_rate, steps, sleep, temperature, activity, (진단 라벨)]
+        (사용자, 시각 순 정렬: prepare_windowed_dataset의 group_column으로 사용자 경계 유지)
+    """
+    settings = dict(config.FEATURE_BUILD_CONFIG)
+    subject_column = settings["subject_column"]
+    workers = settings["workers"] if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    activity = _load_source(activity_path, [
+        subject_column, settings["activity_start_column"],
+        settings["activity_met_column"], settings["activity_steps_column"],
+    ])
+    sleep = _load_source(sleep_path, [
+        subject_column, settings["sleep_start_column"], settings["sleep_end_column"],
+        settings["sleep_hr_column"], settings["sleep_duration_column"],
+        settings["sleep_temperature_column"],
+    ])
+    sleep_by_subject = dict(tuple(sleep.groupby(subject_column, sort=False)))
+    tasks = [
+        (subject, rows, sleep_by_subject.get(subject), settings)
+        for subject, rows in activity.groupby(subject_column, sort=True)
+    ]
+    print(f"사용자 {len(tasks)}명, 활동 {len(activity)}일, 수면 {len(sleep)}회 (프로세스 {workers}개)")
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(build_subject_features, tasks,
+                                      chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        parts = [build_subject_features(task) for task in tasks]
+    features = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    if mmse_path and len(features):
+        mmse = _load_source(mmse_path, None)
+        label_columns = [column for column in settings["mmse_columns"] if column in mmse.columns]
+        if label_columns:
+            # 사용자별 마지막 검사 결과 사용
+            labels = mmse.drop_duplicates(subject_column, keep="last")[[subject_column] + label_columns]
+            features = features.merge(labels, on=subject_column, how="left", sort=False)
+        else:
+            print(f"경고: 인지기능 파일에 {settings['mmse_columns']} 열이 없어 진단 라벨을 생략합니다.")
+
+    print(f"특징 생성 완료: {len(features)} 행 ({time.perf_counter() - started:.1f}초)")
+    if output_path:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        if output_path.endswith(".parquet"):
+            features.to_parquet(output_path, index=False)
+        else:
+            features.to_csv(output_path, index=False)
+        print(f"특징 파일 저장 완료: {output_path}")
+    return features
+
+
+def main():
+    parser = argparse.ArgumentParser(description="원천 라이프로그 → 1분 간격 모델 입력 특징 파일 생성")
+    parser.add_argument("--split", choices=["train", "val"], default="train",
+                        help="config의 원천 데이터 경로 (--activity/--sleep/--mmse로 덮어쓰기 가능)")
+    parser.add_argument("--activity", help="활동 CSV")
+    parser.add_argument("--sleep", help="수면 CSV")
+    parser.add_argument("--mmse", help="인지기능 CSV")
+    parser.add_argument("--output", help="출력 경로 (.csv 또는 .parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (0이면 CPU 코어 수)")
+    args = parser.parse_args()
+
+    if args.split == "train":
+        defaults = (config.TRAIN_ACTIVITY_PATH, config.TRAIN_SLEEP_PATH, config.TRAIN_MMSE_PATH,
+                    config.FEATURE_BUILD_CONFIG["train_output_path"])
+    else:
+        defaults = (config.VAL_ACTIVITY_PATH, config.VAL_SLEEP_PATH, config.VAL_MMSE_PATH,
+                    config.FEATURE_BUILD_CONFIG["val_output_path"])
+    mmse_path = args.mmse or defaults[2]
+    build_features(
+        args.activity or defaults[0], args.sleep or defaults[1],
+        mmse_path if os.path.exists(mmse_path) else None,
+        args.output or defaults[3], args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+사용자별 특징 링 버퍼 저장소
+활성 사용자의 최근 N분 정규화 특징 행을 미리 할당된 numpy 링 버퍼에 보관 (LRU 제거, 메모리 상한)
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+from typing import Dict, Optional
+import config
+
+
+class UserFeatureStore:
+    """
+    사용자별 최근 window_size개 정규화 특징 행 저장소
+
+    모든 사용자의 버퍼는 [max_users, window_size, features] 크기의 단일 float32 배열
+    (슬롯)로 미리 할당되며, 슬롯이 모두 차면 가장 오래 사용되지 않은 사용자를 제거한다.
+    """
+
+    def __init__(self, window_size: int = None, n_features: int = None,
+                 memory_limit_mb: float = None, max_users: int = None):
+        """
+        Args:
+            window_size: 사용자별 보관할 최근 행 수 (None이면 sequence_length)
+            n_features: 특징 수 (None이면 MODEL_CONFIG["input_size"])
+            memory_limit_mb: 버퍼 전체 메모리 상한 (MB)
+            max_users: 최대 사용자 수 (지정 시 memory_limit_mb보다 우선)
+        """
+        store_config = config.FEATURE_STORE_CONFIG
+        self.window_size = int(window_size or config.MODEL_CONFIG["sequence_length"])
+        self.n_features = int(n_features or config.MODEL_CONFIG["input_size"])
+
+        bytes_per_user = self.window_size * self.n_features * np.dtype(np.float32).itemsize
+        if max_users is None:
+            limit_mb = store_config["memory_limit_mb"] if memory_limit_mb is None else memory_limit_mb
+            max_users = int(limit_mb * 1024 * 1024) // bytes_per_user
+        self.max_users = max(1, int(max_users))
+
+        # np.zeros는 실제로 쓰인 페이지만 물리 메모리를 차지 (사용자가 늘 때 점진적으로 증가)
+        self._buffers = np.zeros((self.max_users, self.window_size, self.n_features), dtype=np.float32)
+        self._write_pos = np.zeros(self.max_users, dtype=np.int64)  # 다음에 쓸 위치
+        self._counts = np.zeros(self.max_users, dtype=np.int64)     # 저장된 행 수 (최대 window_size)
+        self._slots = OrderedDict()  # {user_id: slot}, 최근 사용 순서
+        self._free_slots = list(range(self.max_users - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        self._evictions = 0
+        self._appended_rows = 0
+
+    def _acquire_slot(self, user_id: str) -> int:
+        """사용자 슬롯 조회 또는 할당 (lock 보유 상태에서 호출)"""
+        slot = self._slots.get(user_id)
+        if slot is not None:
+            self._slots.move_to_end(user_id)
+            return slot
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            # 가장 오래 사용되지 않은 사용자 제거
+            _, slot = self._slots.popitem(last=False)
+            self._evictions += 1
+        self._write_pos[slot] = 0
+        self._counts[slot] = 0
+        self._slots[user_id] = slot
+        return slot
+
+    def append(self, user_id: str, rows: np.ndarray) -> int:
+        """
+        정규화된 새 특징 행을 사용자 링 버퍼에 추가
+
+        Args:
+            user_id: 사용자 ID
+            rows: [k, features] 정규화된 행 (시간순)
+
+        Returns:
+            추가 후 저장된 행 수
+        """
+        rows = np.asarray(rows, dtype=np.float32)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        # window_size보다 많이 들어오면 최근 행만 필요
+        rows = rows[-self.window_size:]
+        k = len(rows)
+
+        with self._lock:
+            slot = self._acquire_slot(user_id)
+            if k == 0:
+                return int(self._counts[slot])
+            start = int(self._write_pos[slot])
+            first = min(k, self.window_size - start)
+            self._buffers[slot, start:start + first] = rows[:first]
+            if first < k:
+                self._buffers[slot, :k - first] = rows[first:]
+            self._write_pos[slot] = (start + k) % self.window_size
+            self._counts[slot] = min(self.window_size, int(self._counts[slot]) + k)
+            self._appended_rows += k
+            return int(self._counts[slot])
+
+    def replace(self, user_id: str, rows: np.ndarray) -> int:
+        """사용자 버퍼를 비우고 주어진 행으로 다시 채움 (전체 윈도우를 받은 경우)"""
+        with self._lock:
+            slot = self._acquire_slot(user_id)
+            self._write_pos[slot] = 0
+            self._counts[slot] = 0
+        return self.append(user_id, rows)
+
+    def get_window(self, user_id: str) -> Optional[np.ndarray]:
+        """
+        사용자의 저장된 행을 시간순으로 반환
+
+        Returns:
+            [count, features] 배열 (복사본), 사용자가 없으면 None
+        """
+        with self._lock:
+            slot = self._slots.get(user_id)
+            if slot is None:
+                return None
+            self._slots.move_to_end(user_id)
+            count = int(self._counts[slot])
+            end = int(self._write_pos[slot])
+            if count < self.window_size:
+                return self._buffers[slot, end - count:end].copy()
+            # 버퍼가 가득 찬 경우 write_pos부터가 가장 오래된 행
+            return np.concatenate([self._buffers[slot, end:], self._buffers[slot, :end]])
+
+    def count(self, user_id: str) -> int:
+        """사용자의 저장된 행 수"""
+        with self._lock:
+            slot = self._slots.get(user_id)
+            return 0 if slot is None else int(self._counts[slot])
+
+    def evict(self, user_id: str) -> bool:
+        """사용자 버퍼 제거"""
+        with self._lock:
+            slot = self._slots.pop(user_id, None)
+            if slot is None:
+                return False
+            self._free_slots.append(slot)
+            return True
+
+    def get_metrics(self) -> Dict:
+        """저장소 사용 현황"""
+        with self._lock:
+            return {
+                "active_users": len(self._slots),
+                "max_users": self.max_users,
+                "window_size": self.window_size,
+                "allocated_mb": self._buffers.nbytes / (1024 * 1024),
+                "evictions": self._evictions,
+                "appended_rows": self._appended_rows,
+            }
@@ -0,0 +1,139 @@
+"""
+요청 시점 특징 추출 커널
+scaler(MinMaxScaler)의 scale_/min_을 한 번만 읽어 두고, 센서 데이터(딕셔너리 리스트)를
+정규화된 float32 특징으로 출력 버퍼에 직접 기록 (누락 값 처리, 정규화, 클리핑, 패딩을 한 번에)
+
+sklearn transform의 입력 검증, 중간 리스트/배열, pandas DataFrame 생성을 거치지 않으며
+결과는 MinMaxScaler.transform(float32 입력)과 비트 단위로 같다.
+"""
+import numpy as np
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+
+class FeatureKernel:
+    """센서 딕셔너리 → 정규화 float32 특징 (출력 버퍼를 넘기면 새 배열을 만들지 않음)"""
+
+    def __init__(self, scaler, feature_names: List[str], clip: bool = False):
+        """
+        Args:
+            scaler: fit된 MinMaxScaler (models/scaler.pkl)
+            feature_names: 특징 순서
+            clip: True면 정규화 결과를 feature_range로 자름 (scaler.clip이 True여도 적용)
+        """
+        self.scaler = scaler
+        self.feature_names = list(feature_names)
+        self.num_features = len(self.feature_names)
+        # transform과 같은 결과를 내도록 float64 그대로 사용 (float32 버퍼에 곱한 뒤 반올림)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+        self.offset = np.asarray(scaler.min_, dtype=np.float64)
+        self.clip = bool(clip or getattr(scaler, "clip", False))
+        self.clip_range = tuple(float(v) for v in getattr(scaler, "feature_range", (0.0, 1.0)))
+        self._getter = itemgetter(*self.feature_names)
+
+    def _raw_values(self, row: Dict) -> List[float]:
+        """누락/None/숫자가 아닌 값은 0.0 (기존 featurize와 같은 규칙)"""
+        values = []
+        for name in self.feature_names:
+            value = row.get(name)
+            try:
+                values.append(float(value) if value is not None else 0.0)
+            except (TypeError, ValueError):
+                values.append(0.0)
+        return values
+
+    def transform_rows(self, sensor_data: List[Dict], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        센서 데이터 리스트 → 정규화된 특징 행
+
+        Args:
+            sensor_data: [{"heart_rate": 72, ...}, ...]
+            out: 결과를 기록할 [len(sensor_data), features] float32 C-연속 배열 (None이면 새로 할당)
+
+        Returns:
+            out ([len(sensor_data), features] float32)
+        """
+        count = len(sensor_data)
+        if out is None:
+            out = np.empty((count, self.num_features), dtype=np.float32)
+        flat = out.reshape(-1)  # C-연속 배열이면 view
+        try:
+            # 빠른 경로: 모든 행에 모든 키가 숫자로 있는 경우
+            if self.num_features == 1:
+                flat[:] = np.fromiter(map(self._getter, sensor_data), dtype=np.float32, count=count)
+            else:
+                flat[:] = np.fromiter(chain.from_iterable(map(self._getter, sensor_data)),
+                                      dtype=np.float32, count=count * self.num_features)
+        except (KeyError, TypeError, ValueError):
+            for i, row in enumerate(sensor_data):
+                out[i] = self._raw_values(row)
+        self._normalize(out)
+        return out
+
+    def _normalize(self, out: np.ndarray):
+        """버퍼 내에서 정규화 (x * scale_ + min_, 선택적으로 클리핑)"""
+        np.multiply(out, self.scale, out=out, casting="same_kind")
+        np.add(out, self.offset, out=out, casting="same_kind")
+        if self.clip:
+            np.clip(out, self.clip_range[0], self.clip_range[1], out=out)
+
+    def build_window(self, sensor_data: List[Dict], sequence_length: int,
+                     padding: str = "last", pad: bool = True,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        최근 sequence_length개 행 → 정규화된 윈도우 (패딩까지 한 번에)
+
+        Args:
+            sensor_data: 시간순 센서 데이터 (1개 이상)
+            sequence_length: 윈도우 길이
+            padding: "last"면 마지막 행을 뒤에, "first"면 첫 행을 앞에 반복
+            pad: False면 패딩 없이 실제 행만 반환 (가변 길이 스코어링)
+            out: [sequence_length, features] float32 버퍼 (None이면 새로 할당)
+
+        Returns:
+            [sequence_length, features] (pad=False이고 데이터가 짧으면 [행 수, features], out의 view)
+        """
+        if padding not in ("last", "first"):
+            raise ValueError(f"지원하지 않는 padding 방식입니다: {padding}")
+        rows = sensor_data[-sequence_length:]
+        count = len(rows)
+        if out is None:
+            out = np.empty((sequence_length if pad else count, self.num_features), dtype=np.float32)
+        if not pad or count == sequence_length:
+            return self.transform_rows(rows, out[:count])
+
+        if padding == "last":
+            self.transform_rows(rows, out[:count])
+            out[count:] = out[count - 1]
+        else:
+            begin = sequence_length - count
+            self.transform_rows(rows, out[begin:])
+            out[:begin] = out[begin]
+        return out
+
+    def build_batch(self, batch: List[List[Dict]], sequence_length: int,
+                    padding: str = "last", pad: bool = True,
+                    out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        여러 요청의 센서 데이터 → 한 배치 ([batch, sequence_length, features] 버퍼 하나에 기록)
+
+        Args:
+            batch: 요청별 센서 데이터 리스트
+            pad: False면 짧은 윈도우는 앞쪽에 실제 행, 뒤쪽은 0으로 두고 lengths를 반환
+            out: [len(batch), sequence_length, features] float32 버퍼 (None이면 새로 할당)
+
+        Returns:
+            X [len(batch), sequence_length, features], lengths [len(batch)] (pad=True이거나 모두 꽉 차면 None)
+        """
+        if out is None:
+            out = np.empty((len(batch), sequence_length, self.num_features), dtype=np.float32)
+        lengths = np.empty(len(batch), dtype=np.int64)
+        for i, sensor_data in enumerate(batch):
+            window = self.build_window(sensor_data, sequence_length, padding, pad, out[i])
+            lengths[i] = len(window)
+            if len(window) < sequence_length:
+                out[i, len(window):] = 0.0
+        if pad or np.all(lengths == sequence_length):
+            return out, None
+        return out, lengths
@@ -0,0 +1,46 @@
+"""
+gunicorn 설정 파일 (preload 모드)
+
+마스터 프로세스가 모델을 한 번만 로드하고 파라미터를 공유 메모리에 둔 뒤 워커를 fork한다.
+워커는 가중치를 copy-on-write로 공유하지만, 워커마다 결과 캐시/특징 저장소/MongoDB 연결을 따로 가지므로
+기본 워커 수는 작게 두고 WEB_CONCURRENCY로 늘린다.
+DB 연결과 스케줄러 같은 백그라운드 서비스는 fork 이후 각 워커에서 시작한다.
+
+사용 예:
+    gunicorn app:app --config gunicorn.conf.py --bind 0.0.0.0:$PORT
+"""
+import os
+
+# app 모듈 import 시 서비스 초기화를 워커로 미루도록 설정 (config import 전에 지정해야 함)
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+if preload_app:
+    os.environ.setdefault("DEFER_BACKGROUND_SERVICES", "true")
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    """마스터: preload된 모델을 공유 메모리로 옮기고 GC 대상에서 제외 (워커 fork 직전)"""
+    if not preload_app:
+        return
+    import app
+    app.prepare_for_fork()
+    server.log.info("모델 파라미터 공유 메모리 준비 완료 (워커 %d개)", workers)
+
+
+def post_fork(server, worker):
+    """워커: fork 이후 DB 연결, 알림, 스케줄러 초기화"""
+    if not preload_app:
+        return
+    import app
+    app.init_worker()
+
+
+def worker_exit(server, worker):
+    """워커 종료 시 스케줄러와 DB 연결 정리"""
+    import app
+    app.shutdown_services()
@@ -0,0 +1,164 @@
+"""
+추론 결과 캐시 모듈
+정규화된 윈도우의 해시 + 모델 버전 + 임계값을 키로 하는 LRU + TTL 캐시
+(대시보드가 같은 윈도우를 다시 보내는 경우 모델 추론 생략)
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from typing import Dict, Optional
+import config
+
+
+# 결과 딕셔너리 (점수, feature_analysis 등)의 대략적인 고정 크기 (numpy 배열 제외)
+_ENTRY_OVERHEAD_BYTES = 2048
+
+
+class InferenceCache:
+    """
+    내용 기반(content-addressed) 추론 결과 캐시
+
+    키는 윈도우 바이트의 blake2b 해시와 모델 버전, 임계값, feature_analysis 포함 여부로 구성된다.
+    모델 버전이나 임계값이 바뀌면 기존 항목은 모두 무효화된다.
+    """
+
+    def __init__(self, max_entries: int = None, memory_limit_mb: float = None,
+                 ttl_seconds: float = None):
+        """
+        Args:
+            max_entries: 최대 항목 수
+            memory_limit_mb: 캐시 전체 메모리 상한 (MB, 추정치)
+            ttl_seconds: 항목 유효 시간 (0 이하면 만료 없음)
+        """
+        cache_config = config.CACHE_CONFIG
+        self.max_entries = int(max_entries or cache_config["max_entries"])
+        limit_mb = cache_config["memory_limit_mb"] if memory_limit_mb is None else memory_limit_mb
+        self.max_bytes = int(limit_mb * 1024 * 1024)
+        self.ttl = cache_config["ttl_seconds"] if ttl_seconds is None else ttl_seconds
+
+        self._entries = OrderedDict()  # {key: (expires_at, size_bytes, result)}, 최근 사용 순서
+        self._bytes = 0
+        self._generation = None  # (model_version, threshold)
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(window: np.ndarray, model_version: str, threshold: float,
+                 include_feature_analysis: bool) -> bytes:
+        """
+        캐시 키 생성
+
+        Args:
+            window: 정규화된 윈도우 (float32)
+            model_version: AnomalyDetector.model_version
+            threshold: 현재 임계값
+            include_feature_analysis: 결과에 feature_analysis 포함 여부
+        """
+        window = np.ascontiguousarray(window, dtype=np.float32)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(window.shape).encode())
+        digest.update(window.data)
+        digest.update(f"|{model_version}|{float(threshold)!r}|{int(bool(include_feature_analysis))}".encode())
+        return digest.digest()
+
+    @staticmethod
+    def _entry_size(result: Dict) -> int:
+        return _ENTRY_OVERHEAD_BYTES + sum(
+            value.nbytes for value in result.values() if isinstance(value, np.ndarray)
+        )
+
+    def _check_generation(self, model_version: str, threshold: float):
+        """모델 버전 또는 임계값이 바뀌었으면 전체 무효화 (lock 보유 상태에서 호출)"""
+        generation = (model_version, float(threshold))
+        if self._generation != generation:
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._generation = generation
+
+    def _remove(self, key: bytes):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: bytes, model_version: str, threshold: float) -> Optional[Dict]:
+        """
+        캐시 조회
+
+        Returns:
+            저장된 결과의 얕은 복사본 (호출자가 키를 추가해도 캐시 항목은 변하지 않음), 없으면 None
+        """
+        with self._lock:
+            self._check_generation(model_version, threshold)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, _, result = entry
+            if expires_at is not None and time.monotonic() > expires_at:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return dict(result)
+
+    def put(self, key: bytes, result: Dict, model_version: str, threshold: float):
+        """결과 저장 (numpy 배열은 읽기 전용으로 고정)"""
+        stored = {}
+        for name, value in result.items():
+            if isinstance(value, np.ndarray):
+                value = value.copy()
+                value.flags.writeable = False
+            stored[name] = value
+        size = self._entry_size(stored)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl and self.ttl > 0 else None
+
+        with self._lock:
+            self._check_generation(model_version, threshold)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, size, stored)
+            self._bytes += size
+            # 항목 수 / 메모리 상한 초과 시 가장 오래 사용되지 않은 항목부터 제거
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def invalidate(self):
+        """전체 무효화 (모델 교체 시 명시적으로 호출)"""
+        with self._lock:
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._generation = None
+
+    def get_metrics(self) -> Dict:
+        """캐시 사용 현황"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_mb": self._bytes / (1024 * 1024),
+                "memory_limit_mb": self.max_bytes / (1024 * 1024),
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
@@ -5,6 +5,7 @@ PyTorch 기반
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
 
 
 class LSTMAutoencoder(nn.Module):
@@ -14,6 +15,9 @@ class LSTMAutoencoder(nn.Module):
     Decoder: 잠재 표현을 원본 시퀀스로 복원
     """
     
+    # forward(x, lengths)로 길이가 다른 시퀀스 배치를 packed sequence로 처리 가능
+    supports_lengths = True
+    
     def __init__(self, input_size: int, hidden_size: int = 64, 
                  num_layers: int = 2, dropout: float = 0.2):
         """
@@ -53,19 +57,45 @@ class LSTMAutoencoder(nn.Module):
         # Dropout
         self.dropout = nn.Dropout(dropout)
         
-    def forward(self, x):
+    def forward(self, x, lengths=None):
         """
         Forward pass
         
         Args:
             x: 입력 시퀀스 [batch_size, sequence_length, input_size]
+            lengths: 샘플별 실제 길이 [batch_size] (None이면 모두 sequence_length)
+                     지정하면 뒤쪽 패딩 시점은 packed sequence로 건너뛰고,
+                     decoder는 각 샘플의 실제 마지막 시점 hidden state에서 시작
             
         Returns:
             reconstructed: 복원된 시퀀스 [batch_size, sequence_length, input_size]
+                           (lengths 지정 시 패딩 시점의 값은 의미 없음)
+            encoded: 인코딩된 잠재 표현 [batch_size, sequence_length, hidden_size]
+        """
+        decoded, encoded = self.decode_hidden(x, lengths)
+        
+        # 출력 레이어
+        reconstructed = self.output(decoded)
+        
+        return reconstructed, encoded
+    
+    def decode_hidden(self, x, lengths=None):
+        """
+        출력 레이어 직전까지의 forward (사용자 어댑터: output 레이어 입력을 재사용)
+        
+        Args:
+            x: 입력 시퀀스 [batch_size, sequence_length, input_size]
+            lengths: 샘플별 실제 길이 [batch_size] (None이면 모두 sequence_length)
+            
+        Returns:
+            decoded: decoder 출력 [batch_size, sequence_length, hidden_size]
             encoded: 인코딩된 잠재 표현 [batch_size, sequence_length, hidden_size]
         """
         batch_size, seq_len, _ = x.size()
         
+        if lengths is not None:
+            return self._decode_packed(x, lengths, seq_len)
+        
         # Encoder
         encoded, (hidden, cell) = self.encoder(x)
         encoded = self.dropout(encoded)
@@ -74,10 +104,23 @@ class LSTMAutoencoder(nn.Module):
         decoded, _ = self.decoder(encoded, (hidden, cell))
         decoded = self.dropout(decoded)
         
-        # 출력 레이어
-        reconstructed = self.output(decoded)
+        return decoded, encoded
+    
+    def _decode_packed(self, x, lengths, seq_len: int):
+        """길이가 다른 시퀀스 배치 decode_hidden (패딩 시점 연산 없음)"""
+        packed = pack_padded_sequence(x, lengths.cpu(), batch_first=True, enforce_sorted=False)
         
-        return reconstructed, encoded
+        # Encoder (h_n, c_n은 각 샘플의 실제 마지막 시점 상태, 원래 샘플 순서)
+        packed_encoded, (hidden, cell) = self.encoder(packed)
+        packed_encoded = packed_encoded._replace(data=self.dropout(packed_encoded.data))
+        
+        # Decoder
+        packed_decoded, _ = self.decoder(packed_encoded, (hidden, cell))
+        decoded, _ = pad_packed_sequence(packed_decoded, batch_first=True, total_length=seq_len)
+        encoded, _ = pad_packed_sequence(packed_encoded, batch_first=True, total_length=seq_len)
+        decoded = self.dropout(decoded)
+        
+        return decoded, encoded
     
     def encode(self, x):
         """
@@ -177,4 +220,45 @@ class VariationalLSTMAutoencoder(nn.Module):
         reconstructed = self.output_layer(decoded)
         
         return reconstructed, mu, logvar
+    
+    def sample_reconstructions(self, x, num_samples: int = 8, eps=None):
+        """
+        윈도우마다 잠재 변수 K개를 샘플링하여 재구성 (추론용)
+        
+        encoder는 윈도우당 한 번만 실행하고, K개 샘플은 [batch_size * K] 배치 하나로
+        decoder에 통과시킨다 (샘플마다 forward를 반복하지 않음).
+        
+        Args:
+            x: 입력 시퀀스 [batch_size, sequence_length, input_size]
+            num_samples: 윈도우당 잠재 샘플 수 K
+            eps: 표준 정규 노이즈 [K, latent_dim] (모든 윈도우에 같은 노이즈 사용, None이면 매번 새로 샘플링)
+            
+        Returns:
+            reconstructed: [batch_size, K, sequence_length, input_size]
+        """
+        batch_size, seq_len, _ = x.size()
+        
+        # Encoder (윈도우당 한 번)
+        encoded, (hidden, cell) = self.encoder(x)
+        mu = self.fc_mu(encoded[:, -1, :])
+        logvar = self.fc_logvar(encoded[:, -1, :])
+        
+        # [B, ...] → [B * K, ...] (윈도우별 K개 샘플이 연속되도록)
+        mu = mu.repeat_interleave(num_samples, dim=0)
+        std = torch.exp(0.5 * logvar).repeat_interleave(num_samples, dim=0)
+        if eps is None:
+            eps = torch.randn_like(std)
+        else:
+            eps = eps[:num_samples].to(std.device).repeat(batch_size, 1)
+        z = mu + eps * std
+        hidden = hidden.repeat_interleave(num_samples, dim=1)
+        cell = cell.repeat_interleave(num_samples, dim=1)
+        
+        # Decoder (K개 샘플을 한 배치로)
+        z_expanded = self.decoder_input(z).unsqueeze(1).repeat(1, seq_len, 1)
+        decoded, _ = self.decoder(z_expanded, (hidden, cell))
+        decoded = self.dropout(decoded)
+        reconstructed = self.output_layer(decoded)
+        
+        return reconstructed.view(batch_size, num_samples, seq_len, -1)
 
@@ -0,0 +1,222 @@
+"""
+서빙용 모델 내보내기 모듈
+.pth 체크포인트 → TorchScript / ONNX / NumPy(.npz) 아티팩트 + 메타데이터(임계값, 특징 이름)
+
+사용 예:
+    python model_export.py                 # 내보내기 + eager 모델과 일치 여부 검사
+    python model_export.py --check-only    # 기존 아티팩트 일치 여부만 검사
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+import numpy as np
+import torch
+from typing import Dict
+import config
+from anomaly_detector import AnomalyDetector
+
+
+TORCHSCRIPT_FILE = "lstm_autoencoder.torchscript.pt"
+ONNX_FILE = "lstm_autoencoder.onnx"
+NUMPY_FILE = "lstm_autoencoder.npz"
+
+
+def _file_sha256(path: str) -> str:
+    """파일 SHA-256 (내보낸 아티팩트가 어느 체크포인트에서 왔는지 기록)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def export_torchscript(model: torch.nn.Module, output_path: str,
+                       example: torch.Tensor) -> str:
+    """
+    TorchScript 아티팩트 저장 (script 실패 시 trace로 대체)
+
+    Returns:
+        사용한 방식 ("script" 또는 "trace")
+    """
+    try:
+        scripted = torch.jit.script(model)
+        method = "script"
+    except Exception as e:
+        print(f"torch.jit.script 실패, trace로 대체합니다: {e}")
+        scripted = torch.jit.trace(model, example)
+        method = "trace"
+    # 추론 전용으로 고정 (dropout 제거, 가중치 상수화)
+    scripted = torch.jit.freeze(scripted.eval())
+    scripted.save(output_path)
+    return method
+
+
+def export_onnx(model: torch.nn.Module, output_path: str, example: torch.Tensor):
+    """ONNX 아티팩트 저장 (batch, sequence 차원은 동적)"""
+    torch.onnx.export(
+        model,
+        (example,),
+        output_path,
+        input_names=["input"],
+        output_names=["reconstructed", "encoded"],
+        dynamic_axes={
+            "input": {0: "batch", 1: "sequence"},
+            "reconstructed": {0: "batch", 1: "sequence"},
+            "encoded": {0: "batch", 1: "sequence"},
+        },
+        opset_version=17,
+        dynamo=False,
+    )
+
+
+def export_numpy(model: torch.nn.Module, output_path: str):
+    """NumPy 백엔드용 가중치 저장 (state_dict 키 그대로, float32)"""
+    state = {key: value.detach().cpu().numpy().astype(np.float32)
+             for key, value in model.state_dict().items()}
+    np.savez(output_path, **state)
+
+
+def export_model(model_path: str = None, output_dir: str = None,
+                 skip_onnx: bool = False) -> Dict:
+    """
+    체크포인트를 서빙용 아티팩트로 내보내기
+
+    Args:
+        model_path: 원본 체크포인트 (None이면 config.MODEL_SAVE_PATH)
+        output_dir: 출력 디렉토리 (None이면 config.MODEL_EXPORT_DIR)
+        skip_onnx: ONNX 내보내기 생략
+
+    Returns:
+        저장된 메타데이터
+    """
+    model_path = model_path or config.MODEL_SAVE_PATH
+    output_dir = output_dir or config.MODEL_EXPORT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    detector = AnomalyDetector.from_checkpoint(model_path)
+    if detector.is_variational:
+        # 잠재 샘플링 (sample_reconstructions)은 eager 모델에서만 지원
+        raise ValueError("VAE 체크포인트는 내보낼 수 없습니다. MODEL_TYPE=vae는 eager 백엔드로 서빙하세요.")
+    model = detector.model.cpu().eval()
+    sequence_length = config.MODEL_CONFIG["sequence_length"]
+    example = torch.zeros(1, sequence_length, model.input_size)
+
+    meta = {
+        "threshold": float(detector.threshold),
+        "feature_names": list(config.FEATURE_NAMES),
+        "config": {
+            "input_size": model.input_size,
+            "hidden_size": model.hidden_size,
+            "num_layers": model.num_layers,
+        },
+        "sequence_length": sequence_length,
+        "source_checkpoint": os.path.basename(model_path),
+        "source_sha256": _file_sha256(model_path),
+        "exported_at": datetime.now().isoformat(),
+        "torch_version": torch.__version__,
+    }
+
+    method = export_torchscript(model, os.path.join(output_dir, TORCHSCRIPT_FILE), example)
+    meta["torchscript_file"] = TORCHSCRIPT_FILE
+    meta["torchscript_method"] = method
+    print(f"TorchScript 저장 완료 ({method}): {os.path.join(output_dir, TORCHSCRIPT_FILE)}")
+
+    export_numpy(model, os.path.join(output_dir, NUMPY_FILE))
+    meta["numpy_file"] = NUMPY_FILE
+    print(f"NumPy 가중치 저장 완료: {os.path.join(output_dir, NUMPY_FILE)}")
+
+    if not skip_onnx:
+        try:
+            export_onnx(model, os.path.join(output_dir, ONNX_FILE), example)
+            meta["onnx_file"] = ONNX_FILE
+            print(f"ONNX 저장 완료: {os.path.join(output_dir, ONNX_FILE)}")
+        except Exception as e:
+            # ONNX 내보내기에는 onnx 패키지가 필요 (선택 사항)
+            print(f"경고: ONNX 내보내기 실패 (TorchScript만 사용 가능): {e}")
+
+    meta_path = os.path.join(output_dir, os.path.basename(config.EXPORT_META_PATH))
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    print(f"메타데이터 저장 완료: {meta_path}")
+
+    return meta
+
+
+def check_parity(reference: AnomalyDetector, candidate: AnomalyDetector,
+                 n_samples: int = 64, sequence_lengths=(60, 30),
+                 tolerance: float = None, seed: int = 0) -> Dict:
+    """
+    두 detector의 재구성 오차가 허용 오차 내에서 일치하는지 검사
+
+    Args:
+        reference: 기준 (eager) detector
+        candidate: 비교할 detector
+        n_samples: 시퀀스 길이별 검사 윈도우 수
+        sequence_lengths: 검사할 시퀀스 길이들 (동적 길이 지원 확인)
+        tolerance: 허용 최대 절대 차이 (None이면 SERVING_CONFIG["parity_tolerance"])
+
+    Returns:
+        {"max_abs_diff", "max_rel_diff", "tolerance", "passed"}
+    """
+    tolerance = config.SERVING_CONFIG["parity_tolerance"] if tolerance is None else tolerance
+    rng = np.random.default_rng(seed)
+    input_size = config.MODEL_CONFIG["input_size"]
+
+    max_abs_diff = 0.0
+    max_rel_diff = 0.0
+    for sequence_length in sequence_lengths:
+        X = rng.random((n_samples, sequence_length, input_size), dtype=np.float32)
+        expected = reference.calculate_reconstruction_error(X)
+        actual = candidate.calculate_reconstruction_error(X)
+        abs_diff = np.abs(expected - actual)
+        max_abs_diff = max(max_abs_diff, float(abs_diff.max()))
+        max_rel_diff = max(max_rel_diff, float((abs_diff / np.maximum(np.abs(expected), 1e-12)).max()))
+
+    return {
+        "max_abs_diff": max_abs_diff,
+        "max_rel_diff": max_rel_diff,
+        "tolerance": tolerance,
+        "passed": max_abs_diff <= tolerance,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LSTM Autoencoder 서빙용 내보내기")
+    parser.add_argument("--model-path", default=config.MODEL_SAVE_PATH, help="원본 체크포인트")
+    parser.add_argument("--output-dir", default=config.MODEL_EXPORT_DIR, help="출력 디렉토리")
+    parser.add_argument("--skip-onnx", action="store_true", help="ONNX 내보내기 생략")
+    parser.add_argument("--check-only", action="store_true", help="기존 아티팩트 일치 여부만 검사")
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export_model(args.model_path, args.output_dir, skip_onnx=args.skip_onnx)
+
+    meta_path = os.path.join(args.output_dir, os.path.basename(config.EXPORT_META_PATH))
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    reference = AnomalyDetector.from_checkpoint(args.model_path)
+    all_passed = True
+    for backend, file_key in (("torchscript", "torchscript_file"), ("onnx", "onnx_file"),
+                              ("numpy", "numpy_file")):
+        if file_key not in meta:
+            continue
+        try:
+            candidate = AnomalyDetector.from_exported(backend, meta_path=meta_path)
+        except ImportError as e:
+            print(f"[건너뜀] {backend}: {e}")
+            continue
+        result = check_parity(reference, candidate)
+        status = "OK" if result["passed"] else "FAIL"
+        print(f"[{status}] {backend}: 최대 절대 차이 {result['max_abs_diff']:.3e}, "
+              f"최대 상대 차이 {result['max_rel_diff']:.3e} (허용 {result['tolerance']:.0e})")
+        all_passed = all_passed and result["passed"]
+
+    sys.exit(0 if all_passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+모델 레지스트리 모듈
+버전별 체크포인트 + manifest.json 관리, manifest 변경 감시 (재배포 없이 모델 교체)
+
+디렉토리 구조:
+    models/registry/
+    ├── manifest.json          # {"active": "v2", "candidate": "v3", "versions": {...}}
+    ├── v1/lstm_autoencoder.pth
+    └── v2/lstm_autoencoder.pth
+
+사용 예:
+    python model_registry.py register models/lstm_autoencoder.pth --notes "초기 모델"
+    python model_registry.py list
+    python model_registry.py activate v2
+    python model_registry.py shadow v3          # 후보 모델 섀도 스코어링 시작
+    python model_registry.py shadow --off
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+import config
+
+
+CHECKPOINT_FILE = "lstm_autoencoder.pth"
+
+
+class ModelRegistry:
+    """버전별 체크포인트와 manifest.json 관리"""
+
+    def __init__(self, registry_dir: str = None):
+        """
+        Args:
+            registry_dir: 레지스트리 디렉토리 (None이면 MODEL_REGISTRY_CONFIG["dir"])
+        """
+        self.registry_dir = registry_dir or config.MODEL_REGISTRY_CONFIG["dir"]
+        self.manifest_path = os.path.join(self.registry_dir, "manifest.json")
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def load_manifest(self) -> Dict:
+        """manifest 로드 (없으면 빈 manifest)"""
+        if not self.exists():
+            return {"active": None, "candidate": None, "versions": {}}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: Dict):
+        """임시 파일에 쓴 뒤 교체 (다른 워커가 쓰다 만 manifest를 읽지 않도록)"""
+        os.makedirs(self.registry_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def register(self, checkpoint_path: str, version: str = None, notes: str = "") -> str:
+        """
+        체크포인트를 새 버전으로 등록 (레지스트리 디렉토리로 복사)
+
+        Args:
+            checkpoint_path: 등록할 .pth 체크포인트
+            version: 버전 이름 (None이면 v1, v2, ... 자동 부여)
+            notes: 설명
+
+        Returns:
+            등록된 버전 이름 (활성 버전이 없으면 바로 활성화)
+        """
+        with self._lock:
+            manifest = self.load_manifest()
+            if version is None:
+                version = f"v{len(manifest['versions']) + 1}"
+                while version in manifest["versions"]:
+                    version = f"v{int(version[1:]) + 1}"
+            if version in manifest["versions"]:
+                raise ValueError(f"이미 등록된 버전입니다: {version}")
+
+            version_dir = os.path.join(self.registry_dir, version)
+            os.makedirs(version_dir, exist_ok=True)
+            target = os.path.join(version_dir, CHECKPOINT_FILE)
+            shutil.copy2(checkpoint_path, target)
+
+            digest = hashlib.sha256()
+            with open(target, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+
+            manifest["versions"][version] = {
+                "file": os.path.join(version, CHECKPOINT_FILE),
+                "sha256": digest.hexdigest(),
+                "source": os.path.abspath(checkpoint_path),
+                "registered_at": datetime.now().isoformat(),
+                "notes": notes,
+            }
+            if manifest.get("active") is None:
+                manifest["active"] = version
+            self._save_manifest(manifest)
+            return version
+
+    def _update(self, key: str, version: Optional[str], **extra):
+        with self._lock:
+            manifest = self.load_manifest()
+            if version is not None and version not in manifest["versions"]:
+                raise KeyError(f"등록되지 않은 버전입니다: {version}")
+            manifest[key] = version
+            manifest[f"{key}_updated_at"] = datetime.now().isoformat()
+            manifest.update(extra)
+            self._save_manifest(manifest)
+
+    def activate(self, version: str):
+        """운영 버전 변경 (각 워커의 ManifestWatcher가 감지해 교체)"""
+        self._update("active", version)
+
+    def set_candidate(self, version: Optional[str], sample_rate: float = None):
+        """섀도 스코어링 후보 버전과 샘플 비율 지정 (version이 None이면 해제)"""
+        if sample_rate is None:
+            sample_rate = config.MODEL_REGISTRY_CONFIG["shadow_sample_rate"]
+        self._update("candidate", version, shadow_sample_rate=float(sample_rate))
+
+    def checkpoint_path(self, version: str) -> str:
+        manifest = self.load_manifest()
+        if version not in manifest["versions"]:
+            raise KeyError(f"등록되지 않은 버전입니다: {version}")
+        return os.path.join(self.registry_dir, manifest["versions"][version]["file"])
+
+    def load_detector(self, version: str):
+        """
+        버전의 체크포인트로 AnomalyDetector 생성
+
+        Returns:
+            model_version이 "<버전>-<sha256 앞 16자>"인 AnomalyDetector
+        """
+        from anomaly_detector import AnomalyDetector
+
+        detector = AnomalyDetector.from_checkpoint(self.checkpoint_path(version))
+        detector.model_version = f"{version}-{detector.model_version.split('-', 1)[1]}"
+        return detector
+
+
+class ManifestWatcher:
+    """
+    manifest.json 변경을 주기적으로 확인하여 콜백 호출
+
+    gunicorn 멀티 워커 환경에서 관리자 요청은 워커 하나에만 도달하므로,
+    각 워커가 manifest를 감시하여 같은 버전으로 수렴하도록 한다.
+    """
+
+    def __init__(self, registry: ModelRegistry, on_change: Callable[[Dict], None],
+                 interval_seconds: float = None):
+        """
+        Args:
+            registry: 감시할 ModelRegistry
+            on_change: manifest가 바뀌었을 때 호출할 함수 (인자: 새 manifest)
+            interval_seconds: 확인 주기 (초)
+        """
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = interval_seconds or config.MODEL_REGISTRY_CONFIG["watch_interval_seconds"]
+        self._last_mtime = self._mtime()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.registry.manifest_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="manifest-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            mtime = self._mtime()
+            if mtime is None or mtime == self._last_mtime:
+                continue
+            self._last_mtime = mtime
+            try:
+                self.on_change(self.registry.load_manifest())
+            except Exception as e:
+                print(f"모델 manifest 변경 처리 실패: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="모델 레지스트리 관리")
+    parser.add_argument("--registry-dir", default=config.MODEL_REGISTRY_CONFIG["dir"],
+                        help="레지스트리 디렉토리")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("register", help="체크포인트를 새 버전으로 등록")
+    p.add_argument("checkpoint", help=".pth 체크포인트 경로")
+    p.add_argument("--version", default=None, help="버전 이름 (기본: 자동)")
+    p.add_argument("--notes", default="", help="설명")
+
+    subparsers.add_parser("list", help="등록된 버전 목록")
+
+    p = subparsers.add_parser("activate", help="운영 버전 변경")
+    p.add_argument("version")
+
+    p = subparsers.add_parser("shadow", help="섀도 스코어링 후보 지정")
+    p.add_argument("version", nargs="?", default=None)
+    p.add_argument("--sample-rate", type=float, default=None, help="섀도 스코어링할 요청 비율 (0~1)")
+    p.add_argument("--off", action="store_true", help="섀도 스코어링 해제")
+
+    args = parser.parse_args()
+    registry = ModelRegistry(args.registry_dir)
+
+    if args.command == "register":
+        version = registry.register(args.checkpoint, version=args.version, notes=args.notes)
+        print(f"등록 완료: {version}")
+    elif args.command == "list":
+        manifest = registry.load_manifest()
+        for version, entry in manifest["versions"].items():
+            marks = []
+            if version == manifest.get("active"):
+                marks.append("active")
+            if version == manifest.get("candidate"):
+                marks.append("candidate")
+            print(f"{version:<8} {entry['sha256'][:12]}  {entry['registered_at']}  "
+                  f"{','.join(marks):<17} {entry.get('notes', '')}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"운영 버전 변경: {args.version}")
+    elif args.command == "shadow":
+        if not args.off and args.version is None:
+            parser.error("버전 또는 --off를 지정하세요.")
+        registry.set_candidate(None if args.off else args.version, sample_rate=args.sample_rate)
+        print("섀도 스코어링 해제" if args.off else f"섀도 스코어링 후보: {args.version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+통계 기반 사전 필터 모듈
+특징별 누적 통계(평균/표준편차)로 윈도우의 z-score를 벡터 연산으로 검사하여,
+명백히 정상인 윈도우는 LSTM 추론을 생략 (경계 근처/밖이거나 감사 샘플이면 LSTM 실행)
+
+사용 예 (오프라인 일치도 리포트, 항상 LSTM을 실행했을 때와 비교):
+    python prefilter.py --calibration-path models/calibration.npy
+    python prefilter.py --csv val.csv --z-limits 2.5,3,3.5,4
+"""
+import argparse
+import random
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+import config
+
+
+class _RunningStats:
+    """특징별 평균/분산 누적 (Welford, 배치 단위 병합)"""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, num_features: int):
+        self.count = 0
+        self.mean = np.zeros(num_features, dtype=np.float64)
+        self.m2 = np.zeros(num_features, dtype=np.float64)
+
+    def update(self, rows: np.ndarray):
+        """rows [n, features] 추가 (Chan 병렬 병합 공식)"""
+        n = len(rows)
+        if n == 0:
+            return
+        rows = rows.astype(np.float64, copy=False)
+        batch_mean = rows.mean(axis=0)
+        batch_m2 = ((rows - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + batch_m2 + delta * delta * (self.count * n / total)
+        self.count = total
+
+    def inv_std(self, min_std: float) -> np.ndarray:
+        std = np.sqrt(self.m2 / max(self.count - 1, 1))
+        return 1.0 / np.maximum(std, min_std)
+
+
+class PrefilterDecision:
+    """윈도우 하나에 대한 사전 필터 판정"""
+
+    __slots__ = ("skip", "eligible", "reason", "max_z", "max_diff_z")
+
+    def __init__(self, skip: bool, eligible: bool, reason: str, max_z: float, max_diff_z: float):
+        self.skip = skip            # True면 LSTM 추론 생략
+        self.eligible = eligible    # z-score 기준으로는 생략 가능한 윈도우
+        self.reason = reason        # "skipped", "warmup", "borderline", "audit", "unsafe"
+        self.max_z = max_z
+        self.max_diff_z = max_diff_z
+
+
+class StatisticalPrefilter:
+    """
+    LSTM 앞단의 통계적 사전 필터 (캐스케이드 1단계)
+
+    윈도우의 모든 값과 시점 간 변화량의 |z-score| 최대값이 각각 z_limit, diff_z_limit 이내면
+    생략 가능(eligible)으로 판정한다. 생략된 윈도우의 재구성 오차는 LSTM으로 실제 계산한
+    생략 가능 윈도우들의 평균 오차로 추정한다.
+
+    안전 장치:
+        - LSTM으로 계산한 생략 가능 윈도우가 min_samples개 모이기 전에는 생략하지 않음
+        - 생략 가능 윈도우 중 audit_rate 비율은 계속 LSTM으로 계산해 일치도를 기록
+        - LSTM으로 계산한 생략 가능 윈도우 중 이상 판정 비율이 max_miss_rate를 넘으면 생략 중단
+    통계는 LSTM이 정상으로 판정한 윈도우로만 갱신한다.
+    """
+
+    def __init__(self, num_features: int = None, z_limit: float = None, diff_z_limit: float = None,
+                 audit_rate: float = None, min_samples: int = None, max_miss_rate: float = None):
+        """
+        Args:
+            num_features: 특징 수 (None이면 MODEL_CONFIG["input_size"])
+            z_limit: 값의 |z-score| 허용 최대값
+            diff_z_limit: 시점 간 변화량의 |z-score| 허용 최대값
+            audit_rate: 생략 가능 윈도우 중 LSTM으로 계속 검사할 비율 (0~1)
+            min_samples: 생략을 시작하기 전 LSTM으로 계산할 생략 가능 윈도우 수
+            max_miss_rate: 감사에서 허용하는 LSTM 이상 판정 비율 (초과 시 생략 중단)
+        """
+        prefilter_config = config.PREFILTER_CONFIG
+        self.num_features = num_features or config.MODEL_CONFIG["input_size"]
+        self.z_limit = prefilter_config["z_limit"] if z_limit is None else z_limit
+        self.diff_z_limit = prefilter_config["diff_z_limit"] if diff_z_limit is None else diff_z_limit
+        self.audit_rate = prefilter_config["audit_rate"] if audit_rate is None else audit_rate
+        self.min_samples = prefilter_config["min_samples"] if min_samples is None else min_samples
+        self.max_miss_rate = prefilter_config["max_miss_rate"] if max_miss_rate is None else max_miss_rate
+        self.min_std = prefilter_config["min_std"]
+
+        self._values = _RunningStats(self.num_features)
+        self._diffs = _RunningStats(self.num_features)
+        # 검사에 쓰는 (평균, 1/표준편차) 스냅샷 (요청 스레드는 lock 없이 읽음)
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._reset_model_state(None)
+
+        self._evaluated = 0
+        self._skipped = 0
+        self._reasons = {}
+
+    def _reset_model_state(self, model_version: Optional[str]):
+        """모델별 상태 (생략 윈도우 오차 추정치, 감사 결과) 초기화"""
+        self.model_version = model_version
+        self._eligible_errors = _RunningStats(1)  # LSTM으로 계산한 생략 가능 윈도우의 재구성 오차
+        self._audited = 0
+        self._missed = 0
+
+    def fit(self, X: np.ndarray):
+        """
+        정상 윈도우로 통계 초기화 (예: 보정 세트)
+
+        Args:
+            X: 정규화된 윈도우 [samples, sequence_length, features]
+        """
+        X = np.asarray(X, dtype=np.float32)
+        with self._lock:
+            self._values.update(X.reshape(-1, X.shape[-1]))
+            if X.shape[1] > 1:
+                self._diffs.update(np.diff(X, axis=1).reshape(-1, X.shape[-1]))
+            self._refresh_snapshot()
+
+    def _refresh_snapshot(self):
+        if self._values.count < 2 or self._diffs.count < 2:
+            return
+        self._snapshot = (
+            self._values.mean.astype(np.float32), self._values.inv_std(self.min_std).astype(np.float32),
+            self._diffs.mean.astype(np.float32), self._diffs.inv_std(self.min_std).astype(np.float32),
+        )
+
+    def window_stats(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        윈도우별 |z-score| 최대값 (벡터 연산)
+
+        Args:
+            X: [samples, length, features] 또는 [length, features]
+
+        Returns:
+            (값의 최대 |z| [samples], 변화량의 최대 |z| [samples]) - 통계가 없으면 inf
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 2:
+            X = X[None]
+        snapshot = self._snapshot
+        if snapshot is None:
+            inf = np.full(len(X), np.inf, dtype=np.float32)
+            return inf, inf
+        mean, inv_std, diff_mean, diff_inv_std = snapshot
+        max_z = (np.abs(X - mean) * inv_std).max(axis=(1, 2))
+        if X.shape[1] > 1:
+            max_diff_z = (np.abs(np.diff(X, axis=1) - diff_mean) * diff_inv_std).max(axis=(1, 2))
+        else:
+            max_diff_z = np.zeros(len(X), dtype=np.float32)
+        return max_z, max_diff_z
+
+    def evaluate(self, window: np.ndarray, model_version: str = None) -> PrefilterDecision:
+        """
+        윈도우 하나의 LSTM 추론 생략 여부 판정
+
+        Args:
+            window: 정규화된 윈도우 [length, features]
+            model_version: 현재 AnomalyDetector.model_version (바뀌면 오차 추정치와 감사 결과 초기화)
+        """
+        if model_version != self.model_version:
+            with self._lock:
+                if model_version != self.model_version:
+                    self._reset_model_state(model_version)
+
+        max_z, max_diff_z = self.window_stats(window)
+        max_z, max_diff_z = float(max_z[0]), float(max_diff_z[0])
+        eligible = max_z <= self.z_limit and max_diff_z <= self.diff_z_limit
+
+        if not eligible:
+            reason = "borderline"
+        elif self._eligible_errors.count < self.min_samples:
+            reason = "warmup"
+        elif self._audited and self._missed / self._audited > self.max_miss_rate:
+            reason = "unsafe"
+        elif random.random() < self.audit_rate:
+            reason = "audit"
+        else:
+            reason = "skipped"
+        skip = reason == "skipped"
+
+        with self._lock:
+            self._evaluated += 1
+            self._skipped += int(skip)
+            self._reasons[reason] = self._reasons.get(reason, 0) + 1
+        return PrefilterDecision(skip, eligible, reason, max_z, max_diff_z)
+
+    def skipped_result(self, decision: PrefilterDecision, anomaly_detector) -> Dict:
+        """
+        LSTM을 생략한 윈도우의 결과 (detect_single()과 같은 키, 재구성 오차는 추정치)
+        """
+        threshold = float(anomaly_detector.threshold)
+        error = float(self._eligible_errors.mean[0])
+        return {
+            "anomaly_score": float(anomaly_detector.compute_anomaly_scores(np.array([error]))[0]),
+            "reconstruction_error": error,
+            "is_anomaly": False,
+            "threshold": threshold,
+            "prefiltered": True,
+            "prefilter": {"max_z": decision.max_z, "max_diff_z": decision.max_diff_z},
+        }
+
+    def record(self, window: np.ndarray, result: Dict, decision: PrefilterDecision):
+        """
+        LSTM으로 계산한 결과 반영 (감사 일치도, 오차 추정치, 정상 윈도우 통계)
+
+        Args:
+            window: 정규화된 윈도우 [length, features]
+            result: detect_batch() 결과
+            decision: evaluate()의 판정
+        """
+        is_anomaly = bool(result["is_anomaly"])
+        with self._lock:
+            if decision.eligible:
+                # LSTM까지 온 생략 가능 윈도우 (warmup, audit, unsafe)는 모두 감사 결과로 집계
+                self._audited += 1
+                self._missed += int(is_anomaly)
+                if not is_anomaly:
+                    self._eligible_errors.update(np.array([[result["reconstruction_error"]]]))
+            if not is_anomaly:
+                self._values.update(window)
+                if len(window) > 1:
+                    self._diffs.update(np.diff(window, axis=0))
+                self._refresh_snapshot()
+
+    def get_metrics(self) -> Dict:
+        """생략/LSTM 실행 비율과 감사 일치도"""
+        with self._lock:
+            evaluated = self._evaluated
+            audited = self._audited
+            return {
+                "evaluated": evaluated,
+                "skipped": self._skipped,
+                "skip_rate": self._skipped / evaluated if evaluated else 0.0,
+                "scored_rate": (evaluated - self._skipped) / evaluated if evaluated else 0.0,
+                "reasons": dict(self._reasons),
+                "audited": audited,
+                "audit_missed": self._missed,
+                "audit_agreement": 1.0 - self._missed / audited if audited else None,
+                "estimated_error": float(self._eligible_errors.mean[0]) if self._eligible_errors.count else None,
+                "eligible_samples": self._eligible_errors.count,
+                "stats_rows": self._values.count,
+                "z_limit": self.z_limit,
+                "diff_z_limit": self.diff_z_limit,
+                "audit_rate": self.audit_rate,
+            }
+
+
+def agreement_report(anomaly_detector, X: np.ndarray, z_limits: List[float],
+                     fit_fraction: float = 0.5, batch_size: int = 256) -> List[Dict]:
+    """
+    오프라인 일치도 리포트: 앞쪽 fit_fraction 윈도우로 통계를 만들고, 나머지 윈도우에서
+    사전 필터 판정과 항상 LSTM을 실행한 결과를 비교
+
+    Args:
+        anomaly_detector: 비교 기준 AnomalyDetector
+        X: 정규화된 윈도우 [samples, sequence_length, features] (시간순)
+        z_limits: 비교할 z_limit 목록 (diff_z_limit도 같은 배수로 조정)
+        fit_fraction: 통계 초기화에 사용할 앞쪽 비율
+
+    Returns:
+        z_limit별 {"z_limit", "diff_z_limit", "skip_rate", "missed_anomalies", "miss_rate",
+                   "anomaly_recall", "estimated_error_rel_diff"}
+    """
+    split = max(1, int(len(X) * fit_fraction))
+    fit_X, eval_X = X[:split], X[split:]
+    if len(eval_X) == 0:
+        raise ValueError("평가할 윈도우가 없습니다. 윈도우 수나 fit_fraction을 확인하세요.")
+
+    errors = np.concatenate([
+        anomaly_detector.calculate_reconstruction_error(X[begin:begin + batch_size])
+        for begin in range(0, len(X), batch_size)
+    ])
+    fit_errors, eval_errors = errors[:split], errors[split:]
+    threshold = float(anomaly_detector.threshold)
+    fit_normal = fit_errors <= threshold
+    eval_anomaly = eval_errors > threshold
+
+    default_ratio = config.PREFILTER_CONFIG["diff_z_limit"] / config.PREFILTER_CONFIG["z_limit"]
+    rows = []
+    for z_limit in z_limits:
+        prefilter = StatisticalPrefilter(num_features=X.shape[-1], z_limit=z_limit,
+                                         diff_z_limit=z_limit * default_ratio)
+        prefilter.fit(fit_X[fit_normal])
+        fit_z, fit_diff_z = prefilter.window_stats(fit_X)
+        eligible_fit = fit_normal & (fit_z <= prefilter.z_limit) & (fit_diff_z <= prefilter.diff_z_limit)
+        estimated_error = float(fit_errors[eligible_fit].mean()) if eligible_fit.any() else None
+
+        max_z, max_diff_z = prefilter.window_stats(eval_X)
+        skipped = (max_z <= prefilter.z_limit) & (max_diff_z <= prefilter.diff_z_limit)
+        missed = int(np.count_nonzero(skipped & eval_anomaly))
+        anomalies = int(np.count_nonzero(eval_anomaly))
+        rows.append({
+            "z_limit": z_limit,
+            "diff_z_limit": prefilter.diff_z_limit,
+            "skip_rate": float(skipped.mean()),
+            "missed_anomalies": missed,
+            "miss_rate": missed / max(int(skipped.sum()), 1),
+            "anomaly_recall": 1.0 - missed / anomalies if anomalies else None,
+            "estimated_error_rel_diff": (
+                float(np.mean(np.abs(estimated_error - eval_errors[skipped]) / eval_errors[skipped]))
+                if skipped.any() and eligible_fit.any() else None
+            ),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="통계 사전 필터 오프라인 일치도 리포트")
+    parser.add_argument("--model-path", default=config.MODEL_SAVE_PATH, help="모델 체크포인트")
+    parser.add_argument("--calibration-path", default=config.CALIBRATION_SET_PATH,
+                        help="정규화된 윈도우 .npy (--csv가 없을 때 사용)")
+    parser.add_argument("--csv", help="검증 CSV 파일 (저장된 scaler로 정규화)")
+    parser.add_argument("--z-limits", default=None,
+                        help="비교할 z_limit 목록 (쉼표 구분, 기본: 현재 설정 주변)")
+    parser.add_argument("--fit-fraction", type=float, default=0.5, help="통계 초기화에 사용할 앞쪽 비율")
+    args = parser.parse_args()
+
+    from anomaly_detector import AnomalyDetector
+
+    if args.csv:
+        from data_processor import DataProcessor
+        processor = DataProcessor()
+        processor.load_scaler(config.SCALER_SAVE_PATH)
+        X = processor.load_windows(args.csv, config.MODEL_CONFIG["sequence_length"])
+    else:
+        X = np.load(args.calibration_path)
+    X = np.asarray(X, dtype=np.float32)
+
+    if args.z_limits:
+        z_limits = [float(value) for value in args.z_limits.split(",")]
+    else:
+        base = config.PREFILTER_CONFIG["z_limit"]
+        z_limits = [base * 0.75, base, base * 1.25, base * 1.5]
+
+    detector = AnomalyDetector.from_checkpoint(args.model_path)
+    print(f"윈도우 {len(X)}개 (앞쪽 {args.fit_fraction:.0%}로 통계 초기화), 임계값 {detector.threshold:.6f}")
+    for row in agreement_report(detector, X, z_limits, fit_fraction=args.fit_fraction):
+        recall = "-" if row["anomaly_recall"] is None else f"{row['anomaly_recall']:.1%}"
+        error_diff = "-" if row["estimated_error_rel_diff"] is None else f"{row['estimated_error_rel_diff']:.1%}"
+        print(f"z_limit {row['z_limit']:5.2f} (변화량 {row['diff_z_limit']:5.2f})  "
+              f"생략 {row['skip_rate']:6.1%}  놓친 이상 {row['missed_anomalies']:4d}  "
+              f"이상 재현율 {recall:>6}  추정 오차 상대 차이 {error_diff:>6}")
+
+
+if __name__ == "__main__":
+    main()
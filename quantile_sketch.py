@@ -0,0 +1,155 @@
+"""
+스트리밍 분위수 스케치 모듈
+상대 오차가 보장되는 로그 버킷 히스토그램 (DDSketch 방식), 병합 및 직렬화 가능
+"""
+import math
+import struct
+import numpy as np
+from typing import Optional
+
+
+# 직렬화 헤더: relative_accuracy(float64), offset(int64), zero_count(uint64), 버킷 수(uint32)
+_HEADER = struct.Struct("<dqQI")
+
+
+class QuantileSketch:
+    """
+    양수 값의 분위수 스케치
+
+    값 x는 버킷 i = ceil(log_gamma(x))에 세어지며, gamma = (1 + a) / (1 - a)일 때
+    분위수 추정치의 상대 오차는 a 이내이다. 버킷은 연속된 numpy 배열로 저장되고,
+    max_buckets를 넘으면 가장 작은 값 쪽 버킷을 합쳐 메모리를 제한한다 (높은 분위수 정확도 유지).
+    """
+
+    # 이 값 이하는 0으로 취급 (log 계산 불가)
+    MIN_VALUE = 1e-12
+
+    def __init__(self, relative_accuracy: float = 0.02, max_buckets: int = 512):
+        """
+        Args:
+            relative_accuracy: 분위수 추정 상대 오차 (0~1)
+            max_buckets: 최대 버킷 수 (메모리 상한: max_buckets * 4바이트)
+        """
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy는 0과 1 사이여야 합니다.")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = int(max_buckets)
+
+        self._counts = np.zeros(0, dtype=np.uint32)
+        self._offset = 0  # _counts[0]의 버킷 인덱스
+        self.zero_count = 0
+
+    @property
+    def count(self) -> int:
+        """추가된 값의 수"""
+        return self.zero_count + int(self._counts.sum(dtype=np.uint64))
+
+    @property
+    def nbytes(self) -> int:
+        return self._counts.nbytes
+
+    def _ensure_range(self, low: int, high: int):
+        """버킷 인덱스 [low, high]를 담을 수 있도록 배열 확장 (필요 시 하위 버킷 병합)"""
+        if self._counts.size == 0:
+            self._offset = low
+            self._counts = np.zeros(high - low + 1, dtype=np.uint32)
+        else:
+            new_low = min(low, self._offset)
+            new_high = max(high, self._offset + self._counts.size - 1)
+            if new_low != self._offset or new_high - new_low + 1 != self._counts.size:
+                counts = np.zeros(new_high - new_low + 1, dtype=np.uint32)
+                start = self._offset - new_low
+                counts[start:start + self._counts.size] = self._counts
+                self._counts = counts
+                self._offset = new_low
+
+        excess = self._counts.size - self.max_buckets
+        if excess > 0:
+            self._counts[excess] += self._counts[:excess].sum(dtype=np.uint32)
+            self._counts = self._counts[excess:].copy()
+            self._offset += excess
+
+    def add(self, values):
+        """값 (스칼라 또는 배열) 추가"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        positive = values[values > self.MIN_VALUE]
+        self.zero_count += int(values.size - positive.size)
+        if positive.size == 0:
+            return
+
+        index = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+        self._ensure_range(int(index.min()), int(index.max()))
+        # 병합으로 잘린 하위 버킷 값은 가장 낮은 버킷에 포함
+        index = np.maximum(index - self._offset, 0)
+        self._counts += np.bincount(index, minlength=self._counts.size).astype(np.uint32)
+
+    def merge(self, other: "QuantileSketch"):
+        """다른 스케치를 합침 (relative_accuracy가 같아야 함)"""
+        if not math.isclose(self.relative_accuracy, other.relative_accuracy):
+            raise ValueError("relative_accuracy가 다른 스케치는 병합할 수 없습니다.")
+        self.zero_count += other.zero_count
+        if other._counts.size == 0:
+            return
+        self._ensure_range(other._offset, other._offset + other._counts.size - 1)
+        start = max(other._offset - self._offset, 0)
+        clipped = self._offset - other._offset  # 병합으로 잘린 other 하위 버킷 수
+        other_counts = other._counts
+        if clipped > 0:
+            other_counts = other_counts[clipped:].copy()
+            other_counts[0] += other._counts[:clipped].sum(dtype=np.uint32)
+        self._counts[start:start + other_counts.size] += other_counts
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        분위수 추정 (상대 오차 relative_accuracy 이내)
+
+        Args:
+            q: 분위수 (0~1)
+
+        Returns:
+            추정값 (값이 없으면 None)
+        """
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        if rank < self.zero_count:
+            return 0.0
+        cumulative = np.cumsum(self._counts, dtype=np.uint64)
+        i = int(np.searchsorted(cumulative, rank - self.zero_count, side="right"))
+        i = min(i, self._counts.size - 1)
+        return 2.0 * self.gamma ** (i + self._offset) / (self.gamma + 1.0)
+
+    def to_bytes(self) -> bytes:
+        """압축 직렬화 (앞뒤의 빈 버킷 제외)"""
+        nonzero = np.flatnonzero(self._counts)
+        if nonzero.size == 0:
+            counts, offset = np.zeros(0, dtype=np.uint32), 0
+        else:
+            counts = self._counts[nonzero[0]:nonzero[-1] + 1]
+            offset = self._offset + int(nonzero[0])
+        header = _HEADER.pack(self.relative_accuracy, offset, self.zero_count, counts.size)
+        return header + counts.astype("<u4").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, max_buckets: int = 512) -> "QuantileSketch":
+        """to_bytes()로 저장한 스케치 복원"""
+        relative_accuracy, offset, zero_count, size = _HEADER.unpack_from(data)
+        sketch = cls(relative_accuracy, max_buckets=max_buckets)
+        sketch.zero_count = zero_count
+        if size:
+            counts = np.frombuffer(data, dtype="<u4", count=size, offset=_HEADER.size)
+            sketch._ensure_range(offset, offset + size - 1)
+            start = offset - sketch._offset
+            if start < 0:
+                # 저장 당시보다 max_buckets가 작으면 하위 버킷 병합
+                sketch._counts[0] += counts[:-start].sum(dtype=np.uint32)
+                counts = counts[-start:]
+                start = 0
+            sketch._counts[start:start + counts.size] += counts.astype(np.uint32)
+        return sketch
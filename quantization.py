@@ -0,0 +1,162 @@
+"""
+동적 int8 양자화 모듈
+encoder/decoder LSTM과 output Linear 레이어를 int8로 양자화하고
+보정 세트에서 fp32 대비 재구성 오차 차이를 검증 (CPU 전용)
+
+사용 예:
+    python quantization.py --build-calibration --csv val.csv   # 보정 세트 생성
+    python quantization.py                                     # 보정 세트로 검증만 수행
+"""
+import argparse
+import copy
+import os
+import warnings
+import numpy as np
+from typing import Dict, Tuple
+import config
+from anomaly_detector import AnomalyDetector
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+def quantize_model(model):
+    """
+    LSTM/Linear 레이어에 동적 int8 양자화 적용 (원본 모델은 변경하지 않음)
+
+    Args:
+        model: fp32 LSTMAutoencoder
+
+    Returns:
+        양자화된 모델 (CPU)
+    """
+    model = copy.deepcopy(model).cpu().eval()
+    with warnings.catch_warnings():
+        # torch.ao.quantization 사용 중단 예정 경고 무시 (API는 계속 동작)
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.LSTM, torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+def load_calibration_set(path: str = None) -> np.ndarray:
+    """보정 세트 로드 [samples, sequence_length, features] (float32)"""
+    path = path or config.CALIBRATION_SET_PATH
+    return np.load(path).astype(np.float32, copy=False)
+
+
+def save_calibration_set(X: np.ndarray, path: str = None, max_samples: int = 512,
+                         seed: int = 42) -> str:
+    """
+    정규화된 검증 윈도우 일부를 보정 세트로 저장
+
+    Args:
+        X: 정규화된 윈도우 [samples, sequence_length, features]
+        max_samples: 저장할 최대 윈도우 수 (무작위 추출)
+    """
+    path = path or config.CALIBRATION_SET_PATH
+    if len(X) > max_samples:
+        index = np.random.default_rng(seed).choice(len(X), size=max_samples, replace=False)
+        X = X[np.sort(index)]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.save(path, np.ascontiguousarray(X, dtype=np.float32))
+    print(f"보정 세트 저장 완료: {path} ({len(X)}개 윈도우)")
+    return path
+
+
+def validate_quantization(reference: AnomalyDetector, candidate: AnomalyDetector,
+                          X_calib: np.ndarray, tolerance: float = None) -> Dict:
+    """
+    보정 세트에서 양자화 모델의 재구성 오차가 fp32 대비 허용 범위 내인지 검사
+
+    허용 기준: max(|err_int8 - err_fp32|) / threshold <= tolerance
+
+    Returns:
+        {"max_deviation", "mean_deviation", "flag_agreement", "tolerance", "passed"}
+    """
+    tolerance = config.SERVING_CONFIG["quantization_tolerance"] if tolerance is None else tolerance
+    threshold = float(reference.threshold)
+
+    errors_fp32 = reference.calculate_reconstruction_error(X_calib)
+    errors_int8 = candidate.calculate_reconstruction_error(X_calib)
+    deviation = np.abs(errors_int8 - errors_fp32) / threshold
+
+    return {
+        "max_deviation": float(deviation.max()),
+        "mean_deviation": float(deviation.mean()),
+        # 이상 여부 판정이 fp32와 같은 비율
+        "flag_agreement": float(np.mean((errors_fp32 > threshold) == (errors_int8 > threshold))),
+        "samples": int(len(X_calib)),
+        "tolerance": tolerance,
+        "passed": bool(deviation.max() <= tolerance),
+    }
+
+
+def build_quantized_detector(detector: AnomalyDetector, calibration_path: str = None,
+                             tolerance: float = None) -> Tuple[AnomalyDetector, Dict]:
+    """
+    양자화된 detector 생성 후 검증, 실패하면 원래 fp32 detector 반환
+
+    Args:
+        detector: fp32 eager AnomalyDetector
+        calibration_path: 보정 세트 경로 (None이면 config.CALIBRATION_SET_PATH)
+        tolerance: 허용 편차 (threshold 대비)
+
+    Returns:
+        (서빙에 사용할 detector, 검증 결과 {"mode": "int8" | "fp32", ...})
+    """
+    if torch is None or not isinstance(detector.model, torch.nn.Module) \
+            or isinstance(detector.model, torch.jit.ScriptModule):
+        return detector, {"mode": "fp32", "reason": "eager 백엔드에서만 양자화를 지원합니다."}
+    if detector.device is not None and detector.device.type != "cpu":
+        return detector, {"mode": "fp32", "reason": "동적 양자화는 CPU에서만 지원됩니다."}
+
+    calibration_path = calibration_path or config.CALIBRATION_SET_PATH
+    if not os.path.exists(calibration_path):
+        return detector, {"mode": "fp32", "reason": f"보정 세트가 없습니다: {calibration_path}"}
+
+    X_calib = load_calibration_set(calibration_path)
+    quantized = AnomalyDetector(quantize_model(detector.model), threshold=detector.threshold)
+    quantized.model_version = f"{detector.model_version}-int8"
+    report = validate_quantization(detector, quantized, X_calib, tolerance)
+
+    if not report["passed"]:
+        report["mode"] = "fp32"
+        report["reason"] = "양자화 오차가 허용 범위를 벗어났습니다."
+        return detector, report
+
+    report["mode"] = "int8"
+    return quantized, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동적 int8 양자화 검증")
+    parser.add_argument("--model-path", default=config.MODEL_SAVE_PATH, help="fp32 체크포인트")
+    parser.add_argument("--calibration-path", default=config.CALIBRATION_SET_PATH, help="보정 세트 경로")
+    parser.add_argument("--build-calibration", action="store_true",
+                        help="검증 CSV로 보정 세트 생성")
+    parser.add_argument("--csv", help="보정 세트 생성에 사용할 검증 CSV 파일")
+    parser.add_argument("--tolerance", type=float, default=None, help="허용 편차 (threshold 대비)")
+    args = parser.parse_args()
+
+    if args.build_calibration:
+        if not args.csv:
+            parser.error("--build-calibration에는 --csv가 필요합니다.")
+        from data_processor import DataProcessor
+        # 서빙과 동일한 (저장된) scaler로 정규화한 검증 윈도우 사용
+        processor = DataProcessor()
+        processor.load_scaler(config.SCALER_SAVE_PATH)
+        X = processor.load_windows(args.csv, config.MODEL_CONFIG["sequence_length"])
+        save_calibration_set(X, args.calibration_path)
+
+    detector = AnomalyDetector.from_checkpoint(args.model_path)
+    serving_detector, report = build_quantized_detector(
+        detector, args.calibration_path, args.tolerance
+    )
+    print(f"양자화 검증 결과: {report}")
+
+
+if __name__ == "__main__":
+    main()
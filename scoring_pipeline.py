@@ -0,0 +1,451 @@
+"""
+스코어링 파이프라인 모듈
+센서 데이터(딕셔너리 리스트) → 패딩, 특징 추출, 정규화 → 단일 forward pass 이상 탐지
+Flask 없이도 사용/벤치마크 가능
+"""
+import numpy as np
+from typing import Dict, List
+import config
+from featurizer import FeatureKernel
+
+
+class ScoringPipeline:
+    """/predict, /sync_healthkit, /upload_health_data 공용 스코어링 파이프라인"""
+
+    def __init__(self, data_processor, anomaly_detector, batch_scorer=None,
+                 sequence_length: int = None, feature_store=None, result_cache=None,
+                 shadow_scorer=None, threshold_service=None, variable_length: bool = None,
+                 prefilter=None, adapter_store=None):
+        """
+        Args:
+            data_processor: scaler와 feature_names가 로드된 DataProcessor
+            anomaly_detector: AnomalyDetector 인스턴스
+            batch_scorer: BatchScorer 인스턴스 (None이면 detector를 직접 호출)
+            sequence_length: 윈도우 길이 (None이면 MODEL_CONFIG 사용)
+            feature_store: UserFeatureStore 인스턴스 (사용자별 최근 행 보관, 선택)
+            result_cache: InferenceCache 인스턴스 (같은 윈도우 재요청 시 추론 생략, 선택)
+            shadow_scorer: ShadowScorer 인스턴스 (후보 모델 섀도 스코어링, 선택)
+            threshold_service: UserThresholdService 인스턴스 (사용자별 적응형 임계값, 선택)
+            variable_length: True면 sequence_length보다 짧은 데이터를 패딩하지 않고 실제 행만으로 스코어링
+                             (None이면 SERVING_CONFIG["variable_length"])
+            prefilter: StatisticalPrefilter 인스턴스 (명백히 정상인 윈도우는 LSTM 추론 생략, 선택)
+            adapter_store: UserAdapterStore 인스턴스 (사용자별 output 레이어 어댑터, 선택)
+        """
+        self.data_processor = data_processor
+        self.anomaly_detector = anomaly_detector
+        self.batch_scorer = batch_scorer
+        self.feature_store = feature_store
+        self.result_cache = result_cache
+        self.shadow_scorer = shadow_scorer
+        self.threshold_service = threshold_service
+        self.prefilter = prefilter
+        self.adapter_store = adapter_store
+        self._feature_kernel = None
+        self.sequence_length = sequence_length or config.MODEL_CONFIG["sequence_length"]
+        self.variable_length = (config.SERVING_CONFIG["variable_length"]
+                                if variable_length is None else variable_length)
+
+    @classmethod
+    def from_files(cls, model_path: str = None, scaler_path: str = None,
+                   sequence_length: int = None) -> "ScoringPipeline":
+        """
+        모델 체크포인트와 scaler 파일로 파이프라인 생성 (Flask 없이 사용/벤치마크용)
+
+        Args:
+            model_path: 모델 체크포인트 경로 (None이면 config.MODEL_SAVE_PATH)
+            scaler_path: scaler 경로 (None이면 config.SCALER_SAVE_PATH)
+            sequence_length: 윈도우 길이
+        """
+        from anomaly_detector import AnomalyDetector
+        from data_processor import DataProcessor
+
+        anomaly_detector = AnomalyDetector.from_checkpoint(model_path or config.MODEL_SAVE_PATH)
+        data_processor = DataProcessor()
+        data_processor.load_scaler(scaler_path or config.SCALER_SAVE_PATH)
+        data_processor.feature_names = list(config.FEATURE_NAMES)
+        return cls(data_processor, anomaly_detector, sequence_length=sequence_length)
+
+    def with_detector(self, anomaly_detector, batch_scorer=None) -> "ScoringPipeline":
+        """
+        다른 모델로 교체한 새 파이프라인 생성
+        (특징 저장소, 결과 캐시, 섀도 스코어러, 사용자 임계값, 사전 필터, 사용자 어댑터는 공유)
+
+        기존 파이프라인은 그대로 두므로 처리 중인 요청은 이전 모델로 끝까지 처리된다.
+        """
+        return ScoringPipeline(
+            self.data_processor, anomaly_detector,
+            batch_scorer=batch_scorer,
+            sequence_length=self.sequence_length,
+            feature_store=self.feature_store,
+            result_cache=self.result_cache,
+            shadow_scorer=self.shadow_scorer,
+            threshold_service=self.threshold_service,
+            variable_length=self.variable_length,
+            prefilter=self.prefilter,
+            adapter_store=self.adapter_store,
+        )
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.data_processor.feature_names
+
+    @property
+    def feature_kernel(self) -> FeatureKernel:
+        """현재 scaler와 feature_names로 만든 특징 추출 커널 (scaler가 다시 로드되면 새로 생성)"""
+        kernel = self._feature_kernel
+        if (kernel is None or kernel.scaler is not self.data_processor.scaler
+                or kernel.feature_names != list(self.feature_names)):
+            kernel = self._feature_kernel = FeatureKernel(
+                self.data_processor.scaler, self.feature_names,
+                clip=config.SERVING_CONFIG.get("clip_features", False),
+            )
+        return kernel
+
+    def featurize(self, sensor_data: List[Dict]) -> np.ndarray:
+        """
+        센서 데이터 리스트 → 정규화된 특징 행 (누락된 값은 0)
+
+        Returns:
+            [len(sensor_data), features] (float32)
+        """
+        return self.feature_kernel.transform_rows(sensor_data)
+
+    def pad_window(self, rows: np.ndarray, padding: str = "last") -> np.ndarray:
+        """
+        정규화된 행을 sequence_length 길이로 맞춤 (복제 대신 인덱스 반복)
+
+        variable_length가 켜져 있으면 패딩하지 않고 최근 sequence_length개 행만 남긴다
+        (짧은 윈도우는 모델이 실제 시점만으로 재구성 오차를 계산).
+
+        Args:
+            rows: [k, features] 정규화된 행 (시간순, k >= 1)
+            padding: "last"면 마지막 행을 뒤에, "first"면 첫 행을 앞에 반복
+        """
+        if padding not in ("last", "first"):
+            raise ValueError(f"지원하지 않는 padding 방식입니다: {padding}")
+
+        rows = rows[-self.sequence_length:]
+        if self.variable_length:
+            return rows
+        padding_needed = self.sequence_length - len(rows)
+        if padding_needed > 0:
+            if padding == "last":
+                index = np.concatenate([np.arange(len(rows)),
+                                        np.full(padding_needed, len(rows) - 1)])
+            else:
+                index = np.concatenate([np.zeros(padding_needed, dtype=np.int64),
+                                        np.arange(len(rows))])
+            rows = rows[index]
+        return rows
+
+    def build_window(self, sensor_data: List[Dict], padding: str = "last") -> np.ndarray:
+        """
+        센서 데이터 리스트를 정규화된 단일 윈도우로 변환
+
+        Args:
+            sensor_data: [{"heart_rate": 72, "steps": 120, ...}, ...] (시간순)
+            padding: 데이터가 부족할 때 채우는 방법
+                "last": 마지막 행을 뒤에 반복 (/predict)
+                "first": 첫 행을 앞에 반복 (/sync_healthkit, /upload_health_data)
+
+        Returns:
+            정규화된 윈도우 [sequence_length, features] (float32)
+            (variable_length면 [min(len(sensor_data), sequence_length), features])
+        """
+        if not sensor_data:
+            raise ValueError("최소 1개의 데이터 포인트가 필요합니다.")
+
+        # 특징 추출 (최근 sequence_length개만 사용, 정규화와 패딩을 한 번에)
+        return self.feature_kernel.build_window(sensor_data, self.sequence_length, padding,
+                                                pad=not self.variable_length)
+
+    def user_adapter(self, user_id: str = None):
+        """현재 모델로 학습된 사용자 어댑터 (없거나 모델이 어댑터를 지원하지 않으면 None)"""
+        if self.adapter_store is None or not user_id \
+                or not getattr(self.anomaly_detector, "supports_adapters", False):
+            return None
+        return self.adapter_store.get(user_id, self.anomaly_detector.model_version)
+
+    def score_window(self, window: np.ndarray, include_feature_analysis: bool = True,
+                     user_id: str = None) -> Dict:
+        """
+        정규화된 윈도우 하나를 한 번의 forward pass로 스코어링
+        (캐시 적중 시, 또는 사전 필터가 명백히 정상으로 판정하면 추론 생략)
+
+        Args:
+            window: [length, features] 또는 [1, length, features] (length <= sequence_length)
+            include_feature_analysis: feature_analysis 포함 여부
+            user_id: 지정하면 사용자 어댑터 적용 (어댑터가 있으면 결과 캐시, 사전 필터,
+                     섀도 스코어링은 전역 모델 기준이므로 거치지 않음)
+
+        Returns:
+            detect_single() 결과 + "feature_errors" [features], "timestep_errors" [length]
+            (사전 필터로 생략된 경우 "prefiltered": True, 재구성 오차는 추정치이며 오차 배열 없음,
+             어댑터를 적용한 경우 "adapter_version")
+        """
+        if window.ndim == 2:
+            window = window.reshape(1, *window.shape)
+
+        include_analysis = bool(include_feature_analysis and self.feature_names)
+        feature_names = self.feature_names if include_analysis else None
+
+        adapter = self.user_adapter(user_id)
+        if adapter is not None:
+            return self._score_with_adapter(window, adapter, include_analysis, feature_names)
+
+        cache_key = None
+        if self.result_cache is not None:
+            model_version = self.anomaly_detector.model_version
+            threshold = self.anomaly_detector.threshold
+            cache_key = self.result_cache.make_key(window, model_version, threshold, include_analysis)
+            cached = self.result_cache.get(cache_key, model_version, threshold)
+            if cached is not None:
+                self._offer_shadow(window, cached)
+                cached["cache_hit"] = True
+                return cached
+
+        # 캐시 미스: 통계 사전 필터가 명백히 정상으로 판정하면 LSTM 추론 생략
+        decision = None
+        if self.prefilter is not None:
+            decision = self.prefilter.evaluate(window[0], self.anomaly_detector.model_version)
+            if decision.skip:
+                return self.prefilter.skipped_result(decision, self.anomaly_detector)
+
+        if self.batch_scorer is not None:
+            result = self.batch_scorer.submit(
+                window,
+                include_feature_analysis=include_analysis,
+                feature_names=feature_names,
+                return_error_profiles=True
+            )
+        else:
+            result = self.anomaly_detector.detect_batch(
+                window,
+                include_feature_analysis=include_analysis,
+                feature_names=feature_names,
+                return_error_profiles=True
+            )[0]
+
+        if cache_key is not None:
+            self.result_cache.put(cache_key, result, model_version, threshold)
+        if decision is not None:
+            self.prefilter.record(window[0], result, decision)
+        self._offer_shadow(window, result)
+        return result
+
+    def _score_with_adapter(self, window: np.ndarray, adapter, include_analysis: bool,
+                            feature_names: List[str]) -> Dict:
+        """사용자 어댑터를 적용한 스코어링 (배치 스코어러에서는 다른 사용자의 요청과 같은 배치로 추론)"""
+        if self.batch_scorer is not None:
+            result = self.batch_scorer.submit(
+                window,
+                include_feature_analysis=include_analysis,
+                feature_names=feature_names,
+                return_error_profiles=True,
+                adapter=adapter
+            )
+        else:
+            result = self.anomaly_detector.detect_batch(
+                window,
+                include_feature_analysis=include_analysis,
+                feature_names=feature_names,
+                return_error_profiles=True,
+                adapters=(adapter.weight[None], adapter.bias[None])
+            )[0]
+        result["adapter_version"] = adapter.version
+        return result
+
+    def _offer_shadow(self, window: np.ndarray, result: Dict):
+        """섀도 스코어링 샘플 제출 (요청 경로에서는 큐에 넣기만 함)"""
+        shadow_scorer = self.shadow_scorer
+        if shadow_scorer is not None:
+            shadow_scorer.offer(window, result)
+
+    def apply_user_threshold(self, result: Dict, user_id: str = None) -> Dict:
+        """
+        사용자별 적응형 임계값 적용 후 사용자 오차 스케치 갱신
+
+        충분한 샘플이 모인 사용자는 개인화 임계값으로 is_anomaly, anomaly_score, threshold를 다시 계산한다.
+        캐시 적중 결과(같은 윈도우 재요청)와 사전 필터로 생략된 결과(추정 오차)는 스케치에 추가하지 않는다.
+
+        Returns:
+            result (+ "global_threshold", "threshold_source": "user" 또는 "global")
+        """
+        service = self.threshold_service
+        if service is None or not user_id:
+            return result
+
+        detector = self.anomaly_detector
+        global_threshold = float(detector.threshold)
+        error = float(result["reconstruction_error"])
+        # 어댑터가 바뀌면 사용자 오차 분포도 바뀌므로 모델 교체와 같이 스케치를 다시 수집
+        model_version = detector.model_version
+        if result.get("adapter_version"):
+            model_version = f"{model_version}+{result['adapter_version']}"
+        threshold, source = service.get_threshold(user_id, global_threshold, model_version)
+        if source == "user":
+            result["anomaly_score"] = float(
+                detector.compute_anomaly_scores(np.array([error]), threshold=threshold)[0]
+            )
+            result["is_anomaly"] = bool(error > threshold)
+            result["threshold"] = threshold
+        result["global_threshold"] = global_threshold
+        result["threshold_source"] = source
+
+        if not result.get("cache_hit") and not result.get("prefiltered"):
+            # 현재 임계값을 넘는 오차는 스케치에 넣지 않음 (이상 패턴이 임계값을 끌어올리지 않도록)
+            service.update(user_id, error, model_version, global_threshold)
+        return result
+
+    def score(self, sensor_data: List[Dict], padding: str = "last",
+              include_feature_analysis: bool = True, user_id: str = None) -> Dict:
+        """
+        센서 데이터 리스트 → 이상 탐지 결과
+
+        Args:
+            user_id: 지정하면 사용자 어댑터와 사용자별 적응형 임계값 적용
+
+        Returns:
+            {
+                "anomaly_score", "reconstruction_error", "is_anomaly", "threshold",
+                "feature_analysis" (optional),
+                "feature_errors": np.ndarray [features],
+                "timestep_errors": np.ndarray [윈도우 길이]
+            }
+        """
+        window = self.build_window(sensor_data, padding=padding)
+        result = self.score_window(window, include_feature_analysis=include_feature_analysis,
+                                   user_id=user_id)
+        return self.apply_user_threshold(result, user_id)
+
+    def score_user(self, user_id: str, sensor_data: List[Dict], incremental: bool = False,
+                   include_feature_analysis: bool = True) -> Dict:
+        """
+        사용자별 링 버퍼를 사용하는 스코어링
+
+        Args:
+            user_id: 사용자 ID
+            sensor_data: incremental=True면 새로 수집된 행만, False면 전체 윈도우
+            incremental: True면 새 행을 버퍼에 추가하고 버퍼의 전체 윈도우로 스코어링
+
+        Returns:
+            score()와 동일한 결과 + "buffered_rows" (윈도우에 포함된 실제 행 수)
+        """
+        if self.feature_store is None:
+            raise RuntimeError("사용자 특징 저장소가 활성화되지 않았습니다.")
+
+        rows = self.featurize(sensor_data[-self.sequence_length:]) if sensor_data else None
+        if incremental:
+            if rows is not None:
+                self.feature_store.append(user_id, rows)
+            rows = self.feature_store.get_window(user_id)
+            if rows is None or len(rows) == 0:
+                raise ValueError("최소 1개의 데이터 포인트가 필요합니다.")
+        else:
+            if rows is None:
+                raise ValueError("최소 1개의 데이터 포인트가 필요합니다.")
+            # 전체 윈도우를 받은 경우 다음 증분 요청을 위해 버퍼를 교체
+            self.feature_store.replace(user_id, rows)
+
+        result = self.score_window(self.pad_window(rows, "last"),
+                                   include_feature_analysis=include_feature_analysis, user_id=user_id)
+        result["buffered_rows"] = int(len(rows))
+        return self.apply_user_threshold(result, user_id)
+
+    def score_history(self, sensor_data: List[Dict], stride: int = None,
+                      batch_size: int = None, top_k: int = None) -> Dict:
+        """
+        업로드된 전체 기간을 슬라이딩 윈도우로 스코어링
+
+        윈도우는 정규화된 특징 행에 대한 strided view이며 (복사 없음),
+        batch_size개씩만 연속 메모리로 옮겨 한 번에 추론한다.
+
+        Args:
+            sensor_data: 시간순 센서 데이터 전체
+            stride: 윈도우 시작 간격 (None이면 HISTORY_CONFIG["default_stride"])
+            batch_size: 한 번에 추론할 윈도우 수
+            top_k: 반환할 가장 이상한 윈도우 수
+
+        Returns:
+            {
+                "window_count", "stride", "sequence_length",
+                "start_times": [...], "scores": [...],   # 윈도우별 이상 점수 타임라인
+                "anomaly_count": int,
+                "worst_windows": [{"start_time", "end_time", "anomaly_score",
+                                   "reconstruction_error", "top_anomalous_features"}, ...]
+            }
+        """
+        from numpy.lib.stride_tricks import sliding_window_view
+
+        history_config = config.HISTORY_CONFIG
+        stride = max(1, int(stride or history_config["default_stride"]))
+        batch_size = max(1, int(batch_size or history_config["batch_size"]))
+        top_k = history_config["top_k"] if top_k is None else int(top_k)
+
+        if not sensor_data:
+            raise ValueError("최소 1개의 데이터 포인트가 필요합니다.")
+
+        rows = self.featurize(sensor_data)
+        window_length = self.sequence_length
+        row_times = [row.get("time") for row in sensor_data]
+        if len(rows) < self.sequence_length:
+            if self.variable_length:
+                # 데이터가 윈도우 하나보다 짧으면 실제 행만으로 된 단일 윈도우
+                window_length = len(rows)
+            else:
+                # 데이터가 윈도우 하나보다 짧으면 첫 행으로 패딩한 단일 윈도우
+                rows = self.pad_window(rows, "first")
+                row_times = [sensor_data[0].get("time")] * (self.sequence_length - len(sensor_data)) \
+                    + row_times
+
+        # [윈도우 수, features, window_length] view → [윈도우 수, window_length, features]
+        all_windows = sliding_window_view(rows, window_length, axis=0).transpose(0, 2, 1)
+        total = len(all_windows)
+        max_windows = history_config["max_windows"]
+        if max_windows and (total + stride - 1) // stride > max_windows:
+            stride = -(-total // max_windows)
+
+        starts = np.arange(0, total, stride)
+        strided = all_windows[::stride]  # 기본 슬라이싱이므로 여전히 view
+        if starts[-1] != total - 1:
+            starts = np.append(starts, total - 1)  # 가장 최근 윈도우는 항상 포함
+
+        reconstruction_errors = np.empty(len(starts), dtype=np.float32)
+        feature_errors = np.empty((len(starts), rows.shape[1]), dtype=np.float32)
+        for begin in range(0, len(starts), batch_size):
+            end = min(begin + batch_size, len(starts))
+            batch = strided[begin:min(end, len(strided))]
+            if end > len(strided):
+                batch = np.concatenate([batch, all_windows[-1:]])
+            else:
+                batch = np.ascontiguousarray(batch)
+            errors, batch_feature_errors, _ = self.anomaly_detector.compute_error_profiles(batch)
+            reconstruction_errors[begin:end] = errors
+            feature_errors[begin:end] = batch_feature_errors
+
+        scores = self.anomaly_detector.compute_anomaly_scores(reconstruction_errors)
+        threshold = float(self.anomaly_detector.threshold)
+
+        worst_windows = []
+        for i in np.argsort(-scores, kind="stable")[:max(top_k, 0)]:
+            start = int(starts[i])
+            analysis = self.anomaly_detector.build_feature_analysis(feature_errors[i], self.feature_names)
+            worst_windows.append({
+                "start_time": row_times[start],
+                "end_time": row_times[start + window_length - 1],
+                "anomaly_score": float(scores[i]),
+                "reconstruction_error": float(reconstruction_errors[i]),
+                "is_anomaly": bool(reconstruction_errors[i] > threshold),
+                "top_anomalous_features": analysis["top_anomalous_features"],
+            })
+
+        return {
+            "window_count": int(len(starts)),
+            "stride": stride,
+            "sequence_length": window_length,
+            "threshold": threshold,
+            "start_times": [row_times[int(start)] for start in starts],
+            "scores": np.round(scores.astype(np.float64), 4).tolist(),
+            "anomaly_count": int(np.count_nonzero(reconstruction_errors > threshold)),
+            "worst_windows": worst_windows,
+        }
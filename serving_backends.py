@@ -0,0 +1,193 @@
+"""
+서빙 백엔드 모듈
+내보낸 모델 아티팩트를 torch 없이 실행하기 위한 러너 (ONNX Runtime, 순수 NumPy)
+"""
+import json
+import numpy as np
+from typing import Dict
+
+
+def load_export_metadata(meta_path: str) -> Dict:
+    """
+    model_export.py가 저장한 메타데이터 로드
+
+    Returns:
+        {"threshold", "feature_names", "config", "sequence_length",
+         "torchscript_file", "onnx_file", "numpy_file", ...}
+    """
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class OnnxAutoencoderRunner:
+    """ONNX Runtime으로 LSTM Autoencoder를 실행하는 러너 (torch 불필요)"""
+
+    # AnomalyDetector가 torch 텐서 대신 numpy 배열을 직접 넘기도록 표시
+    accepts_numpy = True
+
+    def __init__(self, onnx_path: str, num_threads: int = 1):
+        """
+        Args:
+            onnx_path: ONNX 모델 경로
+            num_threads: intra-op 스레드 수 (배포 환경 CPU 제한 대응)
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError(
+                "ONNX 백엔드를 사용하려면 onnxruntime이 필요합니다. (pip install onnxruntime)"
+            ) from e
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            onnx_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+
+    def reconstruct(self, X: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            X: [batch_size, sequence_length, features] (float32)
+
+        Returns:
+            재구성된 시퀀스 [batch_size, sequence_length, features] (float32)
+        """
+        return self.session.run([self.output_name], {self.input_name: X})[0]
+
+
+class NumpyAutoencoderRunner:
+    """
+    순수 NumPy로 LSTM Autoencoder를 실행하는 러너 (torch, onnxruntime 불필요)
+
+    model.LSTMAutoencoder의 추론 경로(다층 LSTM encoder → decoder → Linear)를 그대로 구현한다.
+    게이트 순서와 가중치 이름은 PyTorch nn.LSTM과 동일 (i, f, g, o).
+    """
+
+    accepts_numpy = True
+    # reconstruct(X, lengths)로 길이가 다른 윈도우 배치 지원
+    supports_lengths = True
+
+    def __init__(self, npz_path: str):
+        """
+        Args:
+            npz_path: model_export.py가 저장한 가중치 파일 (state_dict 키 → 배열)
+        """
+        with np.load(npz_path, allow_pickle=False) as weights:
+            state = {key: weights[key].astype(np.float32) for key in weights.files}
+
+        self.num_layers = sum(1 for key in state if key.startswith("encoder.weight_ih_l"))
+        self.hidden_size = state["encoder.weight_hh_l0"].shape[1]
+        self.input_size = state["encoder.weight_ih_l0"].shape[1]
+        self.encoder = self._load_lstm(state, "encoder")
+        self.decoder = self._load_lstm(state, "decoder")
+        # matmul에 바로 쓸 수 있도록 전치해서 보관
+        self.output_weight = np.ascontiguousarray(state["output.weight"].T)
+        self.output_bias = state["output.bias"]
+
+    def _load_lstm(self, state: Dict, prefix: str):
+        """
+        층별 (W_ih^T, W_hh^T, b_ih + b_hh) 목록
+
+        sigmoid(x) = 0.5 * tanh(0.5 * x) + 0.5 이므로 i, f, o 게이트의 가중치와 편향을 미리 0.5배 해두면
+        시점마다 네 게이트 전체에 tanh 한 번만 적용하면 된다.
+        """
+        H = self.hidden_size
+        gate_scale = np.full(4 * H, 0.5, dtype=np.float32)
+        gate_scale[2 * H:3 * H] = 1.0  # g 게이트는 원래 tanh
+        layers = []
+        for layer in range(self.num_layers):
+            layers.append((
+                np.ascontiguousarray(state[f"{prefix}.weight_ih_l{layer}"].T * gate_scale),
+                np.ascontiguousarray(state[f"{prefix}.weight_hh_l{layer}"].T * gate_scale),
+                (state[f"{prefix}.bias_ih_l{layer}"] + state[f"{prefix}.bias_hh_l{layer}"]) * gate_scale,
+            ))
+        return layers
+
+    def _run_lstm(self, layers, x: np.ndarray, h0=None, c0=None, lengths=None):
+        """
+        다층 LSTM (batch_first)
+
+        층 하나의 입력 전체가 미리 정해지므로 입력 투영은 모든 시점에 대해 한 번의 matmul로 계산하고,
+        시점별 루프에서는 hidden 투영만 계산한다.
+        lengths가 주어지면 배치는 길이 내림차순으로 정렬되어 있어야 하며, 시점 t에서는 길이가 t보다 긴
+        앞쪽 샘플만 계산한다 (PyTorch packed sequence와 동일하게 h_n, c_n은 실제 마지막 시점의 상태).
+
+        Returns:
+            outputs [batch_size, sequence_length, hidden_size], (h_n, c_n) 각 [num_layers, batch_size, hidden_size]
+        """
+        batch_size, seq_len, _ = x.shape
+        H = self.hidden_size
+        h_n = np.zeros((self.num_layers, batch_size, H), dtype=np.float32)
+        c_n = np.zeros((self.num_layers, batch_size, H), dtype=np.float32)
+        if lengths is None:
+            steps = seq_len
+        else:
+            # 시점별 계산할 샘플 수 (모든 샘플이 끝난 뒤의 시점은 계산하지 않음)
+            steps = int(lengths[0])
+            active = np.searchsorted(-lengths, -np.arange(steps), side="left").tolist()
+
+        for layer, (w_ih, w_hh, bias) in enumerate(layers):
+            gates_x = x[:, :steps] @ w_ih + bias  # [batch, steps, 4H]
+            h, c = h_n[layer], c_n[layer]
+            if h0 is not None:
+                h[:], c[:] = h0[layer], c0[layer]
+            outputs = np.zeros((batch_size, seq_len, H), dtype=np.float32)
+            gates = np.empty((batch_size, 4 * H), dtype=np.float32)
+            if lengths is None:
+                for t in range(steps):
+                    np.matmul(h, w_hh, out=gates)
+                    gates += gates_x[:, t]
+                    np.tanh(gates, out=gates)
+                    # i, f, o: tanh → sigmoid 변환 (g는 그대로)
+                    sig = gates[:, :2 * H] * 0.5 + 0.5
+                    o = gates[:, 3 * H:] * 0.5 + 0.5
+                    c = sig[:, H:] * c + sig[:, :H] * gates[:, 2 * H:3 * H]
+                    h = o * np.tanh(c)
+                    outputs[:, t] = h
+            else:
+                # 길이가 다른 배치: 끝나지 않은 앞쪽 n개 샘플만 제자리 갱신
+                for t in range(steps):
+                    n = active[t]
+                    g = gates[:n]
+                    np.matmul(h[:n], w_hh, out=g)
+                    g += gates_x[:n, t]
+                    np.tanh(g, out=g)
+                    sig = g[:, :2 * H] * 0.5 + 0.5
+                    o = g[:, 3 * H:] * 0.5 + 0.5
+                    c[:n] = sig[:, H:] * c[:n] + sig[:, :H] * g[:, 2 * H:3 * H]
+                    h[:n] = o * np.tanh(c[:n])
+                    outputs[:n, t] = h[:n]
+            h_n[layer], c_n[layer] = h, c
+            x = outputs
+        return x, (h_n, c_n)
+
+    def reconstruct(self, X: np.ndarray, lengths: np.ndarray = None) -> np.ndarray:
+        """
+        Args:
+            X: [batch_size, sequence_length, features] (float32)
+            lengths: 샘플별 실제 길이 [batch_size] (None이면 모두 sequence_length, 뒤쪽 패딩 시점은 무시)
+
+        Returns:
+            재구성된 시퀀스 [batch_size, sequence_length, features] (float32)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        order = None
+        if lengths is not None:
+            lengths = np.asarray(lengths, dtype=np.int64)
+            if np.all(lengths == X.shape[1]):
+                lengths = None
+            else:
+                # 길이 내림차순 정렬 (시점마다 아직 끝나지 않은 앞쪽 샘플만 계산)
+                order = np.argsort(-lengths, kind="stable")
+                X, lengths = X[order], lengths[order]
+        # 추론 모드이므로 dropout은 항등 함수
+        encoded, (hidden, cell) = self._run_lstm(self.encoder, X, lengths=lengths)
+        decoded, _ = self._run_lstm(self.decoder, encoded, hidden, cell, lengths=lengths)
+        reconstructed = decoded @ self.output_weight + self.output_bias
+        if order is not None:
+            reconstructed[order] = reconstructed.copy()
+        return reconstructed
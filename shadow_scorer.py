@@ -0,0 +1,184 @@
+"""
+섀도 스코어링 모듈
+운영 트래픽의 일부를 후보 모델로 요청 경로 밖(백그라운드 스레드)에서 다시 스코어링하고
+운영 모델 점수와의 차이를 기록
+"""
+import queue
+import random
+import threading
+import time
+from collections import deque
+import numpy as np
+from typing import Dict
+import config
+
+
+class ShadowScorer:
+    """후보 모델 섀도 스코어러 (요청 지연 시간에 영향 없음, 큐가 가득 차면 샘플 폐기)"""
+
+    def __init__(self, candidate_detector, version: str = None, sample_rate: float = None,
+                 queue_size: int = None, history_size: int = 1000):
+        """
+        Args:
+            candidate_detector: 후보 모델의 AnomalyDetector
+            version: 후보 모델 버전 (지표 표시용)
+            sample_rate: 섀도 스코어링할 요청 비율 (0~1)
+            queue_size: 대기 큐 최대 길이
+            history_size: 차이 통계를 위해 보관할 최근 샘플 수
+        """
+        registry_config = config.MODEL_REGISTRY_CONFIG
+        self.candidate_detector = candidate_detector
+        self.version = version
+        self.sample_rate = registry_config["shadow_sample_rate"] if sample_rate is None else sample_rate
+        self.max_batch_size = config.BATCH_CONFIG["max_batch_size"]
+        self._queue = queue.Queue(maxsize=queue_size or registry_config["shadow_queue_size"])
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stopped = False
+
+        # 최근 샘플별 (시각, 운영/후보 재구성 오차, 운영/후보 점수, 운영/후보 판정)
+        self._records = deque(maxlen=history_size)
+        self._offered = 0
+        self._sampled = 0
+        self._dropped = 0
+        self._scored = 0
+        self._errors = 0
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+            self._worker.start()
+
+    def offer(self, window: np.ndarray, production_result: Dict) -> bool:
+        """
+        운영 스코어링 결과를 섀도 스코어링 후보로 제출 (sample_rate 확률로 채택, 대기 없음)
+
+        Args:
+            window: 정규화된 윈도우 [sequence_length, features] 또는 [1, sequence_length, features]
+            production_result: 운영 모델의 detect_batch() 결과
+
+        Returns:
+            큐에 추가되었는지 여부
+        """
+        self._offered += 1
+        if self._stopped or random.random() >= self.sample_rate:
+            return False
+        self._sampled += 1
+        if window.ndim == 3:
+            window = window[0]
+        try:
+            self._queue.put_nowait((
+                window,
+                float(production_result["reconstruction_error"]),
+                float(production_result["anomaly_score"]),
+                bool(production_result["is_anomaly"]),
+            ))
+        except queue.Full:
+            self._dropped += 1
+            return False
+        self._ensure_worker()
+        return True
+
+    def _run(self):
+        """큐에 쌓인 샘플을 모아 후보 모델로 한 번에 스코어링"""
+        while not self._stopped:
+            item = self._queue.get()
+            if item is None:
+                break
+            items = [item]
+            while len(items) < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._stopped = True
+                    break
+                items.append(item)
+            self._score(items)
+
+    def _score(self, items):
+        # shape이 같은 윈도우끼리 묶어 추론
+        groups = {}
+        for item in items:
+            groups.setdefault(item[0].shape, []).append(item)
+
+        for group in groups.values():
+            try:
+                errors = self.candidate_detector.calculate_reconstruction_error(
+                    np.stack([item[0] for item in group])
+                )
+                scores = self.candidate_detector.compute_anomaly_scores(errors)
+            except Exception as e:
+                print(f"섀도 스코어링 실패 ({self.version}): {e}")
+                self._errors += len(group)
+                continue
+            threshold = float(self.candidate_detector.threshold)
+            with self._lock:
+                for item, error, score in zip(group, errors, scores):
+                    _, prod_error, prod_score, prod_flag = item
+                    self._records.append((
+                        time.time(), prod_error, float(error), prod_score, float(score),
+                        prod_flag, bool(error > threshold),
+                    ))
+                self._scored += len(group)
+
+    def stop(self):
+        """워커 스레드 중지"""
+        self._stopped = True
+        if self._worker is not None and self._worker.is_alive():
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self._worker.join(timeout=1.0)
+
+    def get_metrics(self) -> Dict:
+        """
+        후보 모델과 운영 모델의 점수 차이 통계 (최근 history_size개 샘플 기준)
+
+        Returns:
+            {"version", "sample_rate", "offered", "sampled", "dropped", "scored", "errors",
+             "score_abs_diff": {"mean", "p95", "max"}, "error_rel_diff": {...},
+             "flag_agreement": 판정 일치율}
+        """
+        with self._lock:
+            records = list(self._records)
+            metrics = {
+                "version": self.version,
+                "sample_rate": self.sample_rate,
+                "offered": self._offered,
+                "sampled": self._sampled,
+                "dropped": self._dropped,
+                "scored": self._scored,
+                "errors": self._errors,
+                "queue_size": self._queue.qsize(),
+            }
+        if not records:
+            return metrics
+
+        _, prod_errors, cand_errors, prod_scores, cand_scores, prod_flags, cand_flags = \
+            map(np.asarray, zip(*records))
+        score_diff = np.abs(cand_scores - prod_scores)
+        error_rel_diff = np.abs(cand_errors - prod_errors) / np.maximum(prod_errors, 1e-12)
+        metrics.update({
+            "window": len(records),
+            "score_abs_diff": _summarize(score_diff),
+            "error_rel_diff": _summarize(error_rel_diff),
+            "flag_agreement": float(np.mean(prod_flags == cand_flags)),
+            "production_anomaly_rate": float(np.mean(prod_flags)),
+            "candidate_anomaly_rate": float(np.mean(cand_flags)),
+        })
+        return metrics
+
+
+def _summarize(values: np.ndarray) -> Dict:
+    return {
+        "mean": float(values.mean()),
+        "p95": float(np.percentile(values, 95)),
+        "max": float(values.max()),
+    }
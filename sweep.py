@@ -0,0 +1,525 @@
+"""
+하이퍼파라미터 탐색 스크립트
+MODEL_CONFIG의 hidden_size / num_layers / dropout / sequence_length 격자를 프로세스 풀에서 동시에 학습하고
+(trial마다 torch 스레드 수 제한), 학습된 모델마다 threshold_multiplier 후보를 재학습 없이 평가해
+검증 손실, 테스트 이상 비율, 추론 지연 시간, 모델 크기를 결과 표(results.csv)로 저장.
+CSV는 한 번만 읽어 공유 특징 행렬(.npy)로 만들고 모든 trial이 메모리 매핑으로 같은 파일을 연다.
+Pareto 최적 설정은 load_model()이 읽는 서빙용 체크포인트로 내보낼 수 있음
+
+사용 예:
+    python sweep.py run --csv data_cache/train_features.csv --hidden-size 32 64 --num-layers 1 2 --jobs 2
+    python sweep.py run --csv data_cache/train_features.csv --sequence-length 30 60 --export
+    python sweep.py pareto --objectives val_loss size_bytes --export --register
+"""
+import argparse
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from typing import Dict, List
+import config
+from anomaly_detector import AnomalyDetector, StreamingErrorStats
+from data_processor import DataProcessor, WindowedDataset
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+RESULT_COLUMNS = [
+    "trial", "hidden_size", "num_layers", "dropout", "sequence_length", "threshold_multiplier",
+    "threshold", "val_loss", "val_error_mean", "val_error_std", "test_error_mean", "test_flag_rate",
+    "flag_rate_error",
+    "latency_ms", "latency_ms_batch", "parameters", "size_bytes", "epochs_run", "train_seconds",
+    "pareto", "checkpoint",
+]
+INT_COLUMNS = {"hidden_size", "num_layers", "sequence_length", "parameters", "size_bytes", "epochs_run", "pareto"}
+TEXT_COLUMNS = {"trial", "checkpoint"}
+
+
+def trial_grid(args) -> List[Dict]:
+    """학습할 trial 목록 (threshold_multiplier는 학습과 무관하므로 격자에 넣지 않음)"""
+    trials = []
+    for hidden_size, num_layers, dropout, sequence_length in product(
+            args.hidden_size, args.num_layers, args.dropout, args.sequence_length):
+        trials.append({
+            "trial": f"h{hidden_size}_l{num_layers}_d{dropout:g}_s{sequence_length}",
+            "hidden_size": hidden_size,
+            "num_layers": num_layers,
+            "dropout": dropout,
+            "sequence_length": sequence_length,
+        })
+    return trials
+
+
+def prepare_shared_dataset(args) -> Dict[str, str]:
+    """
+    CSV를 한 번만 읽어 정규화한 특징 행렬과 scaler를 output_dir에 저장 (이미 있고 CSV가 그대로면 재사용)
+
+    특징 행렬은 sequence_length와 무관하므로 모든 trial이 같은 파일을 메모리 매핑으로 열고
+    각자의 sequence_length로 윈도우만 만든다 (페이지 캐시를 프로세스끼리 공유).
+
+    Returns:
+        {"features_path", "scaler_path"}
+    """
+    features_path = os.path.join(args.output_dir, "features.npy")
+    scaler_path = os.path.join(args.output_dir, "scaler.pkl")
+    meta_path = os.path.join(args.output_dir, "features.meta.json")
+    if not args.rebuild and all(os.path.exists(path) for path in (features_path, scaler_path, meta_path)):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if (meta.get("source") == os.path.abspath(args.csv)
+                and meta.get("feature_names") == args.feature_columns
+                and (meta.get("segments") is not None) == bool(args.group_column)
+                and os.path.getmtime(features_path) >= os.path.getmtime(args.csv)):
+            print(f"공유 특징 행렬 재사용: {features_path} ({meta['rows']} 행)")
+            return {"features_path": features_path, "scaler_path": scaler_path}
+
+    processor = DataProcessor(config.DATA_CONFIG["missing_value_strategy"])
+    processor.build_feature_memmap(args.csv, features_path, args.feature_columns, args.group_column)
+    processor.save_scaler(scaler_path)
+    return {"features_path": features_path, "scaler_path": scaler_path}
+
+
+def run_trial(trial: Dict, options: Dict) -> Dict:
+    """
+    trial 하나 학습 (프로세스 풀 워커에서 실행, 학습 로그는 output_dir/logs/<trial>.log)
+
+    Args:
+        trial: trial_grid()의 항목
+        options: 학습 설정 (features_path, epochs, batch_size, num_threads, ... - 프로세스로 넘기므로 dict)
+
+    Returns:
+        trial 지표 (threshold_multiplier별 행은 expand_rows()에서 만듦)
+    """
+    log_dir = os.path.join(options["output_dir"], "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, trial["trial"] + ".log"), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log):
+        return _run_trial(trial, options)
+
+
+def _run_trial(trial: Dict, options: Dict) -> Dict:
+    from model import LSTMAutoencoder
+    from train import make_loader, train
+
+    # 워커 프로세스는 trial 여러 개를 이어서 실행하고, 이전 trial의 AnomalyDetector가 스레드 수를 1로
+    # 바꿔 두므로 trial마다 다시 설정 (trial끼리 코어를 나눠 쓰도록 제한)
+    torch.set_num_threads(options["num_threads"])
+    torch.manual_seed(options["seed"])
+    dataset = WindowedDataset.open(options["features_path"], trial["sequence_length"], options["stride"])
+    train_set, val_set, test_set = dataset.split(
+        config.DATA_CONFIG["test_size"], config.DATA_CONFIG["validation_size"], options["split_by"]
+    )
+    if len(train_set) == 0 or len(val_set) == 0:
+        raise ValueError(f"학습/검증 윈도우가 없습니다. (sequence_length {trial['sequence_length']})")
+    print(f"trial {trial['trial']}: 학습 {len(train_set)}개, 검증 {len(val_set)}개, "
+          f"테스트 {len(test_set)}개 윈도우, torch 스레드 {torch.get_num_threads()}개")
+
+    model = LSTMAutoencoder(
+        input_size=dataset.shape[2], hidden_size=trial["hidden_size"],
+        num_layers=trial["num_layers"], dropout=trial["dropout"],
+    )
+    started = time.perf_counter()
+    model, history = train(
+        model,
+        make_loader(train_set, options["batch_size"], True, 0, options["seed"]),
+        make_loader(val_set, options["batch_size"] * 4, False, 0, options["seed"]),
+        options["epochs"], options["learning_rate"], options["patience"],
+        config.TRAIN_CONFIG["min_delta"], config.TRAIN_CONFIG["grad_clip"], seed=options["seed"],
+    )
+    train_seconds = time.perf_counter() - started
+
+    # 검증/테스트 오차를 저장해 두면 threshold_multiplier마다 다시 추론할 필요 없음
+    detector = AnomalyDetector(model)
+    val_errors = np.concatenate(list(detector.iter_reconstruction_errors(val_set)))
+    val_stats = StreamingErrorStats()
+    val_stats.add(val_errors)
+    test_errors = np.concatenate(
+        list(detector.iter_reconstruction_errors(test_set)) + [np.empty(0, dtype=np.float32)]
+    )
+
+    # load_model() / AnomalyDetector.from_checkpoint()가 읽는 형식 그대로 저장 (임계값은 기본 multiplier 값, 내보낼 때 다시 정함)
+    trial_dir = os.path.join(options["output_dir"], "trials")
+    os.makedirs(trial_dir, exist_ok=True)
+    checkpoint_path = os.path.join(trial_dir, trial["trial"] + ".pth")
+    best = min(history, key=lambda row: row["val_loss"]) if history else {}
+    torch.save({
+        "model_state_dict": model.state_dict(),
+        "config": {
+            "input_size": dataset.shape[2],
+            "hidden_size": trial["hidden_size"],
+            "num_layers": trial["num_layers"],
+            "dropout": trial["dropout"],
+        },
+        "threshold": np.float32(_threshold(val_stats, config.ANOMALY_CONFIG["threshold_multiplier"])),
+        "training": {
+            "data_path": options["csv"],
+            "feature_names": options["feature_columns"],
+            "epochs_run": len(history),
+            "best_epoch": best.get("epoch"),
+            "best_val_loss": best.get("val_loss"),
+            "history": history,
+        },
+        "sweep": {"trial": trial["trial"], "sequence_length": trial["sequence_length"]},
+    }, checkpoint_path)
+    np.save(os.path.join(trial_dir, trial["trial"] + ".val_errors.npy"), val_errors)
+    np.save(os.path.join(trial_dir, trial["trial"] + ".test_errors.npy"), test_errors)
+
+    result = dict(trial)
+    result.update({
+        "settings": options["settings"],
+        "checkpoint": checkpoint_path,
+        "val_loss": best.get("val_loss"),
+        "val_error_mean": val_stats.mean,
+        "val_error_std": val_stats.std,
+        "test_error_mean": float(test_errors.mean()) if len(test_errors) else None,
+        "parameters": int(sum(p.numel() for p in model.parameters())),
+        "size_bytes": os.path.getsize(checkpoint_path),
+        "epochs_run": len(history),
+        "train_seconds": train_seconds,
+    })
+    with open(os.path.join(trial_dir, trial["trial"] + ".json"), 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"trial 완료: {checkpoint_path} ({train_seconds:.1f}초)")
+    return result
+
+
+def _cached_result(trial: Dict, options: Dict):
+    """같은 학습 설정으로 이미 끝난 trial 결과 (없으면 None)"""
+    path = os.path.join(options["output_dir"], "trials", trial["trial"] + ".json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+    if result.get("settings") != options["settings"] or not os.path.exists(result["checkpoint"]):
+        return None
+    if not os.path.exists(os.path.join(options["output_dir"], "trials", trial["trial"] + ".val_errors.npy")):
+        return None
+    return result
+
+
+def run_trials(trials: List[Dict], options: Dict, jobs: int, threads_per_trial: int) -> List[Dict]:
+    """
+    trial을 프로세스 풀에서 동시에 학습 (이미 같은 설정으로 끝난 trial은 건너뜀)
+
+    Returns:
+        성공한 trial 결과 목록 (실패한 trial은 로그 경로와 함께 출력만 함)
+    """
+    results, pending = [], []
+    for trial in trials:
+        cached = None if options["retrain"] else _cached_result(trial, options)
+        if cached is not None:
+            print(f"  {trial['trial']}: 이전 결과 재사용")
+            results.append(cached)
+        else:
+            pending.append(trial)
+    if not pending:
+        return results
+
+    jobs = max(1, min(jobs, len(pending)))
+    threads = threads_per_trial or max(1, (os.cpu_count() or 1) // jobs)
+    print(f"trial {len(pending)}개 학습: 동시 {jobs}개 × torch 스레드 {threads}개 "
+          f"(로그: {os.path.join(options['output_dir'], 'logs')})")
+    # fork 대신 spawn (torch 스레드 풀을 복사하지 않도록)
+    context = multiprocessing.get_context("spawn")
+    options = dict(options, num_threads=threads)
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+        futures = {executor.submit(run_trial, trial, options): trial for trial in pending}
+        for future in as_completed(futures):
+            trial = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"  {trial['trial']}: 실패 - {e}")
+                continue
+            print(f"  {trial['trial']}: 검증 손실 {result['val_loss']:.6f}, "
+                  f"{result['epochs_run']} epoch, {result['train_seconds']:.1f}초")
+            results.append(result)
+    return results
+
+
+def measure_latencies(results: List[Dict], features_path: str, stride: int,
+                      batch_size: int, repeats: int, num_threads: int):
+    """
+    trial 체크포인트를 서빙과 같은 경로(from_checkpoint)로 로드해 지연 시간 측정
+
+    학습이 모두 끝난 뒤 한 번에 하나씩 같은 스레드 수로 측정해야 trial끼리 비교할 수 있다.
+    """
+    from distill import measure_latency
+    for result in results:
+        dataset = WindowedDataset.open(features_path, result["sequence_length"], stride)
+        X = dataset[0:batch_size]
+        detector = AnomalyDetector.from_checkpoint(result["checkpoint"])
+        torch.set_num_threads(num_threads)  # AnomalyDetector가 1로 바꾸므로 로드한 뒤에 설정
+        result["latency_ms"] = measure_latency(detector, X, 1, repeats)
+        result["latency_ms_batch"] = measure_latency(detector, X, batch_size, repeats)
+
+
+def _threshold(val_stats: StreamingErrorStats, multiplier: float) -> float:
+    """train.py와 같은 ANOMALY_CONFIG 규칙 (use_percentile, min_threshold)으로 임계값 계산"""
+    anomaly_config = config.ANOMALY_CONFIG
+    return AnomalyDetector.threshold_from_stats(
+        val_stats, multiplier, anomaly_config["use_percentile"], anomaly_config["percentile"],
+        anomaly_config["min_threshold"],
+    )
+
+
+def expand_rows(results: List[Dict], multipliers: List[float], output_dir: str) -> List[Dict]:
+    """
+    trial 결과를 threshold_multiplier별 결과 행으로 펼침 (임계값은 검증 오차로 train.py와 같은 규칙으로 계산)
+
+    ANOMALY_CONFIG["use_percentile"]이면 multiplier와 무관하므로 trial마다 한 행 (threshold_multiplier 없음)
+    """
+    if config.ANOMALY_CONFIG["use_percentile"]:
+        print(f"use_percentile 설정: 검증 오차 {config.ANOMALY_CONFIG['percentile']}분위를 임계값으로 사용 "
+              f"(threshold_multiplier 무시)")
+        multipliers = [None]
+    rows = []
+    for result in results:
+        trial_prefix = os.path.join(output_dir, "trials", result["trial"])
+        val_stats = StreamingErrorStats()
+        val_stats.add(np.load(trial_prefix + ".val_errors.npy"))
+        test_errors = np.load(trial_prefix + ".test_errors.npy")
+        for multiplier in multipliers:
+            threshold = _threshold(val_stats, multiplier)
+            row = {column: result.get(column) for column in RESULT_COLUMNS}
+            row.update({
+                "threshold_multiplier": multiplier,
+                "threshold": threshold,
+                "test_flag_rate": float(np.mean(test_errors > threshold)) if len(test_errors) else None,
+            })
+            rows.append(row)
+    return rows
+
+
+def pareto_front(rows: List[Dict], objectives: List[str]) -> List[bool]:
+    """
+    objectives가 모두 작을수록 좋다고 보고 다른 행에 지배되지 않는 행 표시
+
+    (모든 objective가 같거나 작고 하나 이상 더 작은 행이 있으면 지배됨, 값이 없으면 가장 나쁜 값으로 취급)
+    """
+    values = np.array([
+        [np.inf if row.get(name) is None else float(row[name]) for name in objectives] for row in rows
+    ], dtype=np.float64).reshape(len(rows), len(objectives))
+    front = []
+    for value in values:
+        dominated = np.any(np.all(values <= value, axis=1) & np.any(values < value, axis=1))
+        front.append(not dominated)
+    return front
+
+
+def write_results(rows: List[Dict], path: str):
+    """결과 표 저장 (검증 손실 순)"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: "" if value is None else value for key, value in row.items()})
+    print(f"결과 표 저장 완료: {path} ({len(rows)}행)")
+
+
+def read_results(path: str) -> List[Dict]:
+    """write_results()로 저장한 결과 표 읽기"""
+    rows = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for record in csv.DictReader(f):
+            row = {}
+            for key, value in record.items():
+                if key in TEXT_COLUMNS:
+                    row[key] = value
+                elif value == "":
+                    row[key] = None
+                else:
+                    row[key] = int(value) if key in INT_COLUMNS else float(value)
+            rows.append(row)
+    return rows
+
+
+def print_table(rows: List[Dict]):
+    print(f"\n{'trial':<22}{'mult':>6}{'val_loss':>12}{'flag_rate':>11}{'latency':>10}"
+          f"{'batch':>10}{'size_kb':>9}  pareto")
+    for row in rows:
+        flag_rate = "-" if row["test_flag_rate"] is None else f"{row['test_flag_rate']:.2%}"
+        multiplier = "-" if row["threshold_multiplier"] is None else f"{row['threshold_multiplier']:g}"
+        print(f"{row['trial']:<22}{multiplier:>6}{row['val_loss']:>12.6f}{flag_rate:>11}"
+              f"{row['latency_ms']:>8.2f}ms{row['latency_ms_batch']:>8.2f}ms{row['size_bytes'] / 1024:>9.1f}"
+              f"  {'*' if row['pareto'] else ''}")
+
+
+def apply_pareto(rows: List[Dict], objectives: List[str], target_flag_rate: float) -> List[Dict]:
+    """
+    Pareto 최적 행 표시
+
+    flag_rate_error(|test_flag_rate - target_flag_rate|)는 threshold_multiplier에 따라 달라지는 기준이라,
+    objectives에 포함하면 trial마다 목표 이상 판정 비율에 가장 가까운 multiplier만 남는다.
+    """
+    unknown = [name for name in objectives if name not in RESULT_COLUMNS]
+    if unknown:
+        raise ValueError(f"결과 표에 없는 objective: {unknown}")
+    for row in rows:
+        flag_rate = row["test_flag_rate"]
+        row["flag_rate_error"] = None if flag_rate is None else abs(flag_rate - target_flag_rate)
+    for row, on_front in zip(rows, pareto_front(rows, objectives)):
+        row["pareto"] = int(on_front)
+    rows.sort(key=lambda row: (-row["pareto"], row["val_loss"]))
+    print(f"Pareto 최적 {sum(row['pareto'] for row in rows)}개 / {len(rows)}개 (기준: {', '.join(objectives)})")
+    return rows
+
+
+def export_checkpoints(rows: List[Dict], output_dir: str, export_dir: str,
+                       register: bool = False, allow_length_mismatch: bool = False) -> List[str]:
+    """
+    Pareto 최적 행을 서빙용 체크포인트로 내보냄 (해당 threshold_multiplier의 임계값을 넣고 scaler도 복사)
+
+    서빙은 MODEL_CONFIG["sequence_length"] 길이의 윈도우로 스코어링하므로, 다른 sequence_length로 학습하고
+    보정한 행은 allow_length_mismatch가 아니면 내보내거나 레지스트리에 등록하지 않는다.
+
+    Returns:
+        저장한 체크포인트 경로 목록
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    serving_length = config.MODEL_CONFIG["sequence_length"]
+    registry = None
+    if register:
+        from model_registry import ModelRegistry
+        registry = ModelRegistry()
+    paths = []
+    for row in rows:
+        if not row["pareto"]:
+            continue
+        if row["sequence_length"] != serving_length and not allow_length_mismatch:
+            print(f"건너뜀: {row['trial']} (sequence_length {row['sequence_length']} ≠ 서빙 윈도우 길이 "
+                  f"{serving_length}, 내보내려면 --allow-length-mismatch)")
+            continue
+        checkpoint = torch.load(row["checkpoint"], map_location="cpu", weights_only=False)
+        checkpoint["threshold"] = np.float32(row["threshold"])
+        checkpoint["sweep"].update({
+            key: row[key] for key in RESULT_COLUMNS if key not in ("pareto", "checkpoint")
+        })
+        multiplier = row["threshold_multiplier"]
+        suffix = f"p{config.ANOMALY_CONFIG['percentile']:g}" if multiplier is None else f"m{multiplier:g}"
+        name = f"{row['trial']}_{suffix}"
+        path = os.path.join(export_dir, name + ".pth")
+        torch.save(checkpoint, path)
+        paths.append(path)
+        print(f"서빙용 체크포인트 저장: {path} (임계값 {row['threshold']:.6f})")
+        if row["sequence_length"] != serving_length:
+            print(f"  경고: sequence_length {row['sequence_length']}로 보정한 임계값입니다. "
+                  f"서빙 전에 MODEL_CONFIG[\"sequence_length\"]({serving_length})를 맞추세요.")
+        if registry is not None:
+            version = registry.register(path, notes=f"sweep {name}")
+            print(f"  레지스트리 등록: {version}")
+    if paths:
+        shutil.copy2(os.path.join(output_dir, "scaler.pkl"), os.path.join(export_dir, "scaler.pkl"))
+    return paths
+
+
+def command_run(args):
+    args.feature_columns = [name.strip() for name in args.feature_columns.split(",") if name.strip()]
+    os.makedirs(args.output_dir, exist_ok=True)
+    shared = prepare_shared_dataset(args)
+    training = {
+        "epochs": args.epochs, "batch_size": args.batch_size, "learning_rate": args.learning_rate,
+        "patience": args.patience, "stride": args.stride, "split_by": args.split_by, "seed": args.seed,
+    }
+    options = dict(
+        training,
+        csv=os.path.abspath(args.csv),
+        feature_columns=args.feature_columns,
+        output_dir=args.output_dir,
+        features_path=shared["features_path"],
+        retrain=args.retrain,
+        # 특징 행렬과 학습 설정이 같은 trial 결과만 재사용
+        settings=dict(training, features_mtime=os.path.getmtime(shared["features_path"])),
+    )
+
+    results = run_trials(trial_grid(args), options, args.jobs, args.threads_per_trial)
+    if not results:
+        print("성공한 trial이 없습니다.")
+        return
+    measure_latencies(results, shared["features_path"], args.stride, args.latency_batch_size,
+                      args.latency_repeats, args.latency_threads)
+    rows = apply_pareto(expand_rows(results, args.threshold_multiplier, args.output_dir),
+                        args.objectives, args.target_flag_rate)
+    write_results(rows, os.path.join(args.output_dir, "results.csv"))
+    print_table(rows)
+    if args.export:
+        export_checkpoints(rows, args.output_dir, args.export_dir or os.path.join(args.output_dir, "pareto"),
+                           args.register, args.allow_length_mismatch)
+
+
+def command_pareto(args):
+    path = os.path.join(args.output_dir, "results.csv")
+    rows = apply_pareto(read_results(path), args.objectives, args.target_flag_rate)
+    write_results(rows, path)
+    print_table(rows)
+    if args.export:
+        export_checkpoints(rows, args.output_dir, args.export_dir or os.path.join(args.output_dir, "pareto"),
+                           args.register, args.allow_length_mismatch)
+
+
+def main():
+    sweep_config = config.SWEEP_CONFIG
+    parser = argparse.ArgumentParser(description="LSTM Autoencoder 하이퍼파라미터 탐색")
+    parser.add_argument("--output-dir", default=sweep_config["output_dir"],
+                        help="공유 특징 행렬, trial 체크포인트, 결과 표 저장 위치")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_pareto_arguments(p):
+        p.add_argument("--objectives", nargs="+", default=sweep_config["objectives"],
+                       help="Pareto 기준 열 (모두 작을수록 좋음)")
+        p.add_argument("--target-flag-rate", type=float, default=sweep_config["target_flag_rate"],
+                       help="flag_rate_error 기준이 되는 목표 테스트 이상 판정 비율")
+        p.add_argument("--export", action="store_true", help="Pareto 최적 설정을 서빙용 체크포인트로 내보내기")
+        p.add_argument("--export-dir", default=None, help="내보낼 위치 (기본: <output-dir>/pareto)")
+        p.add_argument("--register", action="store_true", help="내보낸 체크포인트를 모델 레지스트리에 등록")
+        p.add_argument("--allow-length-mismatch", action="store_true",
+                       help="서빙 윈도우 길이(MODEL_CONFIG)와 다른 sequence_length로 학습한 설정도 내보내기")
+
+    p = subparsers.add_parser("run", help="격자 탐색 실행 → results.csv")
+    p.add_argument("--csv", required=True, help="학습 CSV (feature_builder.py 출력 등)")
+    p.add_argument("--feature-columns", default=",".join(config.FEATURE_NAMES), help="특징 열 (쉼표 구분)")
+    p.add_argument("--group-column", default=None, help="사용자 ID 열 (윈도우가 사용자 경계를 넘지 않음)")
+    p.add_argument("--split-by", choices=["time", "subject", "random"], default="time")
+    p.add_argument("--hidden-size", type=int, nargs="+", default=sweep_config["hidden_size"])
+    p.add_argument("--num-layers", type=int, nargs="+", default=sweep_config["num_layers"])
+    p.add_argument("--dropout", type=float, nargs="+", default=sweep_config["dropout"])
+    p.add_argument("--sequence-length", type=int, nargs="+", default=sweep_config["sequence_length"])
+    p.add_argument("--threshold-multiplier", type=float, nargs="+", default=sweep_config["threshold_multiplier"])
+    p.add_argument("--epochs", type=int, default=sweep_config["epochs"])
+    p.add_argument("--batch-size", type=int, default=config.MODEL_CONFIG["batch_size"])
+    p.add_argument("--learning-rate", type=float, default=config.MODEL_CONFIG["learning_rate"])
+    p.add_argument("--patience", type=int, default=config.TRAIN_CONFIG["patience"])
+    p.add_argument("--stride", type=int, default=1, help="윈도우 시작 간격")
+    p.add_argument("--jobs", type=int, default=sweep_config["jobs"], help="동시에 학습할 trial 수")
+    p.add_argument("--threads-per-trial", type=int, default=sweep_config["threads_per_trial"],
+                   help="trial당 torch 스레드 수 (0이면 CPU 코어 수 / jobs)")
+    p.add_argument("--latency-batch-size", type=int, default=sweep_config["latency_batch_size"])
+    p.add_argument("--latency-repeats", type=int, default=sweep_config["latency_repeats"])
+    p.add_argument("--latency-threads", type=int, default=sweep_config["latency_threads"])
+    p.add_argument("--rebuild", action="store_true", help="공유 특징 행렬을 다시 만듦")
+    p.add_argument("--retrain", action="store_true", help="이전 trial 결과를 재사용하지 않음")
+    p.add_argument("--seed", type=int, default=42)
+    add_pareto_arguments(p)
+
+    p = subparsers.add_parser("pareto", help="results.csv로 Pareto 최적 설정 다시 계산 / 내보내기 (재학습 없음)")
+    add_pareto_arguments(p)
+
+    args = parser.parse_args()
+    if torch is None:
+        parser.error("하이퍼파라미터 탐색에는 torch가 필요합니다.")
+    if args.command == "run":
+        command_run(args)
+    else:
+        command_pareto(args)
+
+
+if __name__ == "__main__":
+    main()
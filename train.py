@@ -0,0 +1,372 @@
+"""
+LSTM Autoencoder 학습 스크립트
+DataProcessor로 윈도우를 만들고 (메모리 내 또는 메모리 매핑), 멀티 워커 DataLoader로 학습한 뒤
+검증 세트로 임계값을 계산해 load_model()이 읽는 체크포인트 형식({"config", "model_state_dict",
+"threshold"})으로 저장. epoch마다 학습 상태를 저장하므로 중단 후 --resume으로 이어서 학습 가능
+
+사용 예:
+    python train.py --csv data_cache/train_features.csv --epochs 100
+    python train.py --csv data_cache/train_features.csv --out-of-core --group-column EMAIL --split-by subject
+    python train.py --csv data_cache/train_features.csv --resume
+    python train.py --csv data_cache/train_features.csv --nproc 4 --out-of-core
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+import numpy as np
+from typing import Dict, List, Tuple
+import config
+from anomaly_detector import AnomalyDetector
+from data_processor import DataProcessor
+
+try:
+    import torch
+    import torch.nn.functional as F
+    import torch.distributed as dist
+    from torch.nn.parallel import DistributedDataParallel
+    from torch.utils.data import BatchSampler, DataLoader, DistributedSampler, RandomSampler, SequentialSampler
+except ImportError:
+    torch = None
+
+
+def make_loader(dataset, batch_size: int, shuffle: bool, num_workers: int, seed: int = 42,
+                rank: int = 0, world_size: int = 1):
+    """
+    배치 단위로 윈도우를 읽는 DataLoader
+
+    WindowSubset / WindowedDataset은 인덱스 배열로 인덱싱하면 해당 윈도우만 복사한 배치를 반환하므로,
+    샘플 단위 collate 대신 BatchSampler로 배치 인덱스를 넘겨 워커가 배치 하나를 한 번에 읽는다.
+    world_size > 1이면 DistributedSampler로 윈도우를 프로세스별로 나눈다
+    (프로세스마다 같은 수가 되도록 부족한 만큼 앞쪽 윈도우를 반복).
+    """
+    if world_size > 1:
+        sampler = DistributedSampler(dataset, num_replicas=world_size, rank=rank, shuffle=shuffle, seed=seed)
+    elif shuffle:
+        sampler = RandomSampler(dataset, generator=torch.Generator().manual_seed(seed))
+    else:
+        sampler = SequentialSampler(dataset)
+    return DataLoader(
+        dataset,
+        sampler=BatchSampler(sampler, batch_size=batch_size, drop_last=False),
+        batch_size=None,  # 샘플러가 배치 인덱스를 주므로 자동 배치 비활성화
+        num_workers=num_workers,
+        persistent_workers=num_workers > 0,
+    )
+
+
+def _all_reduce(values: List[float], op=None) -> List[float]:
+    """분산 학습이면 모든 프로세스의 값을 합침 (기본: 합계)"""
+    if not (dist.is_available() and dist.is_initialized()):
+        return values
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(tensor, op=op or dist.ReduceOp.SUM)
+    return tensor.tolist()
+
+
+def run_epoch(model, loader, optimizer=None, grad_clip: float = 1.0) -> Tuple[float, int]:
+    """
+    한 epoch 학습 (optimizer가 None이면 검증)
+
+    Returns:
+        (평균 MSE 손실, 처리한 샘플 수)
+    """
+    training = optimizer is not None
+    model.train(training)
+    total_loss, samples = 0.0, 0
+    with torch.set_grad_enabled(training):
+        for batch in loader:
+            x = torch.as_tensor(batch, dtype=torch.float32)
+            reconstructed, _ = model(x)
+            loss = F.mse_loss(reconstructed, x)
+            if training:
+                optimizer.zero_grad()
+                loss.backward()
+                if grad_clip:
+                    torch.nn.utils.clip_grad_norm_(model.parameters(), grad_clip)
+                optimizer.step()
+            total_loss += loss.item() * len(x)
+            samples += len(x)
+    return total_loss / max(samples, 1), samples
+
+
+def _save_state(path: str, state: Dict):
+    """재개용 학습 상태 저장 (임시 파일에 쓴 뒤 교체, 저장 중 중단되어도 이전 상태 유지)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train(model, train_loader, val_loader, epochs: int, learning_rate: float,
+          patience: int, min_delta: float, grad_clip: float,
+          state_path: str = None, resume: bool = False, seed: int = 42) -> Tuple[object, List[Dict]]:
+    """
+    조기 종료와 epoch 단위 상태 저장을 포함한 학습 루프
+
+    model이 DistributedDataParallel이면 손실과 처리량은 모든 프로세스를 합친 값이고,
+    학습 상태 저장과 출력은 rank 0만 한다.
+
+    Returns:
+        검증 손실이 가장 낮았던 epoch의 모델 (DDP면 내부 모듈, eval 모드), epoch별 기록
+        (train_loss, val_loss, samples_per_sec, seconds)
+    """
+    core = model.module if isinstance(model, DistributedDataParallel) else model
+    is_main = not (dist.is_available() and dist.is_initialized()) or dist.get_rank() == 0
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    start_epoch, best_loss, best_state, stale_epochs, history = 1, float("inf"), None, 0, []
+
+    if resume and state_path and os.path.exists(state_path):
+        state = torch.load(state_path, map_location="cpu", weights_only=False)
+        core.load_state_dict(state["model_state_dict"])
+        optimizer.load_state_dict(state["optimizer_state_dict"])
+        start_epoch = state["epoch"] + 1
+        best_loss, best_state = state["best_loss"], state["best_state"]
+        stale_epochs, history = state["stale_epochs"], state["history"]
+        torch.set_rng_state(state["torch_rng_state"])
+        print(f"학습 상태 로드: {state_path} (epoch {state['epoch']}까지 완료, 최고 검증 손실 {best_loss:.6f})")
+        if stale_epochs >= patience:
+            print("이미 조기 종료된 학습입니다.")
+            start_epoch = epochs + 1
+
+    shuffle_sampler = getattr(train_loader.sampler, "sampler", None)
+    for epoch in range(start_epoch, epochs + 1):
+        # epoch마다 정해진 셔플 순서 (재개해도 중단 없이 학습한 것과 같은 순서)
+        if isinstance(shuffle_sampler, DistributedSampler):
+            shuffle_sampler.set_epoch(epoch)
+        elif isinstance(shuffle_sampler, RandomSampler) and shuffle_sampler.generator is not None:
+            shuffle_sampler.generator.manual_seed(seed + epoch)
+        started = time.perf_counter()
+        train_loss, samples = run_epoch(model, train_loader, optimizer, grad_clip)
+        train_seconds = time.perf_counter() - started
+        val_loss, val_samples = run_epoch(model, val_loader)
+
+        # 프로세스별 결과 합산 (손실은 샘플 수 가중 평균, 시간은 가장 느린 프로세스 기준)
+        train_total, samples, val_total, val_samples = _all_reduce(
+            [train_loss * samples, samples, val_loss * val_samples, val_samples])
+        train_loss, val_loss = train_total / max(samples, 1), val_total / max(val_samples, 1)
+        train_seconds = _all_reduce([train_seconds], dist.ReduceOp.MAX if dist.is_available() else None)[0]
+        samples_per_sec = samples / max(train_seconds, 1e-9)
+
+        improved = val_loss < best_loss - min_delta
+        if improved:
+            best_loss = val_loss
+            best_state = {name: value.detach().clone() for name, value in core.state_dict().items()}
+            stale_epochs = 0
+        else:
+            stale_epochs += 1
+        history.append({
+            "epoch": epoch, "train_loss": train_loss, "val_loss": val_loss,
+            "samples_per_sec": samples_per_sec, "seconds": time.perf_counter() - started,
+        })
+        print(f"Epoch {epoch:3d}/{epochs}  train {train_loss:.6f}  val {val_loss:.6f}  "
+              f"{samples_per_sec:,.0f} samples/s{'  *' if improved else ''}")
+
+        if state_path and is_main:
+            _save_state(state_path, {
+                "epoch": epoch,
+                "model_state_dict": core.state_dict(),
+                "optimizer_state_dict": optimizer.state_dict(),
+                "best_loss": best_loss,
+                "best_state": best_state,
+                "stale_epochs": stale_epochs,
+                "history": history,
+                "torch_rng_state": torch.get_rng_state(),
+            })
+        if stale_epochs >= patience:
+            print(f"조기 종료: {patience} epoch 동안 검증 손실 개선 없음")
+            break
+
+    if best_state is not None:
+        core.load_state_dict(best_state)
+    core.eval()
+    return core, history
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load_datasets(args, processor: DataProcessor, build: bool = True) -> Tuple:
+    """
+    학습/검증/테스트 윈도우 데이터셋 (분할은 고정 시드라 모든 프로세스에서 같음)
+
+    Args:
+        build: False면 rank 0이 만든 메모리 매핑 특징 행렬을 다시 만들지 않고 염 (--out-of-core)
+    """
+    sequence_length = config.MODEL_CONFIG["sequence_length"]
+    data_config = config.DATA_CONFIG
+    if args.out_of_core:
+        if build:
+            data = processor.prepare_windowed_dataset(
+                args.csv, sequence_length, args.feature_columns, args.group_column,
+                data_config["test_size"], data_config["validation_size"], args.split_by, args.stride,
+            )
+            return data["train"], data["val"], data["test"]
+        from data_processor import WindowedDataset
+        dataset = WindowedDataset.open(os.path.splitext(args.csv)[0] + ".features.npy",
+                                       sequence_length, args.stride)
+        return dataset.split(data_config["test_size"], data_config["validation_size"], args.split_by)
+    data = processor.prepare_data(
+        args.csv, sequence_length, args.feature_columns,
+        data_config["test_size"], data_config["validation_size"], args.stride,
+    )
+    return data["X_train"], data["X_val"], data["X_test"]
+
+
+def run(rank: int, world_size: int, args, port: int = None):
+    """
+    학습 프로세스 하나 (world_size > 1이면 gloo 백엔드로 DistributedDataParallel 학습)
+
+    rank 0이 데이터 캐시/특징 행렬과 scaler를 만든 뒤 나머지 프로세스가 같은 데이터를 열고,
+    체크포인트와 학습 상태는 rank 0만 저장한다.
+    """
+    distributed = world_size > 1
+    is_main = rank == 0
+    if distributed:
+        os.environ["MASTER_ADDR"] = "127.0.0.1"
+        os.environ["MASTER_PORT"] = str(port)
+        dist.init_process_group("gloo", rank=rank, world_size=world_size)
+        if not is_main:
+            sys.stdout = open(os.devnull, "w")  # 출력은 rank 0만
+
+    torch.manual_seed(args.seed)
+    # 프로세스마다 코어를 나눠 쓰도록 기본 스레드 수는 CPU 코어 수 / 프로세스 수
+    torch.set_num_threads(args.num_threads or max(1, (os.cpu_count() or 1) // world_size))
+    print(f"프로세스 {world_size}개 × torch 스레드 {torch.get_num_threads()}개, "
+          f"DataLoader 워커 {args.num_workers}개")
+
+    processor = DataProcessor(config.DATA_CONFIG["missing_value_strategy"])
+    if distributed and not is_main:
+        dist.barrier()  # rank 0의 CSV 캐시/특징 행렬 생성 대기
+        train_set, val_set, test_set = load_datasets(args, processor, build=False)
+    else:
+        train_set, val_set, test_set = load_datasets(args, processor)
+        if len(train_set) and len(val_set):
+            processor.save_scaler(args.scaler_output)
+        if distributed:
+            dist.barrier()
+    if len(train_set) == 0 or len(val_set) == 0:
+        raise ValueError("학습/검증 윈도우가 없습니다. 데이터 길이와 분할 비율을 확인하세요.")
+
+    from model import LSTMAutoencoder
+    model = LSTMAutoencoder(
+        input_size=len(args.feature_columns), hidden_size=args.hidden_size,
+        num_layers=args.num_layers, dropout=args.dropout,
+    )
+    if distributed:
+        # 모든 프로세스가 rank 0의 초기 가중치로 시작하고, backward마다 gradient를 평균
+        model = DistributedDataParallel(model)
+    train_loader = make_loader(train_set, args.batch_size, True, args.num_workers, args.seed,
+                               rank, world_size)
+    val_loader = make_loader(val_set, args.batch_size * 4, False, args.num_workers, args.seed,
+                             rank, world_size)
+    model, history = train(
+        model, train_loader, val_loader, args.epochs, args.learning_rate,
+        args.patience, config.TRAIN_CONFIG["min_delta"], config.TRAIN_CONFIG["grad_clip"],
+        args.state_path, args.resume, args.seed,
+    )
+    if is_main:
+        save_checkpoint(model, history, val_set, test_set, args, world_size)
+    if distributed:
+        dist.barrier()
+        dist.destroy_process_group()
+
+
+def save_checkpoint(model, history: List[Dict], val_set, test_set, args, world_size: int = 1):
+    """검증 세트로 임계값 계산 후 load_model()이 읽는 형식으로 저장하고 다시 로드해 테스트 세트 확인"""
+    # 검증 세트로 임계값 계산 (서빙과 같은 AnomalyDetector 경로)
+    anomaly_config = config.ANOMALY_CONFIG
+    detector = AnomalyDetector(model)
+    threshold = detector.compute_threshold(
+        val_set,  # 배치 단위로 읽으며 계산 (검증 세트 전체를 메모리에 올리지 않음)
+        multiplier=anomaly_config["threshold_multiplier"],
+        use_percentile=anomaly_config["use_percentile"],
+        percentile=anomaly_config["percentile"],
+        min_threshold=anomaly_config["min_threshold"],
+    )
+
+    # load_model() / AnomalyDetector.from_checkpoint()가 읽는 형식 그대로 저장
+    best = min(history, key=lambda row: row["val_loss"]) if history else {}
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    torch.save({
+        "model_state_dict": model.state_dict(),
+        "config": {
+            "input_size": len(args.feature_columns),
+            "hidden_size": args.hidden_size,
+            "num_layers": args.num_layers,
+            "dropout": args.dropout,
+        },
+        "threshold": np.float32(threshold),
+        "training": {
+            "data_path": os.path.abspath(args.csv),
+            "feature_names": args.feature_columns,
+            "processes": world_size,
+            "batch_size_per_process": args.batch_size,
+            "epochs_run": len(history),
+            "best_epoch": best.get("epoch"),
+            "best_val_loss": best.get("val_loss"),
+            "mean_samples_per_sec": float(np.mean([row["samples_per_sec"] for row in history])) if history else None,
+            "history": history,
+        },
+    }, args.output)
+    print(f"체크포인트 저장 완료: {args.output} (임계값 {threshold:.6f})")
+
+    # 저장한 체크포인트를 서빙과 같은 경로로 다시 로드해 테스트 세트 확인
+    serving_detector = AnomalyDetector.from_checkpoint(args.output)
+    if len(test_set):
+        test_errors = np.concatenate([
+            serving_detector.calculate_reconstruction_error(test_set[begin:begin + 1024])
+            for begin in range(0, len(test_set), 1024)
+        ])
+        print(f"테스트 세트: {len(test_errors)}개 윈도우, 평균 오차 {test_errors.mean():.6f}, "
+              f"이상 비율 {np.mean(test_errors > serving_detector.threshold):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LSTM Autoencoder 학습 → 서빙용 체크포인트 저장")
+    parser.add_argument("--csv", required=True, help="학습 CSV (feature_builder.py 출력 등)")
+    parser.add_argument("--feature-columns", default=",".join(config.FEATURE_NAMES),
+                        help="특징 열 (쉼표 구분)")
+    parser.add_argument("--output", default=config.MODEL_SAVE_PATH, help="체크포인트 저장 경로")
+    parser.add_argument("--scaler-output", default=config.SCALER_SAVE_PATH, help="scaler 저장 경로")
+    parser.add_argument("--epochs", type=int, default=config.MODEL_CONFIG["epochs"])
+    parser.add_argument("--batch-size", type=int, default=config.MODEL_CONFIG["batch_size"])
+    parser.add_argument("--learning-rate", type=float, default=config.MODEL_CONFIG["learning_rate"])
+    parser.add_argument("--hidden-size", type=int, default=config.MODEL_CONFIG["hidden_size"])
+    parser.add_argument("--num-layers", type=int, default=config.MODEL_CONFIG["num_layers"])
+    parser.add_argument("--dropout", type=float, default=config.MODEL_CONFIG["dropout"])
+    parser.add_argument("--stride", type=int, default=1, help="윈도우 시작 간격")
+    parser.add_argument("--num-workers", type=int, default=config.TRAIN_CONFIG["num_workers"],
+                        help="DataLoader 워커 프로세스 수")
+    parser.add_argument("--num-threads", type=int, default=config.TRAIN_CONFIG["num_threads"],
+                        help="torch intra-op 스레드 수 (0이면 CPU 코어 수)")
+    parser.add_argument("--patience", type=int, default=config.TRAIN_CONFIG["patience"])
+    parser.add_argument("--state-path", default=config.TRAIN_CONFIG["state_path"],
+                        help="epoch마다 저장하는 학습 상태 경로")
+    parser.add_argument("--resume", action="store_true", help="--state-path의 학습 상태에서 이어서 학습")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="메모리 매핑 특징 행렬 + WindowedDataset 사용 (메모리보다 큰 데이터)")
+    parser.add_argument("--group-column", default=None, help="사용자 ID 열 (--out-of-core)")
+    parser.add_argument("--split-by", choices=["time", "subject", "random"], default="time",
+                        help="분할 방식 (--out-of-core)")
+    parser.add_argument("--nproc", type=int, default=config.TRAIN_CONFIG["nproc"],
+                        help="데이터 병렬 학습 프로세스 수 (gloo, --batch-size는 프로세스당 배치)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if torch is None:
+        parser.error("학습에는 torch가 필요합니다.")
+    args.feature_columns = [name.strip() for name in args.feature_columns.split(",") if name.strip()]
+    if args.nproc > 1:
+        # 로컬 프로세스 nproc개로 데이터 병렬 학습 (gloo 백엔드, CPU 전용)
+        torch.multiprocessing.spawn(run, args=(args.nproc, args, _free_port()), nprocs=args.nproc, join=True)
+    else:
+        run(0, 1, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""
+사용자별 어댑터 모듈
+전역 LSTMAutoencoder는 그대로 두고, 사용자마다 output 레이어 가중치의 delta (ΔW [features, hidden], Δb [features])를
+저장된 센서 로그로 백그라운드에서 학습해 스코어링 시 더함
+(사용자당 약 1.3KB, 여러 사용자의 어댑터를 한 배치에서 배치 행렬곱 한 번으로 적용)
+
+encoder/decoder를 고정하면 output 레이어는 선형이므로 delta 학습은 ridge 회귀로 정확히 풀린다.
+decoder 출력을 윈도우당 한 번만 계산해 Gram 행렬을 누적하고 (hidden+1) 크기 연립방정식을 한 번 풀기 때문에
+반복 최적화 없이 CPU/시간 예산 안에서 끝난다.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+import config
+
+
+class UserAdapter:
+    """사용자 한 명의 output 레이어 delta (학습한 모델 버전에서만 사용)"""
+
+    __slots__ = ("weight", "bias", "model_version", "version", "training")
+
+    def __init__(self, weight: np.ndarray, bias: np.ndarray, model_version: str,
+                 version: str = None, training: Dict = None):
+        """
+        Args:
+            weight: ΔW [features, hidden]
+            bias: Δb [features]
+            model_version: 학습에 사용한 AnomalyDetector.model_version
+            version: 어댑터 식별자 (None이면 가중치 해시)
+            training: 학습 기록 (윈도우 수, 검증 오차 개선율 등)
+        """
+        self.weight = np.ascontiguousarray(weight, dtype=np.float32)
+        self.bias = np.ascontiguousarray(bias, dtype=np.float32)
+        self.model_version = model_version
+        self.version = version or hashlib.sha256(
+            self.weight.tobytes() + self.bias.tobytes()
+        ).hexdigest()[:12]
+        self.training = training or {}
+
+    @property
+    def nbytes(self) -> int:
+        return self.weight.nbytes + self.bias.nbytes
+
+    def to_document(self) -> Dict:
+        """MongoDB 저장 형식 (가중치는 little-endian float32 bytes)"""
+        return {
+            "status": "active",
+            "model_version": self.model_version,
+            "version": self.version,
+            "shape": list(self.weight.shape),
+            "weight": self.weight.astype("<f4").tobytes(),
+            "bias": self.bias.astype("<f4").tobytes(),
+            "training": self.training,
+        }
+
+    @classmethod
+    def from_document(cls, document: Optional[Dict]) -> Optional["UserAdapter"]:
+        """to_document()로 저장한 어댑터 복원 (검증에서 탈락해 가중치가 없는 문서면 None)"""
+        if not document or document.get("status") != "active":
+            return None
+        features, hidden = document["shape"]
+        # frombuffer 결과는 읽기 전용이므로 복사 (torch.from_numpy 경고 방지)
+        weight = np.frombuffer(bytes(document["weight"]), dtype="<f4").reshape(features, hidden).copy()
+        bias = np.frombuffer(bytes(document["bias"]), dtype="<f4").copy()
+        return cls(weight, bias, document["model_version"], document.get("version"),
+                   document.get("training"))
+
+
+def stack_adapters(adapters: List[Optional[UserAdapter]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    윈도우별 어댑터 목록 → detect_batch(adapters=...) 입력
+
+    Returns:
+        (delta_weight [batch, features, hidden], delta_bias [batch, features]),
+        어댑터가 없는 윈도우는 0 (모두 없으면 None → 기존 추론 경로 그대로)
+    """
+    first = next((adapter for adapter in adapters if adapter is not None), None)
+    if first is None:
+        return None
+    weight = np.zeros((len(adapters),) + first.weight.shape, dtype=np.float32)
+    bias = np.zeros((len(adapters),) + first.bias.shape, dtype=np.float32)
+    for i, adapter in enumerate(adapters):
+        if adapter is not None:
+            weight[i] = adapter.weight
+            bias[i] = adapter.bias
+    return weight, bias
+
+
+class _CpuBudget:
+    """학습 작업의 시간 예산과 CPU 점유율 제한 (연산한 시간에 비례해 쉬어 서빙 스레드에 CPU를 양보)"""
+
+    def __init__(self, seconds: float, cpu_fraction: float, stop_event: threading.Event = None):
+        self.seconds = seconds
+        self.cpu_fraction = min(max(cpu_fraction, 0.01), 1.0)
+        self.stop_event = stop_event or threading.Event()
+        self.used = 0.0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.used >= self.seconds or self.stop_event.is_set()
+
+    def run(self, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        self.used += elapsed
+        if self.cpu_fraction < 1.0:
+            self.stop_event.wait(elapsed * (1.0 - self.cpu_fraction) / self.cpu_fraction)
+        return result
+
+
+def _valid_steps(lengths: np.ndarray, sequence_length: int) -> np.ndarray:
+    """[N, sequence_length] 실제 시점 마스크 (패딩 시점은 False)"""
+    return np.arange(sequence_length)[None, :] < np.asarray(lengths)[:, None]
+
+
+def fit_user_adapter(detector, windows: np.ndarray, lengths: np.ndarray = None, padded: bool = False,
+                     ridge: float = None,
+                     holdout_fraction: float = None, min_improvement: float = None,
+                     chunk_size: int = None, budget: _CpuBudget = None) -> Tuple[Optional[UserAdapter], Dict]:
+    """
+    사용자 윈도우로 output 레이어 delta 학습 (ridge 회귀, 가장 최근 윈도우로 검증)
+
+    min ||H ΔWᵀ + Δb - (X - output(H))||² + ridge * 행 수 * ||ΔW||²  (H: decoder 출력)
+
+    Args:
+        detector: supports_adapters인 AnomalyDetector
+        windows: 시간순 정규화 윈도우 [N, sequence_length, features]
+        lengths: 윈도우별 실제 행 수 [N] (None이면 모두 sequence_length, 뒤쪽 패딩 시점은 학습/검증에서 제외)
+        padded: True면 짧은 윈도우 뒤쪽이 마지막 행으로 패딩된 것 (요청 시점처럼 전체 길이로 decoder 실행),
+                False면 뒤쪽이 비어 있는 것 (가변 길이 스코어링처럼 실제 길이로 decoder 실행)
+        ridge: L2 규제 강도 (None이면 USER_ADAPTER_CONFIG)
+        holdout_fraction: 검증에 쓸 가장 최근 윈도우 비율
+        min_improvement: 검증 재구성 오차 감소율이 이보다 작으면 어댑터를 만들지 않음
+        chunk_size: 한 번에 추론할 윈도우 수
+        budget: 시간/CPU 예산 (시간이 다 되면 그때까지 누적한 윈도우로 학습)
+
+    Returns:
+        (UserAdapter 또는 None, 리포트 {"train_windows", "holdout_windows", "base_error",
+                                       "adapted_error", "improvement", "fit_seconds"})
+    """
+    adapter_config = config.USER_ADAPTER_CONFIG
+    ridge = adapter_config["ridge"] if ridge is None else ridge
+    holdout_fraction = adapter_config["holdout_fraction"] if holdout_fraction is None else holdout_fraction
+    min_improvement = adapter_config["min_improvement"] if min_improvement is None else min_improvement
+    chunk_size = chunk_size or adapter_config["chunk_size"]
+    budget = budget or _CpuBudget(float("inf"), 1.0)
+    started = time.perf_counter()
+
+    if lengths is None:
+        lengths = np.full(len(windows), windows.shape[1], dtype=np.int64)
+    num_holdout = max(1, int(round(len(windows) * holdout_fraction)))
+    split = len(windows) - num_holdout
+    train, holdout = windows[:split], windows[split:]
+    if len(train) == 0:
+        return None, {"train_windows": 0, "holdout_windows": len(holdout)}
+
+    # 정규 방정식 누적: [H, 1]ᵀ[H, 1], [H, 1]ᵀ R (R = X - output(H), float64, 실제 시점만)
+    gram, cross, rows, train_windows = None, None, 0, 0
+    for begin in range(0, len(train), chunk_size):
+        X = np.asarray(train[begin:begin + chunk_size], dtype=np.float32)
+        chunk_lengths = lengths[begin:begin + len(X)]
+        decoded, base = budget.run(detector.decoder_states, X, None if padded else chunk_lengths)
+        valid = _valid_steps(chunk_lengths, X.shape[1])
+        hidden = np.concatenate([decoded[valid], np.ones((int(valid.sum()), 1), dtype=np.float32)], axis=1)
+        hidden = hidden.astype(np.float64)
+        residual = (X - base)[valid].astype(np.float64)
+        if gram is None:
+            gram = np.zeros((hidden.shape[1], hidden.shape[1]))
+            cross = np.zeros((hidden.shape[1], residual.shape[1]))
+        gram += hidden.T @ hidden
+        cross += hidden.T @ residual
+        rows += len(hidden)
+        train_windows += len(X)
+        if budget.exhausted:
+            break
+
+    penalty = np.full(gram.shape[0], ridge * rows)
+    penalty[-1] = 0.0  # bias는 규제하지 않음
+    theta = np.linalg.solve(gram + np.diag(penalty), cross)  # [hidden + 1, features]
+    weight, bias = theta[:-1].T, theta[-1]
+
+    # 검증: 가장 최근 윈도우에서 전역 모델 대비 재구성 오차 감소율
+    base_total, adapted_total = 0.0, 0.0
+    for begin in range(0, len(holdout), chunk_size):
+        X = np.asarray(holdout[begin:begin + chunk_size], dtype=np.float32)
+        chunk_lengths = lengths[split + begin:split + begin + len(X)]
+        decoded, base = budget.run(detector.decoder_states, X, None if padded else chunk_lengths)
+        valid = _valid_steps(chunk_lengths, X.shape[1])
+        adapted = base[valid] + decoded[valid].astype(np.float64) @ weight.T + bias
+        base_total += float(np.square(X[valid] - base[valid], dtype=np.float64).sum())
+        adapted_total += float(np.square(X[valid] - adapted).sum())
+    improvement = 1.0 - adapted_total / base_total if base_total > 0 else 0.0
+    count = int(lengths[split:].sum()) * holdout.shape[2]
+    report = {
+        "train_windows": train_windows,
+        "holdout_windows": len(holdout),
+        "base_error": base_total / count,
+        "adapted_error": adapted_total / count,
+        "improvement": improvement,
+        "fit_seconds": time.perf_counter() - started,
+    }
+    if improvement < min_improvement:
+        return None, report
+    return UserAdapter(weight, bias, detector.model_version, training=report), report
+
+
+class UserAdapterStore:
+    """
+    사용자 어댑터 메모리 캐시 (LRU, MongoDB에서 지연 로드)
+
+    어댑터가 없는 사용자도 캐시해 요청마다 DB를 조회하지 않으며, reload_seconds가 지나면
+    다른 워커의 학습 작업이 저장한 어댑터를 반영하기 위해 다시 읽는다.
+    """
+
+    def __init__(self, db_manager=None, max_users: int = None, reload_seconds: float = None):
+        """
+        Args:
+            db_manager: MongoDBManager (None이면 메모리에만 보관)
+            max_users: 메모리에 유지할 최대 사용자 수 (초과 시 LRU 제거)
+            reload_seconds: 캐시 항목을 DB에서 다시 읽기까지의 시간
+        """
+        adapter_config = config.USER_ADAPTER_CONFIG
+        self.db_manager = db_manager
+        self.max_users = max_users or adapter_config["max_users"]
+        self.reload_seconds = (adapter_config["reload_seconds"]
+                               if reload_seconds is None else reload_seconds)
+        self._entries = OrderedDict()  # {user_id: (UserAdapter 또는 None, 로드 시각)}
+        self._lock = threading.Lock()
+        self._applied = 0
+        self._db_loads = 0
+
+    def get(self, user_id: str, model_version: str) -> Optional[UserAdapter]:
+        """
+        현재 모델 버전으로 학습된 사용자 어댑터 (없으면 None, 캐시 적중 시 O(1))
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+        if entry is None or (self.db_manager is not None and now - entry[1] > self.reload_seconds):
+            # DB 조회는 lock 밖에서 (사용자별 첫 요청, reload_seconds마다)
+            adapter = entry[0] if entry is not None else None
+            if self.db_manager is not None:
+                adapter = UserAdapter.from_document(self.db_manager.get_user_adapter(user_id))
+                self._db_loads += 1
+            self._set(user_id, adapter, now)
+            entry = (adapter, now)
+        adapter = entry[0]
+        if adapter is None or adapter.model_version != model_version:
+            return None
+        self._applied += 1
+        return adapter
+
+    def put(self, user_id: str, adapter: Optional[UserAdapter]):
+        """학습 작업이 만든 어댑터 반영 (None이면 어댑터 제거)"""
+        self._set(user_id, adapter, time.monotonic())
+
+    def _set(self, user_id: str, adapter: Optional[UserAdapter], loaded_at: float):
+        with self._lock:
+            self._entries[user_id] = (adapter, loaded_at)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            adapters = [entry[0] for entry in self._entries.values() if entry[0] is not None]
+            return {
+                "users": len(self._entries),
+                "users_with_adapter": len(adapters),
+                "adapter_kb": sum(adapter.nbytes for adapter in adapters) / 1024,
+                "applied": self._applied,
+                "db_loads": self._db_loads,
+            }
+
+
+class UserAdapterTrainer:
+    """
+    백그라운드 사용자 어댑터 학습 작업
+
+    interval_minutes마다 최근 로그가 충분한 사용자를 찾아 (같은 모델 버전으로 refit_hours 이내에
+    학습한 사용자는 제외) 사용자당 time_budget_seconds, CPU 점유율 max_cpu_fraction 이내로 학습한다.
+    request()로 특정 사용자를 바로 학습하도록 요청할 수 있다.
+    """
+
+    def __init__(self, get_pipeline: Callable, db_manager, store: UserAdapterStore,
+                 interval_minutes: float = None):
+        """
+        Args:
+            get_pipeline: 현재 운영 ScoringPipeline을 반환하는 함수 (모델 교체 후에도 새 모델로 학습)
+            db_manager: MongoDBManager (sensor_logs 조회, 어댑터 저장)
+            store: 학습 결과를 바로 반영할 UserAdapterStore
+            interval_minutes: 주기 작업 간격 (0이면 request()로 요청한 사용자만 학습)
+        """
+        adapter_config = config.USER_ADAPTER_CONFIG
+        self.get_pipeline = get_pipeline
+        self.db_manager = db_manager
+        self.store = store
+        self.interval = (adapter_config["interval_minutes"]
+                         if interval_minutes is None else interval_minutes) * 60.0
+        self.settings = dict(adapter_config)
+
+        self._requested = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._periodic = False
+        self._next_run = None
+        self._counts = {"fitted": 0, "accepted": 0, "rejected": 0, "skipped": 0, "failed": 0}
+        self._last_report = None
+
+    def start(self, periodic: bool = True):
+        """
+        Args:
+            periodic: True면 interval마다 활성 사용자 학습 (gunicorn 멀티 워커에서는 한 워커만)
+        """
+        self._periodic = periodic and self.interval > 0
+        if self._periodic:
+            self._next_run = time.monotonic() + self.interval
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="user-adapter-trainer", daemon=True)
+            self._thread.start()
+
+    def request(self, user_id: str):
+        """사용자 어댑터 학습 요청 (백그라운드에서 refit_hours와 무관하게 학습)"""
+        with self._lock:
+            self._requested[user_id] = True
+        self._ensure_worker()
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            timeout = None
+            if self._periodic:
+                timeout = max(0.0, self._next_run - time.monotonic())
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stop_event.is_set():
+                break
+
+            with self._lock:
+                users = list(self._requested)
+                self._requested.clear()
+            for user_id in users:
+                self._fit_safely(user_id)
+
+            if self._periodic and time.monotonic() >= self._next_run:
+                self._next_run = time.monotonic() + self.interval
+                try:
+                    candidates = self._candidates()
+                except Exception as e:
+                    print(f"어댑터 학습 대상 조회 실패: {e}")
+                    candidates = []
+                for user_id in candidates:
+                    if self._stop_event.is_set():
+                        break
+                    self._fit_safely(user_id)
+
+    def _candidates(self) -> List[str]:
+        """최근 로그가 min_windows개 이상이고 현재 모델 버전 어댑터가 refit_hours보다 오래된 사용자"""
+        settings = self.settings
+        model_version = self.get_pipeline().anomaly_detector.model_version
+        since = datetime.now() - timedelta(days=settings["lookback_days"])
+        refit_before = datetime.now() - timedelta(hours=settings["refit_hours"])
+        candidates = []
+        for user_id in self.db_manager.get_active_users(since, settings["min_windows"]):
+            saved = self.db_manager.get_user_adapter(user_id)
+            if saved and saved.get("model_version") == model_version \
+                    and saved.get("updated_at") and saved["updated_at"] > refit_before:
+                continue
+            candidates.append(user_id)
+            if len(candidates) >= settings["max_users_per_run"]:
+                break
+        return candidates
+
+    def _fit_safely(self, user_id: str):
+        try:
+            self.fit_user(user_id)
+        except Exception as e:
+            self._counts["failed"] += 1
+            print(f"사용자 어댑터 학습 실패 ({user_id}): {e}")
+
+    def fit_user(self, user_id: str) -> Dict:
+        """
+        사용자 한 명의 어댑터 학습 후 저장 (검증에서 개선이 작으면 어댑터 제거)
+
+        Returns:
+            {"status": "accepted" | "rejected" | "insufficient" | "unsupported", ...fit_user_adapter 리포트}
+        """
+        settings = self.settings
+        pipeline = self.get_pipeline()
+        detector = pipeline.anomaly_detector
+        if not detector.supports_adapters:
+            self._counts["skipped"] += 1
+            return {"status": "unsupported"}
+
+        since = datetime.now() - timedelta(days=settings["lookback_days"])
+        history = self.db_manager.get_user_sensor_history(user_id, settings["max_windows"], since)
+        if len(history) < settings["min_windows"]:
+            self._counts["skipped"] += 1
+            return {"status": "insufficient", "windows": len(history)}
+
+        # 로그마다 요청 시점과 같은 방식으로 정규화 윈도우 생성 (variable_length면 패딩 없이 실제 행만,
+        # 아니면 마지막 행 패딩), 어느 쪽이든 패딩 시점은 학습/검증 오차에서 제외
+        kernel = pipeline.feature_kernel
+        sequence_length = pipeline.sequence_length
+        windows = np.zeros((len(history), sequence_length, len(pipeline.feature_names)), dtype=np.float32)
+        lengths = np.empty(len(history), dtype=np.int64)
+        for i, sensor_data in enumerate(history):
+            kernel.build_window(sensor_data, sequence_length, "last", pad=not pipeline.variable_length,
+                                out=windows[i])
+            lengths[i] = min(len(sensor_data), sequence_length)
+
+        budget = _CpuBudget(settings["time_budget_seconds"], settings["max_cpu_fraction"], self._stop_event)
+        adapter, report = fit_user_adapter(detector, windows, lengths, padded=not pipeline.variable_length,
+                                           budget=budget)
+        self._counts["fitted"] += 1
+        if adapter is not None:
+            self._counts["accepted"] += 1
+            self.db_manager.save_user_adapter(user_id, adapter.to_document())
+            report["status"] = "accepted"
+        else:
+            # 개선이 작으면 전역 모델 그대로 사용 (refit_hours 동안 다시 학습하지 않도록 결과만 기록)
+            self._counts["rejected"] += 1
+            self.db_manager.save_user_adapter(user_id, {
+                "status": "rejected", "model_version": detector.model_version, "training": report,
+            })
+            report["status"] = "rejected"
+        self.store.put(user_id, adapter)
+        self._last_report = dict(report, user_id=user_id, finished_at=datetime.now().isoformat())
+        print(f"사용자 어댑터 학습 ({user_id}): {report['status']}, 윈도우 {report.get('train_windows')}개, "
+              f"검증 오차 감소율 {report.get('improvement', 0.0):.1%}, {report.get('fit_seconds', 0.0):.1f}초")
+        return report
+
+    def get_metrics(self) -> Dict:
+        return dict(self._counts, periodic=self._periodic, interval_minutes=self.interval / 60.0,
+                    last_report=self._last_report)
@@ -0,0 +1,232 @@
+"""
+사용자별 적응형 임계값 모듈
+사용자마다 재구성 오차의 분위수 스케치를 유지하고, 충분한 샘플이 모이면 개인화된 임계값을 사용
+(평소 패턴이 불규칙한 사용자의 반복 알림 감소)
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import config
+from quantile_sketch import QuantileSketch
+
+
+class _UserState:
+    """사용자별 스케치와 캐시된 분위수 (점수 계산 시 O(1) 조회)"""
+
+    __slots__ = ("sketch", "delta", "model_version", "quantile_value", "pending", "synced_at")
+
+    def __init__(self, sketch: QuantileSketch, delta: QuantileSketch, model_version: str):
+        self.sketch = sketch  # 저장된 스케치 (다른 워커의 샘플 포함) + 이 워커가 추가한 샘플
+        self.delta = delta  # 마지막 저장 이후 이 워커가 추가한 샘플 (저장 시 DB 스케치에 병합)
+        self.model_version = model_version
+        self.quantile_value = None  # min_samples 미만이면 None
+        self.pending = 0  # 마지막 저장 이후 추가된 샘플 수
+        self.synced_at = 0.0  # 마지막으로 DB 스케치와 동기화한 시각 (time.monotonic)
+
+
+class UserThresholdService:
+    """
+    사용자별 재구성 오차 분위수 스케치 → 개인화 임계값
+
+    개인화 임계값 = clip(사용자 오차의 quantile 분위수,
+                         global * min_ratio, global * max_ratio)
+    샘플이 min_samples 미만이거나 모델 버전이 바뀌면 전역 임계값을 사용한다.
+
+    개인화 임계값이 정해진 뒤에는 그 임계값을 넘는 (이상으로 판정된) 오차를 스케치에 넣지 않는다.
+    계속 비정상인 사용자의 오차가 분위수를 끌어올려 임계값이 max_ratio까지 올라가고
+    알림이 멈추는 것을 막기 위함이다. 개인화 전 (min_samples 미만)에는 global * max_ratio를 넘는 오차만 제외한다.
+
+    gunicorn 워커마다 인스턴스가 따로 있으므로, 저장할 때는 DB 스케치를 다시 읽어 이 워커의 새 샘플만
+    병합하고 revision이 그대로일 때만 교체한다 (다른 워커가 먼저 저장했으면 다시 읽어 재시도).
+    reload_seconds마다 DB 스케치를 다시 읽어 다른 워커가 모은 샘플도 반영한다.
+    """
+
+    MAX_SAVE_ATTEMPTS = 3  # revision 충돌 시 다시 읽어 병합하는 횟수
+
+    def __init__(self, db_manager=None, quantile: float = None, min_samples: int = None,
+                 max_users: int = None):
+        """
+        Args:
+            db_manager: MongoDBManager (None이면 메모리에만 보관)
+            quantile: 임계값으로 사용할 분위수
+            min_samples: 개인화 임계값을 사용하기 위한 최소 샘플 수
+            max_users: 메모리에 유지할 최대 사용자 수 (초과 시 LRU 제거, 제거 전 저장)
+        """
+        threshold_config = config.USER_THRESHOLD_CONFIG
+        self.db_manager = db_manager
+        self.quantile = threshold_config["quantile"] if quantile is None else quantile
+        self.min_samples = threshold_config["min_samples"] if min_samples is None else min_samples
+        self.max_users = max_users or threshold_config["max_users"]
+        self.min_ratio = threshold_config["min_ratio"]
+        self.max_ratio = threshold_config["max_ratio"]
+        self.relative_accuracy = threshold_config["relative_accuracy"]
+        self.max_buckets = threshold_config["max_buckets"]
+        self.persist_every = threshold_config["persist_every"]
+        self.reload_seconds = threshold_config["reload_seconds"]
+
+        self._states = OrderedDict()  # {user_id: _UserState}, 최근 사용 순서
+        self._lock = threading.Lock()
+        self._personalized = 0
+        self._fallbacks = 0
+        self._excluded = 0  # 임계값을 넘어 스케치에 넣지 않은 오차 수
+        self._conflicts = 0  # 다른 워커가 먼저 저장해 다시 병합한 횟수
+
+    def _new_sketch(self) -> QuantileSketch:
+        return QuantileSketch(self.relative_accuracy, self.max_buckets)
+
+    def _load_state(self, user_id: str, model_version: str) -> _UserState:
+        """저장된 스케치 로드 (없거나 다른 모델 버전의 스케치면 새로 시작)"""
+        state = _UserState(self._new_sketch(), self._new_sketch(), model_version)
+        self._sync(user_id, state)
+        return state
+
+    def _get_state(self, user_id: str, model_version: str) -> _UserState:
+        reload = False
+        with self._lock:
+            state = self._states.get(user_id)
+            if state is not None:
+                self._states.move_to_end(user_id)
+                # 다른 워커가 모은 샘플 반영 (주기마다 한 요청만 DB를 읽도록 시각을 먼저 갱신)
+                reload = (self.db_manager is not None and state.model_version == model_version
+                          and time.monotonic() - state.synced_at >= self.reload_seconds)
+                if reload:
+                    state.synced_at = time.monotonic()
+        if reload:
+            self._sync(user_id, state)
+        if state is None:
+            # DB 조회는 lock 밖에서 (사용자별 첫 요청에만)
+            state = self._load_state(user_id, model_version)
+            evicted = []
+            with self._lock:
+                state = self._states.setdefault(user_id, state)
+                while len(self._states) > self.max_users:
+                    evicted.append(self._states.popitem(last=False))
+            for evicted_user, evicted_state in evicted:
+                if evicted_state.pending:
+                    self._sync(evicted_user, evicted_state)
+        if state.model_version != model_version:
+            # 모델이 바뀌면 오차 분포도 바뀌므로 다시 수집 (다른 워커가 이미 새 버전으로 모았으면 로드)
+            state = self._load_state(user_id, model_version)
+            with self._lock:
+                self._states[user_id] = state
+        return state
+
+    def _sync(self, user_id: str, state: _UserState):
+        """
+        DB 스케치와 동기화
+
+        이 워커의 새 샘플(delta)을 저장된 스케치에 병합해 revision 비교 후 저장하고,
+        다른 워커의 샘플까지 포함된 스케치로 메모리 스케치를 교체한다.
+        저장에 계속 실패하면 delta를 되돌려 두고 다음 동기화 때 다시 병합한다.
+        """
+        if self.db_manager is None:
+            return
+        with self._lock:
+            delta, state.delta = state.delta, self._new_sketch()
+            state.pending = 0
+            state.synced_at = time.monotonic()
+
+        stored = None
+        for attempt in range(self.MAX_SAVE_ATTEMPTS):
+            saved = self.db_manager.get_user_threshold(user_id)
+            if saved is None and delta.count == 0:
+                return  # 저장된 스케치가 없으면 (또는 조회 실패) 메모리 스케치 유지
+            revision = saved.get("revision", 0) if saved else None
+            if saved and saved.get("model_version") == state.model_version:
+                stored = QuantileSketch.from_bytes(bytes(saved["sketch"]), max_buckets=self.max_buckets)
+            else:
+                stored = self._new_sketch()  # 다른 모델 버전의 스케치는 새로 시작
+            if delta.count == 0:
+                break
+            stored.merge(delta)
+            quantile_value = stored.quantile(self.quantile) if stored.count >= self.min_samples else None
+            if self.db_manager.save_user_threshold(user_id, state.model_version, stored.to_bytes(),
+                                                   stored.count, quantile_value, revision):
+                break
+            stored = None
+            with self._lock:
+                self._conflicts += 1
+
+        with self._lock:
+            if stored is None:
+                state.delta.merge(delta)
+                state.pending += delta.count
+                return
+            stored.merge(state.delta)  # 동기화하는 동안 추가된 샘플
+            state.sketch = stored
+            self._refresh(state)
+
+    def _refresh(self, state: _UserState):
+        """캐시된 분위수 갱신 (O(버킷 수), 샘플 추가 시에만)"""
+        if state.sketch.count >= self.min_samples:
+            state.quantile_value = state.sketch.quantile(self.quantile)
+        else:
+            state.quantile_value = None
+
+    def get_threshold(self, user_id: str, global_threshold: float,
+                      model_version: str) -> Tuple[float, str]:
+        """
+        사용자 임계값 조회 (캐시된 분위수로 O(1))
+
+        Returns:
+            (임계값, "user" 또는 "global")
+        """
+        state = self._get_state(user_id, model_version)
+        quantile_value = state.quantile_value
+        if quantile_value is None:
+            self._fallbacks += 1
+            return float(global_threshold), "global"
+        self._personalized += 1
+        return self._clip(quantile_value, global_threshold), "user"
+
+    def _clip(self, quantile_value: float, global_threshold: float) -> float:
+        return float(min(max(quantile_value, global_threshold * self.min_ratio),
+                         global_threshold * self.max_ratio))
+
+    def update(self, user_id: str, reconstruction_error: float, model_version: str,
+               global_threshold: float = None):
+        """
+        사용자 스케치에 재구성 오차 추가 (persist_every개마다 저장)
+
+        Args:
+            global_threshold: 전역 임계값 (지정하면 현재 적용 중인 임계값을 넘는 오차는 추가하지 않음)
+        """
+        state = self._get_state(user_id, model_version)
+        with self._lock:
+            if global_threshold is not None:
+                if state.quantile_value is None:
+                    limit = global_threshold * self.max_ratio
+                else:
+                    limit = self._clip(state.quantile_value, global_threshold)
+                if reconstruction_error > limit:
+                    self._excluded += 1
+                    return
+            state.sketch.add(reconstruction_error)
+            state.delta.add(reconstruction_error)
+            self._refresh(state)
+            state.pending += 1
+            should_persist = state.pending >= self.persist_every
+        if should_persist:
+            self._sync(user_id, state)
+
+    def flush(self):
+        """저장되지 않은 모든 사용자 스케치 저장 (종료 시)"""
+        with self._lock:
+            states = [(user_id, state) for user_id, state in self._states.items() if state.pending]
+        for user_id, state in states:
+            self._sync(user_id, state)
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "users": len(self._states),
+                "personalized_users": sum(1 for s in self._states.values() if s.quantile_value is not None),
+                "sketch_kb": sum(s.sketch.nbytes for s in self._states.values()) / 1024,
+                "personalized_lookups": self._personalized,
+                "global_fallbacks": self._fallbacks,
+                "excluded_samples": self._excluded,
+                "save_conflicts": self._conflicts,
+                "quantile": self.quantile,
+                "min_samples": self.min_samples,
+            }